@@ -0,0 +1,196 @@
+# assets.py
+"""Build step and handler for fingerprinted, precompressed static assets.
+
+    python assets.py
+
+concatenates and minifies each CSS bundle in BUNDLES, copies the plain
+assets, and writes every result to static/dist under a content-hashed name
+(app.3f9a1c2b7d4e.css) with .gz and .br siblings, plus manifest.json
+mapping logical names to hashed ones. Old builds are left in place so pages
+rendered before a deploy can still fetch what they reference.
+
+Templates call static_url("app.css") to get /assets/app.3f9a1c2b7d4e.css,
+and /assets/{name} serves the smallest variant the client accepts, from
+memory, with Cache-Control: immutable: the name changes whenever the
+content does. .br files need the brotli package; without it only .gz is
+written.
+
+The Dockerfile runs the build. The app only loads the result, unless
+ASSETS_AUTOBUILD is set (compose.yaml, where the source is mounted over the
+image): then it rebuilds on startup when the manifest is missing or older
+than a source file. Without a build (a fresh checkout) static_url falls
+back to the plain /static source file, uncompressed and uncached.
+"""
+import os
+import re
+import sys
+import gzip
+import json
+import hashlib
+import mimetypes
+from fastapi import HTTPException, Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+STATIC_DIR = "static"
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+URL_PREFIX = "/assets"
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# logical name -> source files, concatenated in order
+BUNDLES = {
+    "app.css": ["style.css"],      # base.html
+    "legacy.css": ["style1.css"],  # base1.html
+    "script.js": ["script.js"],
+}
+
+CSS_STRINGS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'')
+CSS_COMMENTS = re.compile(r'(%s)|/\*.*?\*/' % CSS_STRINGS.pattern, re.S)
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and insignificant whitespace; strings are left alone"""
+    # comments first, so the second pass sees the whitespace around them
+    css = CSS_COMMENTS.sub(lambda m: m.group(1) or " ", css)
+    out = []
+    position = 0
+    for string in CSS_STRINGS.finditer(css):
+        out.append(_squeeze(css[position:string.start()]))
+        out.append(string.group())
+        position = string.end()
+    out.append(_squeeze(css[position:]))
+    return "".join(out).strip()
+
+
+def _squeeze(css: str) -> str:
+    css = re.sub(r"\s+", " ", css)
+    css = re.sub(r" ?([{};,>]) ?", r"\1", css)
+    # "a :hover" is not "a:hover", so only declarations lose the space
+    css = re.sub(r"(?<=[{;])([\w-]+) ?: ?", r"\1:", css)
+    return css.replace(";}", "}")
+
+
+def fingerprint(name: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def _write(path: str, content: bytes):
+    # atomic, several workers may build at once
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def build(static_dir: str = STATIC_DIR, dist_dir: str = DIST_DIR) -> dict:
+    """Write the bundles and manifest.json, returns the manifest"""
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+    for name, sources in BUNDLES.items():
+        parts = []
+        for source in sources:
+            with open(os.path.join(static_dir, source), encoding="utf-8") as f:
+                parts.append(f.read())
+        text = "".join(minify_css(p) for p in parts) if name.endswith(".css") else "\n".join(parts)
+        content = text.encode()
+        hashed = fingerprint(name, content)
+        path = os.path.join(dist_dir, hashed)
+        if not os.path.exists(path):
+            _write(path + ".gz", gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli:
+                _write(path + ".br", brotli.compress(content, quality=11))
+            _write(path, content)
+        manifest[name] = hashed
+    _write(os.path.join(dist_dir, "manifest.json"), json.dumps(manifest, indent=2).encode())
+    return manifest
+
+
+def is_stale(static_dir: str = STATIC_DIR, dist_dir: str = DIST_DIR) -> bool:
+    try:
+        built = os.path.getmtime(os.path.join(dist_dir, "manifest.json"))
+    except OSError:
+        return True
+    return any(os.path.getmtime(os.path.join(static_dir, source)) > built
+               for sources in BUNDLES.values() for source in sources)
+
+
+class Assets:
+    """The built assets, held in memory, and the /assets handler"""
+
+    def __init__(self, dist_dir: str = DIST_DIR):
+        self.dist_dir = dist_dir
+        self.manifest = {}
+        self.files = {}
+
+    def load(self) -> bool:
+        """Read the build into memory, False if there is none"""
+        try:
+            with open(os.path.join(self.dist_dir, "manifest.json")) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return False
+        files = {}
+        for entry in os.listdir(self.dist_dir):
+            base, encoding = entry, "identity"
+            if entry.endswith(".gz"):
+                base, encoding = entry[:-3], "gzip"
+            elif entry.endswith(".br"):
+                base, encoding = entry[:-3], "br"
+            elif entry == "manifest.json" or entry.endswith(".tmp"):
+                continue
+            with open(os.path.join(self.dist_dir, entry), "rb") as f:
+                files.setdefault(base, {})[encoding] = f.read()
+        self.manifest, self.files = manifest, files
+        return True
+
+    def url(self, name: str) -> str:
+        """Hashed URL of a logical asset name, for templates"""
+        if name not in self.manifest:
+            # not built: the source itself, bundles being one file each
+            return f"/{STATIC_DIR}/{BUNDLES[name][0]}"
+        return f"{URL_PREFIX}/{self.manifest[name]}"
+
+    def response(self, request: Request, filename: str) -> Response:
+        variants = self.files.get(filename)
+        if variants is None or "identity" not in variants:
+            raise HTTPException(status_code=404, detail="Asset not found")
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in ("br", "gzip") if e in accepted and e in variants), "identity")
+        headers = {"Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+        if media_type.startswith("text/") or media_type.endswith("javascript"):
+            media_type += "; charset=utf-8"
+        return Response(variants[encoding], media_type=media_type, headers=headers)
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings in an Accept-Encoding header, minus those refused with q=0"""
+    accepted = set()
+    for item in header.split(","):
+        name, *params = item.split(";")
+        q = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+if __name__ == "__main__":
+    manifest = build()
+    for name, hashed in manifest.items():
+        sizes = [os.path.getsize(os.path.join(DIST_DIR, hashed + ext)) for ext in ("", ".gz", ".br")
+                 if os.path.exists(os.path.join(DIST_DIR, hashed + ext))]
+        print(f"{name:<12} -> {hashed:<28} {' / '.join(str(s) for s in sizes)} bytes")
+    sys.exit(0)
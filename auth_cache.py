@@ -0,0 +1,122 @@
+# auth_cache.py
+"""Cache of verified access tokens for the authentication dependencies.
+
+get_current_user decodes the JWT and loads the user row the first time it
+sees a token; after that the token maps straight to a small Principal for
+up to AUTH_CACHE_TTL seconds (never past the token's own expiry), so repeat
+requests cost neither a signature check nor a query.
+
+Entries of a user are dropped as soon as the User row is updated or deleted
+through the ORM in this process. Other workers keep serving their entry
+until it expires, which is what bounds how long a deactivated user can
+keep using an already issued token.
+
+The cache is also changed from the threadpool (sync routes write users,
+and the ORM listener runs there), so every change holds a lock.
+"""
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from sqlalchemy import event
+from models import User
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """What the routes need to know about the authenticated user"""
+    user_id: int
+    username: str
+    is_active: bool
+    is_admin: bool
+    is_verified: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(user.user_id, user.username, user.is_active, user.is_admin, user.is_verified)
+
+
+class TokenCache:
+    """TTL-bounded LRU of token -> Principal"""
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, Principal]] = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Principal | None:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def put(self, token: str, principal: Principal, token_exp: float | None = None):
+        """Remember a verified token until the TTL or its exp claim, whichever is first"""
+        if self.ttl <= 0:
+            return
+        lifetime = self.ttl
+        if token_exp is not None:
+            lifetime = min(lifetime, token_exp - time.time())
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (time.monotonic() + lifetime, principal)
+            self._tokens_by_user.setdefault(principal.user_id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            tokens = self._tokens_by_user.pop(user_id, ())
+            for token in tokens:
+                self._entries.pop(token, None)
+            if tokens:
+                self.invalidations += 1
+
+    def _remove(self, token: str):
+        # the caller holds the lock
+        entry = self._entries.pop(token, None)
+        if entry is not None:
+            tokens = self._tokens_by_user.get(entry[1].user_id)
+            if tokens is not None:
+                tokens.discard(token)
+                if not tokens:
+                    del self._tokens_by_user[entry[1].user_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+def invalidate_on_user_change(cache: TokenCache):
+    """Drop a user's cached tokens whenever the ORM writes or deletes that user"""
+    @event.listens_for(User, "after_update")
+    @event.listens_for(User, "after_delete")
+    def _invalidate(mapper, connection, target):
+        cache.invalidate_user(target.user_id)
+    return _invalidate
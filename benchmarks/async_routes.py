@@ -0,0 +1,92 @@
+"""Concurrent-request throughput of the bracket view, sync vs async session.
+
+"before" is the old pattern: an async def route running sync Session queries,
+which blocks the event loop for the length of every query. "after" is the
+real /tournaments/{id} route on the AsyncSession. While each runs, a probe
+requests the DB-free /login page so the event loop stall shows up as probe
+latency.
+
+    python -m benchmarks.async_routes [number_of_teams] [concurrency] [requests]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import httpx
+from fastapi import Request, HTTPException
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Tournament, Match, Player
+from game import app, templates
+
+
+@app.get("/bench/legacy-bracket/{tournament_id}")
+async def legacy_bracket_view(request: Request, tournament_id: int):
+    """Bracket view as it was before the async engine"""
+    with Session(engine) as session:
+        tournament = session.get(Tournament, tournament_id)
+        if not tournament:
+            raise HTTPException(status_code=404, detail="Tournament not found")
+        matches = session.exec(
+            select(Match).where(Match.tournament_id == tournament_id).order_by(Match.round_num)
+        ).all()
+        matches_by_round = {}
+        for match in matches:
+            matches_by_round.setdefault(match.round_num, []).append(match)
+        player_ids = {m.team1_id for m in matches} | {m.team2_id for m in matches}
+        players_list = session.exec(select(Player).where(Player.player_id.in_(player_ids))).all()
+        players = {p.player_id: p.name for p in players_list}
+    return templates.TemplateResponse(
+        "tournament_bracket.html",
+        {"request": request, "tournament": tournament,
+         "matches_by_round": matches_by_round, "players": players}
+    )
+
+
+async def run(client, path: str, concurrency: int, requests: int):
+    probe_latencies = []
+    done = asyncio.Event()
+
+    async def worker():
+        for _ in range(requests):
+            response = await client.get(path)
+            response.raise_for_status()
+
+    async def probe():
+        while not done.is_set():
+            start = time.perf_counter()
+            await client.get("/login")
+            probe_latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.005)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+    return concurrency * requests / elapsed, probe_latencies
+
+
+async def main(number_of_teams: int, concurrency: int, requests: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=2)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(f"/tournaments/{tournament.tournament_id}")  # warm templates
+        print(f"{number_of_teams}-team bracket, {concurrency} clients x {requests} requests")
+        for label, path in [("before (sync session)", f"/bench/legacy-bracket/{tournament.tournament_id}"),
+                            ("after  (async session)", f"/tournaments/{tournament.tournament_id}")]:
+            throughput, probes = await run(client, path, concurrency, requests)
+            print(f"{label}: {throughput:8.1f} req/s   "
+                  f"/login probe {len(probes):4d} served, {summarize(probes)}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, concurrency, requests = (args + [256, 32, 10][len(args):])[:3]
+    asyncio.run(main(number_of_teams, concurrency, requests))
@@ -0,0 +1,74 @@
+"""Authentication overhead per request, with and without the token cache.
+
+Times get_current_user on its own (JWT decode + user lookup vs cache hit)
+and a protected page (/players/create) end to end, counting the SQL
+statements each authenticated request issues.
+
+    python -m benchmarks.auth_path [requests]
+"""
+from benchmarks.common import use_temp_database, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import httpx
+from sqlalchemy import event
+from sqlmodel import Session
+from database import engine, async_engine, async_session_maker, create_db_and_tables
+from models import User
+from game import app, get_current_user, create_access_token, token_cache
+
+
+async def time_dependency(token: str, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        async with async_session_maker() as session:
+            await get_current_user(token, session)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def time_route(client, requests: int) -> list[float]:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = await client.get("/players/create")
+        response.raise_for_status()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def main(requests: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.add(User(username="bench", email="bench@example.com", full_name="Bench",
+                         password="x", is_active=True, is_verified=True))
+        session.commit()
+    token = create_access_token({"sub": "bench"})
+
+    statements = []
+    event.listen(async_engine.sync_engine, "before_cursor_execute",
+                 lambda *args: statements.append(args[2]))
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 headers={"Authorization": f"Bearer {token}"}) as client:
+        for label, ttl in (("no cache", 0), ("token cache", 60)):
+            token_cache.ttl = ttl
+            token_cache.clear()
+            await time_route(client, 10)  # warm up
+            statements.clear()
+            dependency = await time_dependency(token, requests)
+            dependency_queries = len(statements) / requests
+            statements.clear()
+            route = await time_route(client, requests)
+            route_queries = len(statements) / requests
+            print(f"{label:12s} get_current_user {summarize(dependency)}  {dependency_queries:.1f} queries")
+            print(f"{'':12s} /players/create  {summarize(route)}  {route_queries:.1f} queries")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    requests, = (args + [2000][len(args):])[:1]
+    asyncio.run(main(requests))
@@ -0,0 +1,84 @@
+"""A whole round of results: N single score POSTs versus one batch POST.
+
+Seeds a tournament whose first round (number_of_teams / 2 matches) is
+pending and enters every result through the app, either
+  sequential : one POST /tournaments/{id}/matches/{id}/score/ per match
+  batch      : one POST /tournaments/{id}/results/ with all of them
+Both end with the round advanced. Reports wall time and the number of SQL
+statements sent (an executemany counts once).
+
+    python -m benchmarks.batch_results [number_of_teams] [repeats]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import httpx
+from sqlalchemy import event
+from sqlmodel import Session, select
+from database import engine, async_engine, create_db_and_tables
+from models import Match, Tournament
+from auth_cache import Principal
+from game import app, get_current_active_user
+
+statements = 0
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    global statements
+    statements += 1
+
+
+def fresh_round(number_of_teams: int) -> tuple[int, list[int]]:
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, number_of_teams, completed_rounds=0).tournament_id
+        match_ids = session.exec(select(Match.match_id).where(Match.tournament_id == tournament_id)).all()
+    return tournament_id, match_ids
+
+
+async def sequential(client: httpx.AsyncClient, tournament_id: int, match_ids: list[int]):
+    for match_id in match_ids:
+        response = await client.post(f"/tournaments/{tournament_id}/matches/{match_id}/score/",
+                                     data={"team1_score": 21, "team2_score": 17})
+        assert response.status_code in (200, 303), response.text
+
+
+async def batch(client: httpx.AsyncClient, tournament_id: int, match_ids: list[int]):
+    response = await client.post(f"/tournaments/{tournament_id}/results/", json=[
+        {"match_id": match_id, "team1_score": 21, "team2_score": 17} for match_id in match_ids
+    ])
+    assert response.status_code == 200, response.text
+
+
+async def run(number_of_teams: int, repeats: int):
+    global statements
+    app.dependency_overrides[get_current_active_user] = lambda: Principal(1, "referee", True, False, True)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for label, submit in (("sequential", sequential), ("batch", batch)):
+            samples, counts = [], []
+            for _ in range(repeats):
+                tournament_id, match_ids = fresh_round(number_of_teams)
+                statements = 0
+                start = time.perf_counter()
+                await submit(client, tournament_id, match_ids)
+                samples.append(time.perf_counter() - start)
+                counts.append(statements)
+                with Session(engine) as session:
+                    assert session.get(Tournament, tournament_id).current_round == 2
+            print(f"{label:<10} {summarize(samples)}  {sum(counts) // len(counts)} statements")
+    app.dependency_overrides.clear()
+
+
+def main(number_of_teams: int, repeats: int):
+    create_db_and_tables()
+    print(f"{number_of_teams // 2} results per round")
+    asyncio.run(run(number_of_teams, repeats))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, repeats = (args + [256, 5][len(args):])[:2]
+    main(number_of_teams, repeats)
@@ -0,0 +1,81 @@
+"""Round advancement with and without the fixed bracket.
+
+Creates number_of_teams players and, per mode, a tournament through
+POST /tournaments/ ("shuffle", the default redraw of the winners each round,
+and "bracket", every slot created up front). Round 1 is entered with one
+batch except for its last match, then times
+  create  : POST /tournaments/
+  score   : a single score POST that does not finish the round
+  advance : the score POST of the last match, which advances the round
+  bracket : GET /tournaments/{id}, the page cache cleared each time
+Fresh tournaments per repeat.
+
+    python -m benchmarks.bracket_advance [number_of_teams] [repeats]
+"""
+from benchmarks.common import use_temp_database, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import httpx
+from sqlalchemy import insert
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match, Player
+from auth_cache import Principal
+from game import app, page_cache, get_current_active_user
+
+
+async def timed(samples: list, request):
+    start = time.perf_counter()
+    response = await request
+    samples.append(time.perf_counter() - start)
+    assert response.status_code in (200, 303), response.text[:300]
+    return response
+
+
+def round_one(tournament_id: int) -> list[int]:
+    with Session(engine) as session:
+        return session.exec(select(Match.match_id).where(Match.tournament_id == tournament_id)
+                            .where(Match.round_num == 1).order_by(Match.match_id)).all()
+
+
+async def run(repeats: int):
+    app.dependency_overrides[get_current_active_user] = lambda: Principal(1, "referee", True, False, True)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for mode in ("shuffle", "bracket"):
+            samples = {"create": [], "score": [], "advance": [], "bracket": []}
+            for repeat in range(repeats):
+                response = await timed(samples["create"], client.post(
+                    "/tournaments/", json={"name": f"{mode} {repeat}", "bracket": mode == "bracket"}))
+                tournament_id = response.json()["tournament"]["tournament_id"]
+                score_path = f"/tournaments/{tournament_id}/matches/{{}}/score/"
+                *first, second_last, last = round_one(tournament_id)
+                await client.post(f"/tournaments/{tournament_id}/results/", json=[
+                    {"match_id": match_id, "team1_score": 21, "team2_score": 17} for match_id in first])
+                await timed(samples["score"], client.post(score_path.format(second_last),
+                                                          data={"team1_score": 21, "team2_score": 17}))
+                await timed(samples["advance"], client.post(score_path.format(last),
+                                                            data={"team1_score": 21, "team2_score": 17}))
+                page_cache.clear()
+                await timed(samples["bracket"], client.get(f"/tournaments/{tournament_id}"))
+            for label, values in samples.items():
+                print(f"{mode:<8} {label:<8} {summarize(values)}")
+    app.dependency_overrides.clear()
+
+
+def main(number_of_teams: int, repeats: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        session.execute(insert(Player), [{"name": f"Player {i}", "email": f"player{i}@example.com"}
+                                         for i in range(number_of_teams)])
+        session.commit()
+    print(f"{number_of_teams} teams, {number_of_teams // 2} matches in round 1")
+    asyncio.run(run(repeats))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, repeats = (args + [1024, 5][len(args):])[:2]
+    main(number_of_teams, repeats)
@@ -0,0 +1,79 @@
+"""Bracket query: match list plus a player IN-list vs one join on integer keys.
+
+"two queries" is the bracket view as it was while team ids were strings: load
+the matches, int() every team id, fetch the players with an IN list and key
+them by str(player_id). "join" is the current tournament_bracket_view query,
+which joins Match.team1_id/team2_id straight onto player.player_id and only
+projects the player names.
+
+    python -m benchmarks.bracket_join [number_of_teams] [iterations]
+"""
+from benchmarks.common import use_temp_database, seed_tournament
+use_temp_database()
+
+import sys
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match, Player
+
+
+def two_queries(session, tournament_id: int):
+    matches = session.exec(
+        select(Match).where(Match.tournament_id == tournament_id).order_by(Match.round_num)
+    ).all()
+    player_ids = {int(m.team1_id) for m in matches} | {int(m.team2_id) for m in matches}
+    players_list = session.exec(select(Player).where(Player.player_id.in_(player_ids))).all()
+    return matches, {str(p.player_id): p for p in players_list}
+
+
+def join_statement(tournament_id: int):
+    team1 = aliased(Player)
+    team2 = aliased(Player)
+    return (
+        select(Match, team1.name, team2.name)
+        .join(team1, Match.team1_id == team1.player_id)
+        .join(team2, Match.team2_id == team2.player_id)
+        .where(Match.tournament_id == tournament_id)
+        .order_by(Match.round_num)
+    )
+
+
+def join(session, tournament_id: int):
+    rows = session.exec(join_statement(tournament_id)).all()
+    players = {}
+    for match, team1_name, team2_name in rows:
+        players[match.team1_id] = team1_name
+        players[match.team2_id] = team2_name
+    return [row[0] for row in rows], players
+
+
+def main(number_of_teams: int, iterations: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=3)
+        tournament_id = tournament.tournament_id
+
+    sql = str(join_statement(tournament_id).compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        print("join plan:")
+        for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")):
+            print("   ", row[-1])
+
+    for label, query in [("two queries", two_queries), ("join", join)]:
+        timings = []
+        for _ in range(iterations):
+            with Session(engine) as session:
+                start = time.perf_counter()
+                query(session, tournament_id)
+                timings.append(time.perf_counter() - start)
+        print(f"{label:>12}: best {min(timings) * 1000:7.2f} ms  mean {sum(timings) / len(timings) * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, iterations = (args + [4096, 20][len(args):])[:2]
+    print(f"{number_of_teams}-team bracket, {iterations} iterations")
+    main(number_of_teams, iterations)
@@ -0,0 +1,75 @@
+"""Tournament creation time against bracket size, per-row ORM vs bulk insert.
+
+"per-row" is the old create_tournament loop (one Match object and INSERT per
+fixture); "bulk" is create_tournament itself, which now writes the round
+through insert_round_fixtures.
+
+    python -m benchmarks.bulk_fixtures [min_exponent] [max_exponent]
+"""
+from benchmarks.common import use_temp_database
+use_temp_database()
+
+import io
+import sys
+import math
+import time
+import asyncio
+import contextlib
+from sqlalchemy import delete, insert
+from sqlmodel import select
+from database import create_db_and_tables, async_session_maker
+from models import Player, Tournament, Match, Game_Round
+from schemas import TournamentCreate
+from game import create_tournament, start_game, matches
+
+
+async def reset(session, number_of_teams: int):
+    for model in (Match, Game_Round, Tournament, Player):
+        await session.exec(delete(model))
+    await session.exec(insert(Player), params=[
+        {"name": f"Player {i}", "email": f"player{i}@example.com"} for i in range(number_of_teams)
+    ])
+    await session.commit()
+
+
+async def create_per_row(session, name: str):
+    """create_tournament as it was before the bulk insert path"""
+    players = (await session.exec(select(Player))).all()
+    tournament = Tournament(name=name, status="ongoing", number_of_teams=len(players),
+                            current_round=1, total_rounds=int(math.log2(len(players))))
+    session.add(tournament)
+    await session.flush()
+    match_list = matches(start_game([player.player_id for player in players], 1))
+    for match in match_list:
+        session.add(Match(tournament_id=tournament.tournament_id, round_num=match["round"],
+                          team1_id=match["team1"], team2_id=match["team2"],
+                          team1_score=0, team2_score=0, status="pending"))
+    session.add(Game_Round(tournament_id=tournament.tournament_id, round_num=1,
+                           matches_in_round=len(match_list), status="ongoing"))
+    await session.commit()
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # start_game/matches print every fixture
+        await coro
+    return time.perf_counter() - start
+
+
+async def main(min_exponent: int, max_exponent: int):
+    create_db_and_tables()
+    print(f"{'teams':>6} {'per-row':>10} {'bulk':>10} {'speedup':>8}")
+    for exponent in range(min_exponent, max_exponent + 1):
+        number_of_teams = 2 ** exponent
+        async with async_session_maker() as session:
+            await reset(session, number_of_teams)
+            per_row = await timed(create_per_row(session, "per-row"))
+            await reset(session, number_of_teams)
+            bulk = await timed(create_tournament(TournamentCreate(name="bulk"), session, None))
+        print(f"{number_of_teams:>6} {per_row * 1000:8.1f}ms {bulk * 1000:8.1f}ms {per_row / bulk:7.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    min_exponent, max_exponent = (args + [4, 14][len(args):])[:2]
+    asyncio.run(main(min_exponent, max_exponent))
@@ -0,0 +1,74 @@
+"""Shared helpers for the benchmark scripts.
+
+Run the benchmarks from the repository root so the app modules and the
+templates/static directories resolve, e.g.
+
+    python -m benchmarks.async_routes
+"""
+import os
+import math
+import random
+import tempfile
+import statistics
+
+
+def use_temp_database(name: str = "bench.db") -> str:
+    """Point DATABASE_URL at a throwaway sqlite file.
+
+    Must be called before database.py (or anything importing it) is imported,
+    because the engines are created at import time.
+    """
+    path = os.path.join(tempfile.mkdtemp(prefix="jidalli-bench-"), name)
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+
+def seed_tournament(session, number_of_teams: int, completed_rounds: int = 1, name: str = "Bench Cup"):
+    """Insert players plus a tournament whose first rounds are already played"""
+    from models import Player, Tournament, Match, Game_Round
+
+    players = [Player(name=f"Player {i}", email=f"player{i}@example.com") for i in range(number_of_teams)]
+    session.add_all(players)
+    session.flush()
+
+    total_rounds = int(math.log2(number_of_teams))
+    tournament = Tournament(name=name, status="ongoing", number_of_teams=number_of_teams,
+                            current_round=completed_rounds + 1, total_rounds=total_rounds)
+    session.add(tournament)
+    session.flush()
+
+    alive = [p.player_id for p in players]
+    for round_num in range(1, completed_rounds + 2):
+        random.shuffle(alive)
+        played = round_num <= completed_rounds
+        winners = []
+        for team1, team2 in zip(alive[::2], alive[1::2]):
+            session.add(Match(tournament_id=tournament.tournament_id, round_num=round_num,
+                              team1_id=team1, team2_id=team2,
+                              team1_score=21 if played else 0, team2_score=15 if played else 0,
+                              winner_id=team1 if played else None, loser_id=team2 if played else None,
+                              status="completed" if played else "pending"))
+            winners.append(team1)
+        session.add(Game_Round(tournament_id=tournament.tournament_id, round_num=round_num,
+                               matches_in_round=len(alive) // 2,
+                               pending_matches=0 if played else len(alive) // 2,
+                               status="completed" if played else "ongoing"))
+        alive = winners
+    session.commit()
+    session.refresh(tournament)
+    return tournament
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> str:
+    """Format latency samples (seconds) as p50/p99 milliseconds"""
+    if not samples:
+        return "no samples"
+    return (f"p50 {statistics.median(samples) * 1000:7.2f} ms  "
+            f"p99 {percentile(samples, 99) * 1000:7.2f} ms")
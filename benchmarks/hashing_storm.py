@@ -0,0 +1,82 @@
+"""Latency of an unrelated route during a registration storm.
+
+Concurrent clients POST /register_user (each one a pbkdf2 hash) while a probe
+requests the DB-free /login page. "on loop" hashes inline in the async
+route, as before the hashing pool; "hashing pool" is the current code.
+Reported: probe latency, registration latency, and how many registrations
+were turned away with 503.
+
+    python -m benchmarks.hashing_storm [concurrency] [registrations_per_client]
+"""
+from benchmarks.common import use_temp_database, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import itertools
+import httpx
+from database import create_db_and_tables
+import game
+
+serial = itertools.count()
+
+
+async def storm(client, concurrency: int, per_client: int):
+    probe_latencies, register_latencies = [], []
+    rejected = 0
+    done = asyncio.Event()
+
+    async def registrant():
+        nonlocal rejected
+        for _ in range(per_client):
+            n = next(serial)
+            start = time.perf_counter()
+            response = await client.post("/register_user", data={
+                "username": f"user{n}", "email": f"user{n}@example.com", "full_name": f"User {n}",
+                "password": "correct horse", "confirm_password": "correct horse"})
+            register_latencies.append(time.perf_counter() - start)
+            if response.status_code == 503:
+                rejected += 1
+            else:
+                response.raise_for_status()
+
+    async def probe():
+        # timed from when each probe was due, so an event loop stall that
+        # delays sending the request is counted too
+        due = time.perf_counter()
+        while not done.is_set():
+            await asyncio.sleep(max(0.0, due - time.perf_counter()))
+            (await client.get("/login")).raise_for_status()
+            now = time.perf_counter()
+            probe_latencies.append(now - due)
+            due = max(due + 0.005, now)
+
+    probing = asyncio.create_task(probe())
+    await asyncio.gather(*(registrant() for _ in range(concurrency)))
+    done.set()
+    await probing
+    return probe_latencies, register_latencies, rejected
+
+
+async def main(concurrency: int, per_client: int):
+    create_db_and_tables()
+    pooled = game.hash_password_async
+
+    async def on_loop(password):
+        return game.hash_password(password)
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=game.app), base_url="http://bench") as client:
+        for label, hasher in (("on loop", on_loop), ("hashing pool", pooled)):
+            game.hash_password_async = hasher
+            probe, register, rejected = await storm(client, concurrency, per_client)
+            print(f"{label:13s} /login probe   {summarize(probe)}")
+            print(f"{'':13s} /register_user {summarize(register)}  "
+                  f"{len(register) - rejected} ok, {rejected} rejected (503)")
+    print("hashing pool", game.hashing_pool.stats())
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    concurrency, per_client = (args + [16, 10][len(args):])[:2]
+    asyncio.run(main(concurrency, per_client))
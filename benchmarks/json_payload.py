@@ -0,0 +1,78 @@
+"""Serialization time and payload size of the match list JSON routes.
+
+Seeds a tournament whose first round (number_of_teams / 2 matches) is
+played and whose second round is pending, then compares for the
+/tournaments/{id}/matches/ payload
+  default : jsonable_encoder + JSONResponse, what FastAPI does with a dict
+  orjson  : FastJSONResponse straight from the SQLModel objects
+and the size of the body raw, gzip level 6 and brotli quality 4 (the
+CompressionMiddleware settings), plus the full request through the app.
+
+    python -m benchmarks.json_payload [number_of_teams] [repeats]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import sys
+import gzip
+import time
+import asyncio
+import brotli
+import httpx
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match
+from responses import FastJSONResponse
+from game import app
+
+
+def timed(fn, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def requests(path: str, repeats: int, accept: str) -> tuple[list[float], int]:
+    samples = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Accept-Encoding": accept})
+            samples.append(time.perf_counter() - start)
+    return samples, int(response.headers["content-length"])
+
+
+def main(number_of_teams: int, repeats: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=1)
+        matches = session.exec(select(Match).where(Match.tournament_id == tournament.tournament_id)).all()
+        path = f"/tournaments/{tournament.tournament_id}/matches/"
+    completed = [m for m in matches if m.status == "completed"]
+    content = {"matches": completed, "pending": len(matches) - len(completed)}
+    print(f"{len(completed)} completed matches in the payload")
+
+    default = timed(lambda: JSONResponse(jsonable_encoder(content)), repeats)
+    fast = timed(lambda: FastJSONResponse(content), repeats)
+    print(f"serialize  default  {summarize(default)}")
+    print(f"serialize  orjson   {summarize(fast)}")
+
+    body = FastJSONResponse(content).body
+    assert body == FastJSONResponse(jsonable_encoder(content)).body
+    print(f"payload    raw {len(body)} B  gzip-6 {len(gzip.compress(body, 6))} B"
+          f"  br-4 {len(brotli.compress(body, quality=4))} B")
+
+    for accept in ("identity", "gzip", "br"):
+        samples, size = asyncio.run(requests(path, repeats, accept))
+        print(f"request    {accept:<8} {summarize(samples)}  {size} B on the wire")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, repeats = (args + [2048, 50][len(args):])[:2]
+    main(number_of_teams, repeats)
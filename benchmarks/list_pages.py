@@ -0,0 +1,112 @@
+"""Latency of the list routes, paged versus the old load-everything handlers.
+
+Seeds players and tournaments with bulk inserts, plus one tournament whose
+first round (number_of_teams / 2 matches) is played and whose second round
+is pending, then times through the app
+  legacy : the old handlers, select(Model).all() and a Python status filter,
+           mounted on /bench-legacy/... for the run
+  first  : the first keyset page of the current routes
+  deep   : a page from the end of the list (the cursor of the last rows)
+for /, /players/, /tournaments/{id}/matches/ and /current-matches/.
+
+    python -m benchmarks.list_pages [players] [tournaments] [number_of_teams] [repeats]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import sys
+import time
+import asyncio
+import httpx
+from fastapi import Request
+from fastapi.responses import HTMLResponse
+from sqlmodel import Session, select, insert, func
+from database import engine, create_db_and_tables, asyncSessionDep
+from models import Match, Player, Tournament
+from responses import FastJSONResponse
+from game import app, templates
+
+
+@app.get("/bench-legacy/", response_class=HTMLResponse)
+async def legacy_home(request: Request, session: asyncSessionDep):
+    tournaments = (await session.exec(select(Tournament))).all()
+    return templates.TemplateResponse("index.html", {"request": request, "tournaments": tournaments})
+
+@app.get("/bench-legacy/players/", response_class=HTMLResponse)
+async def legacy_players(request: Request, session: asyncSessionDep):
+    players = (await session.exec(select(Player))).all()
+    return templates.TemplateResponse("players.html", {"request": request, "players": players})
+
+@app.get("/bench-legacy/tournaments/{tournament_id}/matches/")
+async def legacy_matches(tournament_id: int, session: asyncSessionDep):
+    matches = (await session.exec(select(Match).where(Match.tournament_id == tournament_id))).all()
+    completed = [m for m in matches if m.status == "completed"]
+    pending = [m for m in matches if m.status == "pending"]
+    return FastJSONResponse({"matches": completed, "pending": len(pending)})
+
+@app.get("/bench-legacy/tournaments/{tournament_id}/current-matches/")
+async def legacy_current_matches(tournament_id: int, session: asyncSessionDep):
+    matches = (await session.exec(select(Match).where(Match.tournament_id == tournament_id))).all()
+    return FastJSONResponse({"pending matches": [m for m in matches if m.status == "pending"]})
+
+
+def seed(players: int, tournaments: int, number_of_teams: int) -> tuple[int, dict]:
+    """Bulk insert the rows, returns the bracket tournament id and the deep cursors"""
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, number_of_teams, completed_rounds=1).tournament_id
+        session.execute(insert(Player), [{"name": f"Member {i}", "email": f"member{i}@example.com"}
+                                         for i in range(players)])
+        session.execute(insert(Tournament), [{"name": f"Club night {i}", "status": "completed",
+                                              "number_of_teams": 16, "current_round": 4, "total_rounds": 4}
+                                             for i in range(tournaments)])
+        session.commit()
+        last = lambda column, *where: session.exec(select(func.max(column)).where(*where)).one()
+        cursors = {
+            "home": 60,  # before=60: the oldest tournaments
+            "players": last(Player.player_id) - 50,
+            "matches": last(Match.match_id, Match.tournament_id == tournament_id,
+                            Match.status == "completed") - 50,
+            "current": last(Match.match_id, Match.tournament_id == tournament_id,
+                            Match.status == "pending") - 50,
+        }
+    return tournament_id, cursors
+
+
+async def timed(client: httpx.AsyncClient, path: str, repeats: int) -> tuple[list[float], int]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = await client.get(path)
+        samples.append(time.perf_counter() - start)
+        assert response.status_code == 200, (path, response.status_code)
+    return samples, len(response.content)
+
+
+async def run(tournament_id: int, cursors: dict, repeats: int):
+    routes = {
+        "home": ("/", "before"),
+        "players": ("/players/", "after"),
+        "matches": (f"/tournaments/{tournament_id}/matches/", "after"),
+        "current": (f"/tournaments/{tournament_id}/current-matches/", "after"),
+    }
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                 headers={"Accept-Encoding": "identity"}) as client:
+        for name, (path, param) in routes.items():
+            for label, url in (("legacy", f"/bench-legacy{path}"), ("first", path),
+                               ("deep", f"{path}?{param}={cursors[name]}")):
+                samples, size = await timed(client, url, repeats)
+                print(f"{name:<8} {label:<7} {summarize(samples)}  {size:>9} B")
+
+
+def main(players: int, tournaments: int, number_of_teams: int, repeats: int):
+    create_db_and_tables()
+    tournament_id, cursors = seed(players, tournaments, number_of_teams)
+    print(f"{players} players, {tournaments} tournaments, "
+          f"{number_of_teams // 2} completed and {number_of_teams // 4} pending matches")
+    asyncio.run(run(tournament_id, cursors, repeats))
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    players, tournaments, number_of_teams, repeats = (args + [100_000, 10_000, 2048, 20][len(args):])[:4]
+    main(players, tournaments, number_of_teams, repeats)
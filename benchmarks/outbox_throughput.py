@@ -0,0 +1,86 @@
+"""Email delivery throughput against the local mail sink.
+
+Starts mail_sink.py on a local port, then compares
+  per message : one POST /emails on a fresh connection per email, the way
+                the old BackgroundTasks path called the provider
+  outbox      : rows enqueued in the database, drained by OutboxWorker
+                (batched claims, /emails/batch, kept-alive connections)
+
+    python -m benchmarks.outbox_throughput [emails] [batch_size] [concurrency]
+"""
+from benchmarks.common import use_temp_database
+use_temp_database()
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+import httpx
+
+with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    PORT = s.getsockname()[1]
+os.environ["RESEND_API_URL"] = f"http://127.0.0.1:{PORT}"
+
+from database import async_session_maker, create_db_and_tables
+from outbox import OutboxWorker, ResendTransport, enqueue_email, EMAIL_FROM
+
+
+def per_message(emails: int) -> float:
+    start = time.perf_counter()
+    for i in range(emails):
+        httpx.post(f"http://127.0.0.1:{PORT}/emails", json={
+            "from": EMAIL_FROM, "to": [f"player{i}@example.com"],
+            "subject": "Fixtures", "html": "<p>Your next match</p>"}).raise_for_status()
+    return time.perf_counter() - start
+
+
+async def through_outbox(emails: int, batch_size: int, concurrency: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    async with async_session_maker() as session:
+        for i in range(emails):
+            enqueue_email(session, f"player{i}@example.com", "Fixtures", "<p>Your next match</p>")
+        await session.commit()
+    enqueued = time.perf_counter() - start
+
+    transport = ResendTransport(pool_size=concurrency)
+    worker = OutboxWorker(async_session_maker, transport, batch_size, concurrency)
+    start = time.perf_counter()
+    try:
+        assert await worker.drain() == emails
+        assert worker.stats()["sent"] == emails, worker.stats()
+    finally:
+        await transport.aclose()
+    return enqueued, time.perf_counter() - start
+
+
+def main(emails: int, batch_size: int, concurrency: int):
+    create_db_and_tables()
+    sink = subprocess.Popen([sys.executable, "mail_sink.py", "--port", str(PORT)])
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://127.0.0.1:{PORT}/stats")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        sample = min(emails, 500)
+        elapsed = per_message(sample)
+        print(f"per message  {sample} emails in {elapsed:.2f}s  {sample / elapsed:8.0f} emails/s")
+
+        enqueued, elapsed = asyncio.run(through_outbox(emails, batch_size, concurrency))
+        print(f"outbox       {emails} emails in {elapsed:.2f}s  {emails / elapsed:8.0f} emails/s"
+              f"  (enqueue {enqueued:.2f}s)")
+        print("sink", httpx.get(f"http://127.0.0.1:{PORT}/stats").json())
+    finally:
+        sink.terminate()
+        sink.wait()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    emails, batch_size, concurrency = (args + [5000, 100, 2][len(args):])[:3]
+    main(emails, batch_size, concurrency)
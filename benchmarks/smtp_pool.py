@@ -0,0 +1,84 @@
+"""SMTP delivery with and without connection reuse, against the local mail sink.
+
+Starts mail_sink.py with its SMTP server, then sends the same messages
+  per message : connect, EHLO, login, send, QUIT for every email, the way
+                send_email used to
+  pooled      : SMTPTransport over SMTPPool (pool_size connections, each
+                reused for up to max_messages emails)
+
+    python -m benchmarks.smtp_pool [emails] [pool_size] [max_messages]
+"""
+import sys
+import time
+import socket
+import asyncio
+import smtplib
+import subprocess
+from types import SimpleNamespace
+import httpx
+from mailer import SMTPPool, SMTPTransport, build_message
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def per_message(port: int, emails: list) -> float:
+    start = time.perf_counter()
+    for email in emails:
+        with smtplib.SMTP("127.0.0.1", port) as server:
+            server.ehlo()
+            server.login("user", "secret")
+            server.send_message(build_message(email.to_email, email.subject, email.html))
+    return time.perf_counter() - start
+
+
+async def pooled(port: int, emails: list, pool_size: int, max_messages: int) -> float:
+    transport = SMTPTransport(SMTPPool("127.0.0.1", port, "user", "secret", starttls=False,
+                                       pool_size=pool_size, max_messages=max_messages))
+    start = time.perf_counter()
+    try:
+        # batches the size the outbox worker claims
+        for i in range(0, len(emails), 100):
+            errors = await transport.send_batch(emails[i:i + 100])
+            assert not any(errors), errors
+    finally:
+        await transport.aclose()
+    return time.perf_counter() - start
+
+
+def main(count: int, pool_size: int, max_messages: int):
+    http_port, smtp_port = free_port(), free_port()
+    sink = subprocess.Popen([sys.executable, "mail_sink.py", "--port", str(http_port),
+                             "--smtp-port", str(smtp_port)])
+    stats_url = f"http://127.0.0.1:{http_port}/smtp/stats"
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(stats_url)
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+
+        emails = [SimpleNamespace(to_email=f"player{i}@example.com", subject="Fixtures",
+                                  html="<p>Your next match</p>") for i in range(count)]
+        elapsed = per_message(smtp_port, emails)
+        print(f"per message  {count} emails in {elapsed:.2f}s  {count / elapsed:8.0f} emails/s"
+              f"  sink {httpx.get(stats_url).json()}")
+        before = httpx.get(stats_url).json()
+        elapsed = asyncio.run(pooled(smtp_port, emails, pool_size, max_messages))
+        after = httpx.get(stats_url).json()
+        print(f"pooled       {count} emails in {elapsed:.2f}s  {count / elapsed:8.0f} emails/s"
+              f"  connections {after['connections'] - before['connections']}"
+              f"  logins {after['logins'] - before['logins']}")
+    finally:
+        sink.terminate()
+        sink.wait()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    count, pool_size, max_messages = (args + [2000, 4, 100][len(args):])[:3]
+    main(count, pool_size, max_messages)
@@ -0,0 +1,109 @@
+"""Concurrent score writers against bracket readers, per SQLite profile.
+
+Each writer thread completes its share of the pending matches one commit at
+a time (the shape of update_match_score); reader threads run the bracket
+query in a loop meanwhile. The legacy profile runs with a busy timeout of 0,
+as the app did before the profiles: a locked database fails at once instead
+of waiting. Reported per profile: committed writes/s, "database is locked"
+failures of writers and of readers, reader stalls (reads slower than
+STALL_MS) and reader latency.
+
+    python -m benchmarks.sqlite_contention [writers] [readers] [number_of_teams]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, Session, select
+from benchmarks.common import seed_tournament, summarize
+from database import make_engine
+from models import Match
+
+STALL_MS = 100
+
+
+def run_profile(profile: str, writers: int, readers: int, number_of_teams: int):
+    path = os.path.join(tempfile.mkdtemp(prefix="jidalli-bench-"), f"{profile}.db")
+    engine = make_engine(f"sqlite:///{path}", profile)
+    if profile == "legacy":
+        @event.listens_for(engine, "connect")
+        def no_busy_timeout(dbapi_connection, connection_record):
+            # sqlite3 waits 5 s by default; the old setup did not wait at all
+            dbapi_connection.execute("PRAGMA busy_timeout = 0")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=0)
+        pending = session.exec(select(Match.match_id).where(Match.status == "pending")).all()
+
+    writes = locked_errors = read_locked_errors = 0
+    read_latencies = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def writer(match_ids):
+        nonlocal writes, locked_errors
+        for match_id in match_ids:
+            try:
+                with Session(engine) as session:
+                    match = session.get(Match, match_id)
+                    match.team1_score, match.team2_score = 21, 19
+                    match.winner_id, match.loser_id = match.team1_id, match.team2_id
+                    match.status = "completed"
+                    session.add(match)
+                    session.commit()
+                with lock:
+                    writes += 1
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    locked_errors += 1
+
+    def reader():
+        nonlocal read_locked_errors
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with Session(engine) as session:
+                    session.exec(select(Match).where(Match.tournament_id == tournament.tournament_id)
+                                 .order_by(Match.round_num)).all()
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    read_locked_errors += 1
+                continue
+            with lock:
+                read_latencies.append(time.perf_counter() - start)
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(pending[i::writers],)) for i in range(writers)]
+    for t in reader_threads:
+        t.start()
+    start = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in reader_threads:
+        t.join()
+    engine.dispose()
+
+    stalls = sum(latency * 1000 > STALL_MS for latency in read_latencies)
+    print(f"{profile:>10}: {writes / elapsed:8.1f} writes/s  {writes}/{len(pending)} committed  "
+          f"locked: writers {locked_errors:4d} readers {read_locked_errors:5d}  "
+          f"reader stalls >{STALL_MS} ms {stalls:4d}")
+    print(f"{'':>10}  reads {len(read_latencies):5d}  {summarize(read_latencies)}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    writers, readers, number_of_teams = (args + [8, 4, 512][len(args):])[:3]
+    print(f"{writers} writers, {readers} readers, {number_of_teams // 2} matches to score")
+    for profile in ("legacy", "production"):
+        run_profile(profile, writers, readers, number_of_teams)
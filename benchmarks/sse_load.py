@@ -0,0 +1,129 @@
+"""Idle live-bracket subscribers on one uvicorn worker.
+
+Opens many /tournaments/{id}/events connections against a real uvicorn
+process, then submits scores and measures how long it takes until every
+subscriber has received each match_completed event. Also reports the
+worker's resident memory before and after the subscribers connect.
+
+    python -m benchmarks.sse_load [subscribers] [scores] [number_of_teams]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import subprocess
+import httpx
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match, User
+from game import create_access_token, hash_password
+
+HOST = "127.0.0.1"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+async def subscriber(port: int, path: str, ready: list, received: list):
+    reader, writer = await asyncio.open_connection(HOST, port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    await reader.readuntil(b"\r\n\r\n")  # response headers
+    ready.append(1)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if b"event: match_completed" in line:
+                received.append(time.perf_counter())
+    finally:
+        writer.close()
+
+
+async def main(subscribers: int, scores: int, number_of_teams: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=0)
+        session.add(User(username="bench", email="bench@example.com", full_name="Bench",
+                         password=hash_password("bench"), is_active=True, is_verified=True))
+        session.commit()
+        pending = session.exec(
+            select(Match.match_id).where(Match.tournament_id == tournament.tournament_id)
+        ).all()[:scores]
+    token = create_access_token({"sub": "bench"})
+
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "game:app", "--host", HOST, "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=os.environ.copy(), stderr=subprocess.DEVNULL
+    )
+    try:
+        async with httpx.AsyncClient(base_url=f"http://{HOST}:{port}",
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            for _ in range(100):
+                try:
+                    await client.get("/login")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.1)
+            baseline = rss_mb(server.pid)
+
+            ready = []
+            arrivals = [[] for _ in range(subscribers)]
+            path = f"/tournaments/{tournament.tournament_id}/events"
+            start = time.perf_counter()
+            tasks = [asyncio.create_task(subscriber(port, path, ready, received)) for received in arrivals]
+            while len(ready) < subscribers:
+                await asyncio.sleep(0.05)
+            connect_time = time.perf_counter() - start
+            await asyncio.sleep(1)
+            idle = rss_mb(server.pid)
+
+            fanout = []
+            for match_id in pending:
+                sent = time.perf_counter()
+                response = await client.post(
+                    f"/tournaments/{tournament.tournament_id}/matches/{match_id}/score/",
+                    data={"team1_score": 21, "team2_score": 15}, follow_redirects=False)
+                assert response.status_code in (200, 303), response.text
+                n = len(fanout)
+                while any(len(received) <= n for received in arrivals):
+                    await asyncio.sleep(0.001)
+                fanout.append(max(received[n] for received in arrivals) - sent)
+
+            print(f"{subscribers} subscribers connected in {connect_time:.2f}s")
+            print(f"worker RSS: {baseline:.1f} MB before, {idle:.1f} MB with subscribers "
+                  f"({(idle - baseline) * 1024 / subscribers:.1f} KB each)")
+            print(f"score -> delivered to all subscribers: {summarize(fanout)}")
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    subscribers, scores, number_of_teams = (args + [2000, 20, 64][len(args):])[:3]
+    asyncio.run(main(subscribers, scores, number_of_teams))
@@ -0,0 +1,59 @@
+"""Cold start of a worker: importing game.py and the schema check.
+
+Times in fresh interpreters
+  import game : python -c "import game", the whole module import
+and on a seeded database file
+  schema full : create_all + upgrade_schema, what every start used to run
+  schema skip : create_db_and_tables once user_version is current
+
+    python -m benchmarks.startup [imports] [repeats]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+DATABASE_PATH = use_temp_database()
+
+import os
+import sys
+import time
+import subprocess
+from sqlmodel import SQLModel, Session
+from database import engine, create_db_and_tables, upgrade_schema
+import models  # registers the tables
+
+
+def import_game(imports: int) -> list[float]:
+    samples = []
+    for _ in range(imports):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import game"], check=True, env=os.environ,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def timed(fn, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def full_schema():
+    SQLModel.metadata.create_all(engine)
+    upgrade_schema(engine)
+
+
+def main(imports: int, repeats: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        seed_tournament(session, 1024, completed_rounds=3)
+    print(f"import game   {summarize(import_game(imports))}")
+    print(f"schema full   {summarize(timed(full_schema, repeats))}")
+    print(f"schema skip   {summarize(timed(create_db_and_tables, repeats))}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    imports, repeats = (args + [10, 50][len(args):])[:2]
+    main(imports, repeats)
@@ -0,0 +1,155 @@
+"""Template compilation, and buffered vs streamed rendering of a large bracket.
+
+  compile : loading every template from source, then from the bytecode cache
+  memory  : tracemalloc peak while rendering the bracket page in process,
+            buffered (render) vs streamed (stream_template, chunks dropped)
+            vs streamed into the page cache (chunks kept and joined)
+  ttfb    : time to first body byte and to the last byte of
+            /tournaments/{id} from a uvicorn worker, with STREAM_TEMPLATES
+            off and on (page cache disabled so every request renders)
+
+    python -m benchmarks.template_render [number_of_teams] [requests]
+"""
+from benchmarks.common import use_temp_database, seed_tournament, summarize
+use_temp_database()
+
+import os
+import sys
+import time
+import socket
+import asyncio
+import tempfile
+import tracemalloc
+import subprocess
+import httpx
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match, Player
+from templating import make_templates, streaming_environment, stream_template, warm_templates
+
+HOST = "127.0.0.1"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def bracket_context(session, tournament) -> dict:
+    team1, team2 = aliased(Player), aliased(Player)
+    matches_by_round, players = {}, {}
+    for match, team1_name, team2_name in session.exec(
+        select(Match, team1.name, team2.name)
+        .join(team1, Match.team1_id == team1.player_id)
+        .join(team2, Match.team2_id == team2.player_id)
+        .where(Match.tournament_id == tournament.tournament_id)
+        .order_by(Match.round_num)
+    ):
+        matches_by_round.setdefault(match.round_num, []).append(match)
+        players[match.team1_id] = team1_name
+        players[match.team2_id] = team2_name
+    return {"request": None, "tournament": tournament, "matches_by_round": matches_by_round, "players": players}
+
+
+def compile_times():
+    cache_dir = tempfile.mkdtemp(prefix="jidalli-jinja-")
+    count, cold = warm_templates(make_templates("templates", cache_dir).env)
+    _, warm = warm_templates(make_templates("templates", cache_dir).env)
+    print(f"compile   {count} templates  from source {cold * 1000:6.1f} ms  from bytecode cache {warm * 1000:6.1f} ms")
+
+
+def peak_memory(label: str, fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"memory    {label:<22} {size / 1e6:5.2f} MB page  peak {peak / 1e6:6.2f} MB  {elapsed * 1000:6.1f} ms")
+
+
+def render_memory(context: dict):
+    env = make_templates("templates", tempfile.mkdtemp(prefix="jidalli-jinja-"),
+                         static_url=lambda name: f"/assets/{name}").env
+    streaming = streaming_environment(env, tempfile.mkdtemp(prefix="jidalli-jinja-"))
+    warm_templates(env, ["tournament_bracket.html"])
+    warm_templates(streaming, ["tournament_bracket.html"])
+
+    def buffered():
+        return len(env.get_template("tournament_bracket.html").render(context))
+
+    def streamed(keep: bool):
+        async def consume():
+            parts, size = [], 0
+            async for chunk in stream_template(streaming, "tournament_bracket.html", context):
+                size += len(chunk)
+                if keep:
+                    parts.append(chunk)
+            return len("".join(parts)) if keep else size
+        return lambda: asyncio.run(consume())
+
+    peak_memory("buffered", buffered)
+    peak_memory("streamed", streamed(False))
+    peak_memory("streamed + cached", streamed(True))
+
+
+async def ttfb(port: int, path: str, requests: int) -> tuple[list, list]:
+    first, total = [], []
+    async with httpx.AsyncClient(base_url=f"http://{HOST}:{port}", timeout=60) as client:
+        for _ in range(requests):
+            start = time.perf_counter()
+            async with client.stream("GET", path) as response:
+                assert response.status_code == 200
+                seen = False
+                async for chunk in response.aiter_raw():
+                    if not seen and chunk:
+                        first.append(time.perf_counter() - start)
+                        seen = True
+            total.append(time.perf_counter() - start)
+    return first, total
+
+
+def serve_and_measure(stream: bool, path: str, requests: int):
+    port = free_port()
+    env = dict(os.environ, STREAM_TEMPLATES=str(stream), PAGE_CACHE_MAX_ENTRIES="0",
+               TOKEN_SWEEP_INTERVAL="0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "game:app", "--host", HOST, "--port", str(port),
+         "--log-level", "warning", "--no-access-log"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        for _ in range(100):
+            try:
+                httpx.get(f"http://{HOST}:{port}/")
+                break
+            except httpx.TransportError:
+                time.sleep(0.1)
+        asyncio.run(ttfb(port, path, 2))  # warm up
+        first, total = asyncio.run(ttfb(port, path, requests))
+        label = "streamed" if stream else "buffered"
+        print(f"ttfb      {label:<9} first byte {summarize(first)}   last byte {summarize(total)}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(number_of_teams: int, requests: int):
+    create_db_and_tables()
+    with Session(engine) as session:
+        tournament = seed_tournament(session, number_of_teams, completed_rounds=3)
+        context = bracket_context(session, tournament)
+        path = f"/tournaments/{tournament.tournament_id}"
+
+    compile_times()
+    render_memory(context)
+    serve_and_measure(False, path, requests)
+    serve_and_measure(True, path, requests)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    number_of_teams, requests = (args + [1024, 30][len(args):])[:2]
+    main(number_of_teams, requests)
@@ -0,0 +1,65 @@
+# conftest.py
+import asyncio
+from dataclasses import dataclass
+import httpx
+import pytest
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine, get_async_session
+from auth_cache import Principal
+
+REFEREE = Principal(1, "referee", True, False, True)
+
+
+def pytest_configure(config):
+    # game.py loads static/dist when imported; build it as the Dockerfile does
+    from assets import build, is_stale
+    if is_stale():
+        build()
+
+
+@dataclass
+class AppDatabase:
+    """A file database with every table, and the app's sessions pointed at it"""
+    url: str
+    engine: Engine
+    async_engine: AsyncEngine
+    session_maker: async_sessionmaker
+
+    def client(self) -> httpx.AsyncClient:
+        from game import app
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+@pytest.fixture
+def app_db(tmp_path):
+    """Yields an AppDatabase; the dependency overrides are cleared afterwards"""
+    from game import app
+    url = f"sqlite:///{tmp_path / 'app.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    async_engine = make_async_engine(url)
+    session_maker = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def session_override():
+        async with session_maker() as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    try:
+        yield AppDatabase(url, engine, async_engine, session_maker)
+    finally:
+        app.dependency_overrides.clear()
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+
+@pytest.fixture
+def referee(app_db):
+    """app_db, with the routes' logged in user stubbed out as REFEREE"""
+    from game import app, get_current_active_user, get_current_user
+    app.dependency_overrides[get_current_active_user] = lambda: REFEREE
+    app.dependency_overrides[get_current_user] = lambda: REFEREE
+    return app_db
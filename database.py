@@ -1,19 +1,280 @@
+import os
+import zlib
 from fastapi import FastAPI, Depends
 from typing import Annotated
 from sqlmodel import SQLModel, Session, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Integer, MetaData, event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from dotenv import load_dotenv
+load_dotenv()
 
-DATABASE_URL = "sqlite:///./jidalli.db"
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
+# DATABASE_URL may be given with either driver, e.g. "sqlite:///./jidalli.db"
+# (compose.yaml) or "sqlite+aiosqlite:///./jidalli.db". The sync engine is
+# still used by the legacy crud.py routes and the threadpool routes, the
+# async engine by every async def route in game.py.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./jidalli.db")
+
+def sync_database_url(url: str) -> str:
+    """Return the url with the async sqlite driver swapped for the sync one"""
+    return url.replace("sqlite+aiosqlite://", "sqlite://", 1)
+
+def async_database_url(url: str) -> str:
+    """Return the url with the sync sqlite driver swapped for aiosqlite"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+# ============ SQLITE TUNING ============
+# Pragmas set on every new connection. "legacy" is the plain rollback-journal
+# setup the app used to run with; "production" lets readers keep going while
+# a referee's score is being written and makes writers wait for the lock
+# instead of failing with "database is locked".
+SQLITE_PROFILES = {
+    "legacy": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",   # safe with WAL, fsync only on checkpoint
+        "busy_timeout": 5000,      # ms
+        "cache_size": -20000,      # negative means KiB, so ~20 MB
+        "mmap_size": 268435456,    # 256 MB
+        "temp_store": "MEMORY",
+    },
+}
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+# Pool settings for file databases (in-memory sqlite uses a single connection)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+
+def sqlite_pragmas(profile: str) -> dict:
+    """Pragmas for a profile; each can be overridden with SQLITE_<PRAGMA>"""
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in SQLITE_PROFILES["production"]:
+        override = os.getenv(f"SQLITE_{name.upper()}")
+        if override:
+            pragmas[name] = override
+    return pragmas
+
+def engine_options(url: str) -> dict:
+    """Pool settings, skipped for in-memory databases"""
+    if make_url(url).database in (None, "", ":memory:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+
+def install_sqlite_pragmas(sync_engine, profile: str):
+    """Run the profile's PRAGMA statements on each new pooled connection"""
+    pragmas = sqlite_pragmas(profile)
+    if sync_engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def make_engine(url: str, profile: str = DB_PROFILE):
+    """Sync engine for url, tuned with the given profile"""
+    url = sync_database_url(url)
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    new_engine = create_engine(url, connect_args=connect_args, **engine_options(url))
+    install_sqlite_pragmas(new_engine, profile)
+    return new_engine
+
+def make_async_engine(url: str, profile: str = DB_PROFILE):
+    """Async engine for url, tuned with the given profile"""
+    url = async_database_url(url)
+    new_engine = create_async_engine(url, **engine_options(url))
+    install_sqlite_pragmas(new_engine.sync_engine, profile)
+    return new_engine
+
+engine = make_engine(DATABASE_URL)
+async_engine = make_async_engine(DATABASE_URL)
+
+# expire_on_commit=False: objects are read again after commit (templates,
+# redirects) and an expired attribute would need a lazy load, which the
+# async session cannot do implicitly.
+async_session_maker = async_sessionmaker(
+    async_engine, class_=AsyncSession, expire_on_commit=False
 )
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+# Data to fill in when a column is added to an existing table
+COLUMN_BACKFILLS = {
+    ("game_round", "pending_matches"): """
+        UPDATE game_round SET pending_matches = (
+            SELECT count(*) FROM match
+            WHERE match.tournament_id = game_round.tournament_id
+              AND match.round_num = game_round.round_num
+              AND match.status = 'pending'
+        )
+    """,
+}
+
+# Tables whose old rows are worthless once a column is gone from the model:
+# they are dropped and created afresh instead of migrated. refreshtoken
+# held plaintext JWTs in "token" that nothing ever read back.
+RECREATED_TABLES = {
+    "refreshtoken": "token",
+}
+
+def recreate_obsolete_tables(conn) -> list[str]:
+    """Drop RECREATED_TABLES that still have their obsolete column"""
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    recreated = []
+    for name, obsolete_column in RECREATED_TABLES.items():
+        table = SQLModel.metadata.tables.get(name)
+        if table is None or name not in existing_tables:
+            continue
+        if obsolete_column not in {column["name"] for column in inspector.get_columns(name)}:
+            continue
+        conn.execute(text(f'DROP TABLE "{name}"'))
+        table.create(conn)
+        recreated.append(name)
+    return recreated
+
+def add_missing_columns(conn) -> list[tuple[str, str]]:
+    """ALTER TABLE ADD COLUMN for model columns an older table lacks"""
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=conn.dialect)
+            conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}'))
+            added.append((table.name, column.name))
+    return added
+
+def rebuild_retyped_tables(conn) -> list[str]:
+    """Rebuild tables whose Integer model columns are stored as another type
+
+    SQLite cannot change a column type in place, so e.g. match.team1_id, which
+    used to be VARCHAR, is moved into a freshly created table with its values
+    CAST to INTEGER. The same goes for a column that became nullable but is
+    still NOT NULL in the file (match.team1_id again, for bracket slots).
+    """
+    inspector = inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+    rebuilt = []
+    # the DROP must not check or cascade the references of other tables
+    foreign_keys = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+    conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        stored_columns = inspector.get_columns(table.name)
+        stored = {column["name"]: column["type"] for column in stored_columns}
+        retyped = [column.name for column in table.columns
+                   if isinstance(column.type, Integer) and column.name in stored
+                   and not isinstance(stored[column.name], Integer)]
+        loosened = [column["name"] for column in stored_columns
+                    if not column["nullable"] and column["name"] in table.columns
+                    and table.columns[column["name"]].nullable]
+        if not retyped and not loosened:
+            continue
+
+        # SQLite's documented order: build <table>_new, copy, drop the old
+        # table, rename _new. Renaming the live table away instead would make
+        # SQLite repoint every foreign key to it (tournament_summary ->
+        # match) at the renamed copy, which is then dropped.
+        new_name = f"{table.name}_new"
+        for index in inspector.get_indexes(table.name):
+            conn.execute(text(f'DROP INDEX "{index["name"]}"'))
+        # a scratch copy of the metadata, so the foreign keys resolve without
+        # adding <table>_new to SQLModel.metadata
+        scratch = MetaData()
+        for other in SQLModel.metadata.sorted_tables:
+            other.to_metadata(scratch)
+        table.to_metadata(scratch, name=new_name).create(conn)
+        columns = [name for name in stored if name in table.columns]
+        select_list = ", ".join(
+            f'CAST("{name}" AS INTEGER)' if name in retyped else f'"{name}"' for name in columns
+        )
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        conn.execute(text(
+            f'INSERT INTO "{new_name}" ({column_list}) SELECT {select_list} FROM "{table.name}"'
+        ))
+        conn.execute(text(f'DROP TABLE "{table.name}"'))
+        conn.execute(text(f'ALTER TABLE "{new_name}" RENAME TO "{table.name}"'))
+        rebuilt.append(table.name)
+    conn.exec_driver_sql(f"PRAGMA foreign_keys = {foreign_keys}")
+    return rebuilt
+
+def upgrade_schema(bind=engine):
+    """Bring an existing database file up to date with models.py
+
+    create_all only creates tables that are missing, so columns and indexes
+    added to a table that already exists in an older jidalli.db are
+    created here, new columns are backfilled from the existing rows,
+    tables with retyped columns are rebuilt and disposable tables with an
+    obsolete layout are recreated.
+    """
+    with bind.begin() as conn:
+        recreate_obsolete_tables(conn)
+        for added in add_missing_columns(conn):
+            if added in COLUMN_BACKFILLS:
+                conn.execute(text(COLUMN_BACKFILLS[added]))
+        rebuild_retyped_tables(conn)
+        for table in SQLModel.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+def schema_version() -> int:
+    """Fingerprint of the tables, columns and indexes in models.py
+
+    Stored in PRAGMA user_version (a signed 32-bit int) once the schema is
+    created or upgraded, so the next worker start can tell it is current.
+    """
+    layout = []
+    for table in SQLModel.metadata.sorted_tables:
+        columns = [(c.name, repr(c.type), c.nullable, c.primary_key) for c in table.columns]
+        indexes = sorted((i.name, [c.name for c in i.columns], i.unique) for i in table.indexes)
+        layout.append((table.name, columns, indexes))
+    return zlib.crc32(repr(layout).encode()) & 0x7FFFFFFF
+
+def create_db_and_tables(bind=engine) -> bool:
+    """Create and upgrade the schema, returns False when it was already current
+
+    Inspecting every table in upgrade_schema takes a while on a large file
+    and happens on each worker start, so on sqlite it is skipped when
+    user_version matches schema_version().
+    """
+    version = schema_version()
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            if conn.exec_driver_sql("PRAGMA user_version").scalar() == version:
+                return False
+    SQLModel.metadata.create_all(bind)
+    upgrade_schema(bind)
+    if bind.dialect.name == "sqlite":
+        with bind.begin() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {version}")
+    return True
 
 def get_session():
     with Session(engine) as session:
         yield session
 
-sessionDep = Annotated[Session, Depends(get_session)]
+async def get_async_session():
+    async with async_session_maker() as session:
+        yield session
 
+sessionDep = Annotated[Session, Depends(get_session)]
+asyncSessionDep = Annotated[AsyncSession, Depends(get_async_session)]
 
@@ -0,0 +1,80 @@
+# events.py
+"""In-process broadcast hub behind the live bracket's Server-Sent Events.
+
+update_match_score, advance_tournament_round and complete_tournament
+publish small events after they commit; every spectator connected to
+/tournaments/{id}/events gets them through its own bounded queue. A client
+that falls behind (full queue) loses its backlog and is told to resync,
+so one stalled connection never holds up the others or grows memory.
+
+The hub lives in the worker process: with several workers, a spectator
+only hears about results submitted to the worker it is connected to.
+"""
+import json
+import asyncio
+from collections import defaultdict
+
+RESYNC = "event: resync\ndata: {}\n\n"
+KEEPALIVE = ": keepalive\n\n"
+
+
+class EventHub:
+    def __init__(self, queue_size: int = 32, heartbeat: float = 15.0):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, tournament_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[tournament_id].add(queue)
+        return queue
+
+    def unsubscribe(self, tournament_id: int, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(tournament_id)
+        if subscribers is not None:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[tournament_id]
+
+    def publish(self, tournament_id: int, event: str, data: dict):
+        """Queue an event for every subscriber of the tournament
+
+        The SSE frame is encoded once and shared by all subscribers.
+        """
+        message = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        self.published += 1
+        for queue in self._subscribers.get(tournament_id, ()):
+            if queue.full():
+                # slow client: drop its backlog and make it reload instead
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(RESYNC)
+                self.dropped += 1
+            else:
+                queue.put_nowait(message)
+                self.delivered += 1
+
+    async def stream(self, tournament_id: int):
+        """SSE frames for one client until it disconnects"""
+        queue = self.subscribe(tournament_id)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+        finally:
+            self.unsubscribe(tournament_id, queue)
+
+    def stats(self) -> dict:
+        return {
+            "tournaments": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+        }
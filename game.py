@@ -1,32 +1,40 @@
-from email.mime import base
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from json import load
-import smtplib
-from unittest import runner
-from webbrowser import get
-from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Request, Form, Response, requests, status
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Request, Form, Response, status
+from fastapi.exception_handlers import http_exception_handler
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from typing import Annotated
-from database import sessionDep, create_db_and_tables
-from models import Player, Game, RefreshToken, Scoreboard, Tournament, Match, Game_Round, User, VerificationToken
-from sqlmodel import Session, select, func
-from schemas import PlayerCreate, PlayerRead, TournamentCreate, UserCreate, UserResponse, Token, TokenData, EmailVerificationRequest
+from database import sessionDep, asyncSessionDep, async_session_maker, create_db_and_tables
+from models import Player, Tournament, Match, Game_Round, TournamentStanding, TournamentSummary, User, VerificationToken
+from sqlmodel import select, func
+from page_cache import PageCache
+from events import EventHub
+from auth_cache import Principal, TokenCache, invalidate_on_user_change
+from hashing import HashingPool, HashingPoolFull
+from outbox import OutboxWorker, enqueue_email, enqueue_emails, make_transport
+from outbox import BATCH_SIZE as OUTBOX_BATCH_SIZE, CONCURRENCY as OUTBOX_CONCURRENCY, POLL_INTERVAL as OUTBOX_POLL_INTERVAL
+from sweeper import TokenSweeper
+from assets import Assets, build as build_assets, is_stale as assets_stale
+from compression import CompressionMiddleware
+from responses import FastJSONResponse
+from pagination import DEFAULT_PAGE_SIZE, PageSize, keyset_page
+from templating import make_templates, streaming_environment, stream_template, warm_templates
+from standings import insert_standings
+from refresh_tokens import store_refresh_token, find_refresh_token, rotate_refresh_token, just_rotated, revoke_family, prune_refresh_tokens
+from schemas import PlayerCreate, PlayerRead, MatchScore, TournamentCreate, UserCreate, UserResponse, Token, TokenData, EmailVerificationRequest
 import random
+import asyncio
 from itertools import batched
-from sqlalchemy import update
+from sqlalchemy import update, insert, bindparam
+from sqlalchemy.orm import aliased
 import math
 import os
-from jose import JWTError, jwt
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 import secrets
-from passlib.context import CryptContext
+from functools import cache
 from dotenv import load_dotenv
 #import mailtrap as mt
-import resend
 load_dotenv()
 
 
@@ -37,7 +45,6 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
 VERIFICATION_TOKEN_EXPIRE_HOURS = int(os.getenv("VERIFICATION_TOKEN_EXPIRE_HOURS", 24))
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./jidalli.db")
 base_url = os.getenv("BASE_URL", "http://localhost:8000")
 
 #Email settings
@@ -70,25 +77,101 @@ RESEND_API=os.getenv("RESEND_API","re_hBLd9qzs_4hJjRJSnSZD5J39EFfv31WPW")
 
 app = FastAPI()
 
+# br/gzip for HTML and JSON responses above the threshold, see compression.py
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_SIZE", 1024)))
+
 
 # Mount static files (CSS, JS, images)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# Setup Jinja2 templates
-templates = Jinja2Templates(directory="templates")
+# Fingerprinted, precompressed CSS/JS under /assets, see assets.py. Built by
+# the Dockerfile or `python assets.py`; with ASSETS_AUTOBUILD (development,
+# source mounted over the image) stale ones are rebuilt when the app starts
+ASSETS_AUTOBUILD = os.getenv("ASSETS_AUTOBUILD", "False").lower() in ("true", "1", "t")
+assets = Assets()
+if not ASSETS_AUTOBUILD and not assets.load():
+    print("No static/dist build, linking the /static sources; run python assets.py")
+
+# Setup Jinja2 templates, compiled once into a shared bytecode cache, see templating.py
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR")
+templates = make_templates("templates", TEMPLATE_CACHE_DIR, static_url=assets.url)
+
+# Opt-in: send the bracket and standings pages while they render
+STREAM_TEMPLATES = os.getenv("STREAM_TEMPLATES", "False").lower() in ("true", "1", "t")
+STREAMED_TEMPLATES = ["tournament_bracket.html", "standings.html"]
+streaming_templates = streaming_environment(templates.env, TEMPLATE_CACHE_DIR)
+
+# Rendered bracket/standings/winner pages, see page_cache.py
+page_cache = PageCache(max_entries=int(os.getenv("PAGE_CACHE_MAX_ENTRIES", 256)))
+
+# Live bracket updates pushed to /tournaments/{id}/events, see events.py
+event_hub = EventHub(queue_size=int(os.getenv("EVENT_QUEUE_SIZE", 32)))
+
+# Verified access tokens, see auth_cache.py
+token_cache = TokenCache(ttl=float(os.getenv("AUTH_CACHE_TTL", 60)))
+invalidate_on_user_change(token_cache)
+
+# Password hashing off the event loop, see hashing.py
+hashing_pool = HashingPool(workers=int(os.getenv("HASHING_WORKERS", 2)),
+                           max_pending=int(os.getenv("HASHING_MAX_PENDING", 32)))
+
+# Deletes used/expired verification and refresh tokens, see sweeper.py
+token_sweeper = TokenSweeper(async_session_maker,
+                             interval=float(os.getenv("TOKEN_SWEEP_INTERVAL", 3600)),
+                             batch_size=int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", 500)))
+
+# Sends the email outbox from this process, see outbox.py. Several replicas
+# can each run one, claims are leased. Set OUTBOX_IN_APP=false to run
+# `python outbox.py` on its own instead.
+OUTBOX_IN_APP = os.getenv("OUTBOX_IN_APP", "True").lower() in ("true", "1", "t")
 
 #================= Helper functions ==================
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+# passlib (and jose, imported where tokens are made or checked) load on first
+# use instead of at import, see test_startup.py
+@cache
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+
 oauth2_scheme=OAuth2PasswordBearer(tokenUrl="login")
 
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    if ASSETS_AUTOBUILD:
+        if assets_stale():
+            build_assets()
+        assets.load()
     create_db_and_tables()
+    count, seconds = warm_templates(templates.env)
+    if STREAM_TEMPLATES:
+        warm_templates(streaming_templates, STREAMED_TEMPLATES)
+    print(f"Loaded {count} templates in {seconds * 1000:.0f} ms")
+    if token_sweeper.interval > 0:
+        # keep a reference so the task is not garbage collected
+        app.state.token_sweeper_stop = asyncio.Event()
+        app.state.token_sweeper_task = asyncio.create_task(token_sweeper.run(app.state.token_sweeper_stop))
+    if OUTBOX_IN_APP:
+        app.state.outbox_worker = OutboxWorker(async_session_maker, make_transport(),
+                                               batch_size=OUTBOX_BATCH_SIZE,
+                                               concurrency=OUTBOX_CONCURRENCY,
+                                               poll_interval=OUTBOX_POLL_INTERVAL)
+        app.state.outbox_stop = asyncio.Event()
+        app.state.outbox_task = asyncio.create_task(app.state.outbox_worker.run(app.state.outbox_stop))
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if task := getattr(app.state, "token_sweeper_task", None):
+        app.state.token_sweeper_stop.set()
+        await task
+    if task := getattr(app.state, "outbox_task", None):
+        app.state.outbox_stop.set()
+        await task
+        await app.state.outbox_worker.transport.aclose()
+    hashing_pool.shutdown()
 
 def start_game(teams, present_round):
     if len(teams) % 2 == 0:
         random.shuffle(teams) 
-        print (f"Teams before shuffle: {teams}")     
         draws = list(batched(teams,2))
         return {"round" : present_round,
                 "matches": draws}
@@ -105,7 +188,6 @@ def matches(fixtures):
     for k,v in enumerate(fixtures["matches"], 1):
         match_number  = k
         team1, team2 = v
-        print (f"Match {match_number} : {team1} vs {team2}")
         match_data = {
             "team1": team1,
             "team2": team2,
@@ -113,11 +195,158 @@ def matches(fixtures):
             "round": fixtures["round"]
         }
         match_list.append(match_data)
-    print(match_list)
     
     #save_match_results(match_list, session)
     return match_list
 
+async def insert_round_fixtures(session: asyncSessionDep, tournament_id: int, match_list: list) -> Game_Round:
+    """Write a round's fixtures and its Game_Round row in one batch
+
+    The matches go in as a single executemany INSERT instead of one ORM
+    object and one INSERT per match, which matters for big brackets.
+    """
+    round_num = match_list[0]["round"]
+    await session.exec(insert(Match), params=[
+        {
+            "tournament_id": tournament_id,
+            "round_num": match["round"],
+            "team1_id": match["team1"],
+            "team2_id": match["team2"],
+            "team1_score": 0,
+            "team2_score": 0,
+            "winner_id": None,
+            "loser_id": None,
+            "status": "pending"
+        }
+        for match in match_list
+    ])
+    round_record = Game_Round(
+        tournament_id = tournament_id,
+        round_num = round_num,
+        matches_in_round = len(match_list),
+        pending_matches = len(match_list),
+        status = "ongoing"
+    )
+    session.add(round_record)
+
+    # players drawn into this round have reached it
+    player_ids = [team for match in match_list for team in (match["team1"], match["team2"])]
+    if round_num == 1:
+        await session.exec(insert(TournamentStanding), params=[
+            {"tournament_id": tournament_id, "player_id": player_id, "rounds_reached": 1}
+            for player_id in player_ids
+        ])
+    else:
+        await session.exec(
+            update(TournamentStanding)
+            .where(TournamentStanding.tournament_id == tournament_id)
+            .where(TournamentStanding.player_id.in_(player_ids))
+            .values(rounds_reached=round_num)
+            .execution_options(synchronize_session=False)
+        )
+    return round_record
+
+async def create_bracket(session: asyncSessionDep, tournament_id: int, match_list: list, total_rounds: int) -> list[Game_Round]:
+    """Write every match slot of a fixed bracket, round 1 drawn from match_list
+
+    Rounds are inserted from the final down so each match can point at the
+    parent slot its winner goes on to: matches 2k and 2k+1 of a round feed
+    team1 and team2 of match k of the next. Later rounds start "scheduled",
+    without teams, and become pending when their round opens.
+    """
+    parents = []
+    for round_num in range(total_rounds, 0, -1):
+        slots = len(match_list) >> (round_num - 1)
+        rows = [
+            {
+                "tournament_id": tournament_id,
+                "round_num": round_num,
+                "team1_id": match_list[i]["team1"] if round_num == 1 else None,
+                "team2_id": match_list[i]["team2"] if round_num == 1 else None,
+                "team1_score": 0,
+                "team2_score": 0,
+                "status": "pending" if round_num == 1 else "scheduled",
+                "parent_match_id": parents[i // 2] if parents else None,
+                "parent_slot": i % 2 + 1 if parents else None,
+            }
+            for i in range(slots)
+        ]
+        # RETURNING order is not guaranteed (and asking for it makes the
+        # insert go row by row), but (parent, slot) identifies each row
+        inserted = {
+            (parent, slot): match_id
+            for match_id, parent, slot in (await session.exec(
+                insert(Match).returning(Match.match_id, Match.parent_match_id, Match.parent_slot), params=rows
+            )).all()
+        }
+        parents = [inserted[row["parent_match_id"], row["parent_slot"]] for row in rows]
+
+    round_records = [
+        Game_Round(tournament_id=tournament_id, round_num=round_num,
+                   matches_in_round=len(match_list) >> (round_num - 1),
+                   pending_matches=len(match_list) >> (round_num - 1),
+                   status="ongoing" if round_num == 1 else "scheduled")
+        for round_num in range(1, total_rounds + 1)
+    ]
+    session.add_all(round_records)
+    await session.exec(insert(TournamentStanding), params=[
+        {"tournament_id": tournament_id, "player_id": team, "rounds_reached": 1}
+        for match in match_list for team in (match["team1"], match["team2"])
+    ])
+    return round_records
+
+async def open_bracket_round(session: asyncSessionDep, tournament_id: int, round_num: int) -> list:
+    """Start a round whose bracket slots were filled as the last one was played"""
+    await session.exec(
+        update(Game_Round)
+        .where(Game_Round.tournament_id == tournament_id)
+        .where(Game_Round.round_num == round_num)
+        .values(status="ongoing")
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(
+        update(Match)
+        .where(Match.tournament_id == tournament_id)
+        .where(Match.round_num == round_num)
+        .where(Match.status == "scheduled")
+        .values(status="pending")
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await session.exec(
+        select(Match.team1_id, Match.team2_id)
+        .where(Match.tournament_id == tournament_id).where(Match.round_num == round_num)
+        .order_by(Match.match_id)
+    )).all()
+    return [{"team1": team1, "team2": team2, "match_num": k, "round": round_num}
+            for k, (team1, team2) in enumerate(rows, 1)]
+
+async def propagate_winners(session: asyncSessionDep, tournament_id: int, results: list[dict]):
+    """Write each winner into its parent bracket slot, one primary key UPDATE per result
+
+    results are {"parent_match_id", "parent_slot", "winner_id", "round_num"}
+    dicts. The parent stays "scheduled" until open_bracket_round.
+    """
+    match_table = Match.__table__
+    for slot, team in ((1, match_table.c.team1_id), (2, match_table.c.team2_id)):
+        rows = [{"b_parent": r["parent_match_id"], "b_winner": r["winner_id"]}
+                for r in results if r["parent_slot"] == slot]
+        if rows:
+            await session.exec(
+                update(match_table)
+                .where(match_table.c.match_id == bindparam("b_parent"))
+                .values({team.key: bindparam("b_winner")}),
+                params=rows
+            )
+    # the winners have reached the next round
+    for round_num in {r["round_num"] for r in results}:
+        await session.exec(
+            update(TournamentStanding)
+            .where(TournamentStanding.tournament_id == tournament_id)
+            .where(TournamentStanding.player_id.in_([r["winner_id"] for r in results if r["round_num"] == round_num]))
+            .values(rounds_reached=round_num + 1)
+            .execution_options(synchronize_session=False)
+        )
+
 async def get_token(request: Request) -> str:
     """Dependency: Get JWT token from request headers"""
     auth_header = request.headers.get("Authorization")
@@ -141,8 +370,14 @@ async def get_token(request: Request) -> str:
     )
     return token
 
-async def get_current_user(token: Annotated[str , Depends(get_token)], session: sessionDep) -> User:
+async def get_current_user(token: Annotated[str , Depends(get_token)], session: asyncSessionDep) -> Principal:
     """Dependency: Get current user from JWT token"""
+    # repeat requests with a token we already verified skip decode and query
+    principal = token_cache.get(token)
+    if principal is not None:
+        return principal
+
+    from jose import JWTError, jwt
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -159,37 +394,42 @@ async def get_current_user(token: Annotated[str , Depends(get_token)], session:
     except JWTError:
         raise credentials_exception
     
-    user = session.exec(select(User).where(User.username == token_data.username)).first()
+    user = (await session.exec(select(User).where(User.username == token_data.username))).first()
     if user is None:
         raise credentials_exception
-    return user
+    principal = Principal.from_user(user)
+    token_cache.put(token, principal, payload.get("exp"))
+    return principal
 
 # current user dependency
-CurrentUserDep = Annotated[User, Depends(get_current_user)]
+CurrentUserDep = Annotated[Principal, Depends(get_current_user)]
 
 
 
-async def get_current_active_user(current_user: CurrentUserDep) -> User:
+async def get_current_active_user(current_user: CurrentUserDep) -> Principal:
     """Dependency: Get current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 # get current active user dependency
-CurrentActiveUserDep = Annotated[User, Depends(get_current_active_user)]
+CurrentActiveUserDep = Annotated[Principal, Depends(get_current_active_user)]
 
-async def get_admin_user(current_user: CurrentUserDep) -> User:
+async def get_admin_user(current_user: CurrentUserDep) -> Principal:
     """Dependency: Get current admin user"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return current_user
 
+# admin user dependency
+AdminUserDep = Annotated[Principal, Depends(get_admin_user)]
+
 
-def verify_match_belongs_to_tournament(id: int, 
+async def verify_match_belongs_to_tournament(id: int, 
                                        tournament_id: int, 
-                                       session: sessionDep) -> Match:
+                                       session: asyncSessionDep) -> Match:
     """Dependency: Verify match exists, is pending, and belongs to tournament"""
-    match = session.get(Match, id)
+    match = await session.get(Match, id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
@@ -201,10 +441,10 @@ def verify_match_belongs_to_tournament(id: int,
     if match.status == "completed":
         raise HTTPException(status_code=400, detail="Match already completed")
     #get active tournament
-    active_tournament = session.exec(
+    active_tournament = (await session.exec(
         select(Tournament).where(Tournament.status == 'ongoing')
         .where(Tournament.tournament_id == tournament_id) # for running multiple tournaments
-    ).first()
+    )).first()
     if not active_tournament:
         raise HTTPException(status_code=400, detail="No active tournament found")
     
@@ -214,128 +454,181 @@ def verify_match_belongs_to_tournament(id: int,
                 detail= f"Can only update matches in round {active_tournament.current_round}")
     return match
 
-def check_round_completion(tournament_id: int, 
+async def check_round_completion(tournament_id: int, 
                            current_round: int, 
-                           session: sessionDep) -> bool:
+                           session: asyncSessionDep) -> bool:
     """Check if all matches in the current round are completed"""
-    pending_matches = session.exec(
-        select(Match).where(
-            (Match.tournament_id == tournament_id) &
-            (Match.round_num == current_round) &
-         
-            (Match.status == "pending")
+    # Game_Round.pending_matches is kept up to date by update_match_score,
+    # so this is a single-row read instead of loading every pending match
+    pending_matches = (await session.exec(
+        select(Game_Round.pending_matches).where(
+            (Game_Round.tournament_id == tournament_id) &
+            (Game_Round.round_num == current_round)
         )
-    ).all()
-    return len(pending_matches) == 0
+    )).first()
+    return pending_matches == 0
 
-def advance_tournament_round(request: Request, tournament: Tournament, session: sessionDep):
+async def bump_tournament_version(tournament_id: int, session: asyncSessionDep):
+    """Move the tournament to a new version inside the current transaction
+
+    The rendered bracket/standings/winner pages are cached per version, so
+    this is what makes the next view re-render after the commit.
+    """
+    await session.exec(
+        update(Tournament)
+        .where(Tournament.tournament_id == tournament_id)
+        .values(version=Tournament.version + 1)
+    )
+
+async def record_tournament_summary(tournament: Tournament, final_match: Match, session: asyncSessionDep) -> TournamentSummary:
+    """Compute the winner page statistics once and add them to the session"""
+    played = (Match.tournament_id == tournament.tournament_id) & (Match.status == "completed")
+    margin = func.abs(Match.team1_score - Match.team2_score)
+
+    total_matches, total_points = (await session.exec(
+        select(func.count(), func.coalesce(func.sum(Match.team1_score + Match.team2_score), 0)).where(played)
+    )).one()
+    closest = (await session.exec(
+        select(Match.match_id, margin).where(played).order_by(margin, Match.match_id).limit(1)
+    )).first()
+    biggest = (await session.exec(
+        select(Match.match_id, margin).where(played).order_by(margin.desc(), Match.match_id).limit(1)
+    )).first()
+
+    summary = TournamentSummary(
+        tournament_id=tournament.tournament_id,
+        final_match_id=final_match.match_id,
+        runner_up_id=final_match.loser_id,
+        final_team1_score=final_match.team1_score,
+        final_team2_score=final_match.team2_score,
+        total_matches=total_matches,
+        total_points=total_points,
+        closest_match_id=closest[0] if closest else None,
+        closest_margin=closest[1] if closest else None,
+        biggest_match_id=biggest[0] if biggest else None,
+        biggest_margin=biggest[1] if biggest else None,
+    )
+    await session.merge(summary)
+    return summary
+
+async def claim_round_advance(tournament_id: int, expected_round: int, session: asyncSessionDep) -> bool:
+    """Move an ongoing tournament from expected_round to the next one
+
+    Conditional UPDATE, so when several requests saw the round complete at
+    the same time exactly one of them gets True and builds the fixtures.
+    """
+    result = await session.exec(
+        update(Tournament)
+        .where(Tournament.tournament_id == tournament_id)
+        .where(Tournament.status == "ongoing")
+        .where(Tournament.current_round == expected_round)
+        .values(current_round=Tournament.current_round + 1, version=Tournament.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def advance_tournament_round(request: Request, tournament: Tournament, session: asyncSessionDep):
     """Advance the tournament to the next round if current round is complete"""
     print(f" Type : {type(tournament.tournament_id)} value: {tournament.tournament_id}")
-    if check_round_completion(tournament.tournament_id, tournament.current_round, session):
-        if tournament.current_round < tournament.total_rounds:
-            # Advance to next round
-            #
-            this_round = session.exec(
-                select(Game_Round).where(
-                    (Game_Round.tournament_id == tournament.tournament_id) &
-                    (Game_Round.round_num == tournament.current_round)
-                )
-            ).first()
-            if this_round:
-                this_round.status = "completed"
-                session.add(this_round)
-            tournament.current_round += 1
-            session.add(tournament)
-            session.commit()
-            session.refresh(tournament)
-            
-            # Create new matches for next round
-            winners = session.exec(
-                select(Match.winner_id).where(
-                    (Match.tournament_id == tournament.tournament_id) &
-                    (Match.round_num == tournament.current_round - 1)
-                )
-            ).all()
-            winner_ids = [w for w in winners]
-            
-            fixtures = start_game(winner_ids, tournament.current_round)
-            match_list = matches(fixtures)
-            for match in match_list:
-                new_match = Match(
-                    tournament_id = tournament.tournament_id,
-                    round_num = match["round"],
-                    team1_id = str(match["team1"]),
-                    team2_id = str(match["team2"]),
-                    team1_score = 0,
-                    team2_score = 0,
-                    winner_id = None,
-                    loser_id = None,
-                    status = "pending"
-                )
-                session.add(new_match)
-
-            round_record = Game_Round(
-                tournament_id = tournament.tournament_id,
-                round_num = tournament.current_round,
-                matches_in_round = len(match_list),
-                status = "ongoing"
+    expected_round = tournament.current_round
+    if await check_round_completion(tournament.tournament_id, expected_round, session):
+        if expected_round < tournament.total_rounds:
+            # Advance to next round, the round change and its fixtures in one transaction
+            if not await claim_round_advance(tournament.tournament_id, expected_round, session):
+                await session.rollback()
+                return {"message": f"Round {expected_round} already advanced"}
+            await session.exec(
+                update(Game_Round)
+                .where(Game_Round.tournament_id == tournament.tournament_id)
+                .where(Game_Round.round_num == expected_round)
+                .values(status="completed")
+                .execution_options(synchronize_session=False)
             )
-            session.add(round_record)
+
+            if tournament.bracket:
+                # the winners are already in their next-round slots
+                match_list = await open_bracket_round(session, tournament.tournament_id, expected_round + 1)
+            else:
+                # Create new matches for next round
+                winners = (await session.exec(
+                    select(Match.winner_id).where(
+                        (Match.tournament_id == tournament.tournament_id) &
+                        (Match.round_num == expected_round)
+                    )
+                )).all()
+                winner_ids = [w for w in winners]
+                
+                fixtures = start_game(winner_ids, expected_round + 1)
+                match_list = matches(fixtures)
+                await insert_round_fixtures(session, tournament.tournament_id, match_list)
+            await queue_fixture_emails(session, tournament, match_list)
             
-            session.commit()
+            await session.commit()
+            await session.refresh(tournament)
+            event_hub.publish(tournament.tournament_id, "round_advanced",
+                              {"round": tournament.current_round, "matches": len(match_list)})
             new_round = templates.TemplateResponse(
                 "round_advance.html", {"request": request, "matches": match_list,
                                        "message": f"Advanced to round {tournament.current_round}"}
             )
             return new_round
          #  check it is the final round 
-        elif tournament.current_round == tournament.total_rounds:
+        elif expected_round == tournament.total_rounds:
             # Tournament completed
-            return complete_tournament(tournament, session)
+            return await complete_tournament(tournament, session)
     
         
         
     else:
         return {"message": "Current round not yet complete"}
     
-def complete_tournament(tournament: Tournament, session: sessionDep):
+async def complete_tournament(tournament: Tournament, session: asyncSessionDep):
     """Mark the tournament as completed"""
-    final_match = session.exec(
+    final_match = (await session.exec(
         select(Match).where(
             (Match.tournament_id == tournament.tournament_id) &
             (Match.round_num == tournament.total_rounds) &
             (Match.status == "completed")
         )
-    ).first()
+    )).first()
     
     if not final_match:
         raise HTTPException(status_code=404, detail="Tournament not found")
     if not final_match.winner_id:
         raise HTTPException(status_code=400, detail="Final match has no winner")
     
-    # Update tournament status with winner
-    tournament.winner_id = final_match.winner_id
-    tournament.status = "completed"
-    session.add(tournament)
-    
-    
+    # Update tournament status with winner, only once: a concurrent request
+    # that got here for the same final finds it no longer ongoing
+    completed = (await session.exec(
+        update(Tournament)
+        .where(Tournament.tournament_id == tournament.tournament_id)
+        .where(Tournament.status == "ongoing")
+        .values(winner_id=final_match.winner_id, status="completed", version=Tournament.version + 1)
+        .execution_options(synchronize_session=False)
+    )).rowcount == 1
+    if not completed:
+        await session.rollback()
+        return {"message": "Tournament already completed", "tournament id": tournament.tournament_id}
 
     # update final round match status
-    final_round = session.exec(
+    final_round = (await session.exec(
         select(Game_Round).where(
             (Game_Round.tournament_id == tournament.tournament_id) &
             (Game_Round.round_num == tournament.total_rounds)
         )
-    ).first()
+    )).first()
     if final_round:
         final_round.status = "completed"
         session.add(final_round)
-    session.commit()
-    session.refresh(tournament)
+    await record_tournament_summary(tournament, final_match, session)
+    await session.commit()
+    await session.refresh(tournament)
+    event_hub.publish(tournament.tournament_id, "tournament_completed",
+                      {"winner_id": tournament.winner_id})
 
     # Get winner details
-    winner = session.get(Player, final_match.winner_id)
-    runner_up = session.get(Player, final_match.loser_id)
+    winner = await session.get(Player, final_match.winner_id)
+    runner_up = await session.get(Player, final_match.loser_id)
     
     # Return tournament results
     return {
@@ -349,76 +642,41 @@ def complete_tournament(tournament: Tournament, session: sessionDep):
                         "team2_score": final_match.team2_score}
     }
 
-def get_tournament_standings(tournament_id: int, session: sessionDep):
+async def get_tournament_standings(tournament_id: int, session: asyncSessionDep):
     """Get complete standings for a tournament"""
-    tournament = session.exec(
+    tournament = (await session.exec(
         select(Tournament).where(Tournament.tournament_id == tournament_id)
-    ).first()
+    )).first()
     
     if not tournament:
         return {"error": "Tournament not found"}
     
-    # Get all completed matches
-    matches = session.exec(
-        select(Match).where(
-            (Match.tournament_id == tournament_id) &
-            (Match.status == "completed")
-        ).order_by(Match.round_num.desc())
-    ).all()
-    
-    # Track team performance
-    team_stats = {}
-    
-    for match in matches:
-        # Winner stats
-        if match.winner_id:
-            winner_str = str(match.winner_id)
-            if winner_str not in team_stats:
-                team_stats[winner_str] = {
-                    "wins": 0,
-                    "losses": 0,
-                    "rounds_reached": match.round_num
-                }
-            team_stats[winner_str]["wins"] += 1
-            team_stats[winner_str]["rounds_reached"] = max(
-                team_stats[winner_str]["rounds_reached"], 
-                match.round_num
-            )
-        
-        # Loser stats
-        if match.loser_id:
-            loser_str = str(match.loser_id)
-            if loser_str not in team_stats:
-                team_stats[loser_str] = {
-                    "wins": 0,
-                    "losses": 0,
-                    "rounds_reached": match.round_num
-                }
-            team_stats[loser_str]["losses"] += 1
-    
-    # Sort by performance (rounds reached, then wins)
-    sorted_teams = sorted(
-        team_stats.items(),
-        key=lambda x: (x[1]["rounds_reached"], x[1]["wins"]),
-        reverse=True
+    # tournament_standing is maintained on every score, so this is one
+    # indexed, already ordered read (see standings.py for the rebuild)
+    statement = (
+        select(TournamentStanding, Player.name)
+        .outerjoin(Player, Player.player_id == TournamentStanding.player_id)
+        .where(TournamentStanding.tournament_id == tournament_id)
+        .order_by(TournamentStanding.rounds_reached.desc(), TournamentStanding.wins.desc())
     )
+    rows = (await session.exec(statement)).all()
+    if not rows:
+        # played before standings were stored: compute them once now
+        await session.exec(insert_standings(tournament_id))
+        await session.commit()
+        rows = (await session.exec(statement)).all()
     
     standings = []
-    for rank, (team_id, stats) in enumerate(sorted_teams, 1):
-        try:
-            player = session.get(Player, int(team_id))
-            team_name = player.name if player else f"Player {team_id}"
-        except:
-            team_name = f"Player {team_id}"
-            
+    for rank, (standing, name) in enumerate(rows, 1):
         standings.append({
             "rank": rank,
-            "team_id": team_id,
-            "team_name": team_name,
-            "wins": stats["wins"],
-            "losses": stats["losses"],
-            "rounds_reached": stats["rounds_reached"],
-            "is_champion": str(team_id) == str(tournament.winner_id) if tournament.winner_id else False
+            "team_id": standing.player_id,
+            "team_name": name if name else f"Player {standing.player_id}",
+            "wins": standing.wins,
+            "losses": standing.losses,
+            "rounds_reached": standing.rounds_reached,
+            "eliminated_in": standing.eliminated_in,
+            "is_champion": standing.player_id == tournament.winner_id
         })
     
     return {
@@ -439,14 +697,32 @@ def create_verification_token() -> str:
 def hash_password(password: str) -> str:
     """Hash the password (placeholder function)"""
     # In production, use a proper hashing algorithm like bcrypt
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+async def run_hashing(fn, *args):
+    """Run a password hash on the hashing pool, 503 when it is saturated"""
+    try:
+        return await hashing_pool.run(fn, *args)
+    except HashingPoolFull:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            detail="Server busy, please try again",
+                            headers={"Retry-After": "1"})
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the hashing pool"""
+    return await run_hashing(hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the hashing pool"""
+    return await run_hashing(verify_password, plain_password, hashed_password)
 
 #client = mt.MailtrapClient(token=MAILTRAP_API, sandbox=True, inbox_id=4328972)
-def send_verification_email_task(email: str, token: str, name: str):
+def queue_verification_email(session: asyncSessionDep, email: str, token: str, name: str):
+    """Add the verification email to the session's transaction, see outbox.py"""
     verification_link = f"{base_url}/verify-email?token={token}"
     
     html_body = f"""
@@ -466,56 +742,42 @@ def send_verification_email_task(email: str, token: str, name: str):
         </body>
     </html>
     """
-    
-    resend.api_key=RESEND_API   # Must save it to resend.api_key   
-    
-    try:
-        print(f"Sending message to {email}....")
-        resend.Emails.send({
-            "from": "Jidalli <onboarding@resend.dev>",  # Free tier uses resend.dev
-            "to": [email],
-            "subject": "Verify your email - Jidalli Tournament Manager",
-            "html": html_body
-        })
-        
-        print(f"✓ Email sent to {email}: Status: OK")
-    except Exception as e:
-        print(f"✗ Failed to send email to {email}: {e}")
+    enqueue_email(session, email, "Verify your email - Jidalli Tournament Manager", html_body)
 
-def send_verification_email(email: str, token: str, name: str, background_tasks: BackgroundTasks):
-    background_tasks.add_task(send_verification_email_task,email,token, name)
 
+async def queue_fixture_emails(session: asyncSessionDep, tournament: Tournament, match_list: list[dict]):
+    """Tell every entrant of a new round who they play, through the outbox"""
+    player_ids = [m[team] for m in match_list for team in ("team1", "team2")]
+    players = {
+        player_id: (name, email)
+        for player_id, name, email in (await session.exec(
+            select(Player.player_id, Player.name, Player.email).where(Player.player_id.in_(player_ids))
+        )).all()
+    }
+    emails = []
+    for match in match_list:
+        for team, opponent in (("team1", "team2"), ("team2", "team1")):
+            name, email = players[match[team]]
+            if not email:
+                continue
+            opponent_name = players[match[opponent]][0]
+            emails.append({
+                "to_email": email,
+                "subject": f"{tournament.name}: your round {match['round']} match",
+                "html": f"""
+    <html>
+        <body style="font-family: Arial, sans-serif; padding: 20px;">
+            <h2 style="color: #27ae60;">{tournament.name} - Round {match['round']}</h2>
+            <p>Hello {name},</p>
+            <p>You are through! Your next match is <strong>Match {match['match_num']}</strong>
+               against <strong>{opponent_name}</strong>.</p>
+            <p><a href="{base_url}/tournaments/{tournament.tournament_id}">View the bracket</a></p>
+        </body>
+    </html>
+    """,
+            })
+    await enqueue_emails(session, emails)
 
-def send_email(to_email: str, subject: str, body: str, background_tasks:BackgroundTasks):
-    """Send an email (placeholder function)"""
-    if not EMAILS_ENABLED:
-        print("Email sending is disabled.")
-    
-    """ Send mail in the background    """
-    def _send():
-        try:
-            # Here you would integrate with an actual email sending service
-            msg= MIMEMultipart()
-            msg['From']= FROM_EMAIL
-            msg['To']= to_email
-            msg['Subject']= subject
-            msg.attach(MIMEText(body, 'html'))
-
-            with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-                server.set_debuglevel(1)
-                server.ehlo()
-                if MAIL_STARTTLS:
-                    server.starttls()
-                    server.ehlo()
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.send_message(msg)
-            print(f"Email sent to {to_email}")
-        except Exception as e:
-            print(f"Failed to send email to {to_email}: {e}")
-    background_tasks.add_task(_send)
-    #_send()  # For testing purposes, send immediately
-    # Here you would integrate with an actual email sending service
-    print(f"Sending email to {to_email}:\nSubject: {subject}\n\n{body}")
 
 # Disable this to use email api above cos render.com blocks smtp ports
 #def send_verification_email(to_email: str, token: str, full_name: str, background_tasks:BackgroundTasks):
@@ -543,6 +805,7 @@ def send_email(to_email: str, subject: str, body: str, background_tasks:Backgrou
 
 def create_access_token(data: dict, expires_delta:timedelta | None = None):
     """Create a JWT access token"""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -554,12 +817,14 @@ def create_access_token(data: dict, expires_delta:timedelta | None = None):
 
 def create_refresh_token(data: dict, expires_delta:timedelta | None = None):
     """Create a JWT refresh token"""
+    from jose import jwt
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    # jti keeps two tokens issued in the same second distinct
+    to_encode.update({"exp": expire, "type": "refresh", "jti": secrets.token_urlsafe(16)})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -567,29 +832,40 @@ def create_refresh_token(data: dict, expires_delta:timedelta | None = None):
 # ============ ENDPOINT ROUTES ============
 
 @app.get("/", response_class=HTMLResponse)
-async def home(request: Request, session: sessionDep):
-    """Homepage - list all tournaments"""
-    tournaments = session.exec(select(Tournament)).all()
+async def home(request: Request, session: asyncSessionDep,
+               before: int | None = None, limit: PageSize = DEFAULT_PAGE_SIZE):
+    """Homepage - list tournaments, newest first, a page at a time"""
+    tournaments, next_cursor = await keyset_page(
+        session,
+        select(Tournament.tournament_id, Tournament.name, Tournament.status,
+               Tournament.number_of_teams, Tournament.current_round, Tournament.total_rounds),
+        Tournament.tournament_id, before, limit, descending=True
+    )
     return templates.TemplateResponse(
         "index.html",
-        {"request": request, "tournaments": tournaments}
+        {"request": request, "tournaments": tournaments,
+         "next_cursor": next_cursor, "first_page": before is None}
     )
     
 @app.post("/players/", response_model=PlayerRead)
-def create_player(player: PlayerCreate, session: sessionDep, current_user: CurrentActiveUserDep):
+async def create_player(player: PlayerCreate, session: asyncSessionDep, current_user: CurrentActiveUserDep):
     db_player = Player.model_validate(player)
     session.add(db_player)
-    session.commit()
-    session.refresh(db_player)
+    await session.commit()
+    await session.refresh(db_player)
     return {"player": db_player, "user": current_user}
 
 
-@app.post("/tournaments/")
-def create_tournament(tournament: TournamentCreate, session: sessionDep, current_user: CurrentActiveUserDep):
+@app.post("/tournaments/", response_class=FastJSONResponse)
+async def create_tournament(tournament: TournamentCreate, session: asyncSessionDep, current_user: CurrentActiveUserDep):
     """Initialize a new tournament - create Game records for all players in round 1"""
+    return FastJSONResponse(await initialize_tournament(tournament, session, current_user))
+
+async def initialize_tournament(tournament: TournamentCreate, session: asyncSessionDep, current_user: Principal) -> dict:
+    """Create the tournament and its round 1 fixtures, or return {"error": ...}"""
     
     # Get all players
-    players = session.exec(select(Player)).all()
+    players = (await session.exec(select(Player))).all()
     
     if not players:
         return {"error": "No players in database"}
@@ -598,7 +874,7 @@ def create_tournament(tournament: TournamentCreate, session: sessionDep, current
     if (len(players) & (len(players) - 1)) != 0:
         return {"error": "Number of players must be a power of 2"}
 
-    existing = session.exec(select(Tournament).where(Tournament.name == tournament.name)).first()
+    existing = (await session.exec(select(Tournament).where(Tournament.name == tournament.name))).first()
     if existing:
         return {"error": "Tournament with this name already exists"}
     
@@ -610,98 +886,137 @@ def create_tournament(tournament: TournamentCreate, session: sessionDep, current
         status = "ongoing",
         number_of_teams = len(players),
         current_round = 1,
-        total_rounds = total_rounds
+        total_rounds = total_rounds,
+        bracket = tournament.bracket
     )
     session.add(tournament)
-    session.flush()  # Ensure tournament_id is generated
+    await session.flush()  # Ensure tournament_id is generated
          
     fixtures = start_game([player.player_id for player in players], 1)     
     match_list = matches(fixtures)
-    for match in match_list:
-        new_match = Match(
-            tournament_id = tournament.tournament_id,
-            round_num = match["round"],
-            team1_id = str(match["team1"]),
-            team2_id = str(match["team2"]),
-            team1_score = 0,
-            team2_score = 0,
-            winner_id = None,
-            loser_id = None,
-            status = "pending"
-        )
-        session.add(new_match)
-
-    round_record = Game_Round(
-        tournament_id = tournament.tournament_id,
-        round_num = 1,
-        matches_in_round = len(match_list),
-        status = "ongoing"
-    )
-    session.add(round_record)
+    if tournament.bracket:
+        round_record = (await create_bracket(session, tournament.tournament_id, match_list, total_rounds))[0]
+    else:
+        round_record = await insert_round_fixtures(session, tournament.tournament_id, match_list)
     
-    session.commit()
+    await session.commit()
     return { "tournament": tournament,
              "matches": match_list,
              "round_record": round_record,
              "user": current_user
              }
 
-@app.get("/tournaments/{tournament_id}/matches/")
-def get_tournament_matches(tournament_id: int, session: sessionDep):
-    """Retrieve all matches for a given tournament"""
-    matches = session.exec(
-        select(Match).where(Match.tournament_id == tournament_id)
-    ).all()
-    completed = [m for m in matches if m.status == "completed"]
-    pending = [m for m in matches if m.status == "pending"]
-    return {"matches": completed, "pending": len(pending)}
-
-@app.get("/tournaments/{tournament_id}/current-matches/")
-def get_current_matches(tournament_id: int, session: sessionDep):
-    """Retrieve all current matches for a given tournament"""
-    matches = session.exec(
-        select(Match).where(Match.tournament_id == tournament_id)
-    ).all()
-    pending = [m for m in matches if m.status == "pending"]
-    return {"pending matches": pending}
+# plain rows instead of Match objects for the JSON lists
+MATCH_COLUMNS = tuple(Match.__table__.columns)
+
+@app.get("/tournaments/{tournament_id}/matches/", response_class=FastJSONResponse)
+async def get_tournament_matches(tournament_id: int, session: asyncSessionDep,
+                                 after: int | None = None, limit: PageSize = DEFAULT_PAGE_SIZE):
+    """Retrieve the completed matches of a tournament, a page at a time"""
+    completed, next_cursor = await keyset_page(
+        session,
+        select(*MATCH_COLUMNS).where(Match.tournament_id == tournament_id).where(Match.status == "completed"),
+        Match.match_id, after, limit
+    )
+    pending = (await session.exec(
+        select(func.count()).select_from(Match)
+        .where(Match.tournament_id == tournament_id).where(Match.status == "pending")
+    )).one()
+    return FastJSONResponse({"matches": [row._asdict() for row in completed], "pending": pending,
+                             "next_cursor": next_cursor})
+
+@app.get("/tournaments/{tournament_id}/current-matches/", response_class=FastJSONResponse)
+async def get_current_matches(tournament_id: int, session: asyncSessionDep,
+                              after: int | None = None, limit: PageSize = DEFAULT_PAGE_SIZE):
+    """Retrieve the pending matches of a tournament, a page at a time"""
+    pending, next_cursor = await keyset_page(
+        session,
+        select(*MATCH_COLUMNS).where(Match.tournament_id == tournament_id).where(Match.status == "pending"),
+        Match.match_id, after, limit
+    )
+    return FastJSONResponse({"pending matches": [row._asdict() for row in pending], "next_cursor": next_cursor})
 
 
 
 @app.post("/tournaments/{tournament_id}/matches/{id}/score/")
-def update_match_score(request:Request,
+async def update_match_score(request:Request,
                        team1_score: Annotated[int, Form()], 
                        team2_score: Annotated[int, Form()], 
-                       session: sessionDep,
+                       session: asyncSessionDep,
                        match: Annotated[Match, Depends(verify_match_belongs_to_tournament)],
                        current_user: CurrentActiveUserDep
                        ):
     """Update the score of a match and determine winner/loser"""
     
-    # update scores
-    match.team1_score = team1_score
-    match.team2_score = team2_score
-    
     if team1_score > team2_score:
-        match.winner_id = int(match.team1_id)
-        match.loser_id = int(match.team2_id)
+        winner_id, loser_id = match.team1_id, match.team2_id
     elif team2_score > team1_score:
-        match.winner_id = int(match.team2_id)
-        match.loser_id = int(match.team1_id)
+        winner_id, loser_id = match.team2_id, match.team1_id
     else:
         raise HTTPException(status_code=400, detail="Match cannot end in a tie")
-    
-    match.status = "completed"
-    session.add(match)
-    session.commit()
-    session.refresh(match)
+
+    # update scores, only if the match is still pending: two referees
+    # sending the same result must not count it twice
+    updated = (await session.exec(
+        update(Match)
+        .where(Match.match_id == match.match_id)
+        .where(Match.status == "pending")
+        .values(team1_score=team1_score, team2_score=team2_score,
+                winner_id=winner_id, loser_id=loser_id, status="completed")
+        .execution_options(synchronize_session=False)
+    )).rowcount
+    if updated != 1:
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Match already completed")
+
+    # one match fewer left in the round, decremented in the same transaction
+    pending_matches = (await session.exec(
+        update(Game_Round)
+        .where(Game_Round.tournament_id == match.tournament_id)
+        .where(Game_Round.round_num == match.round_num)
+        .values(pending_matches=Game_Round.pending_matches - 1)
+        .returning(Game_Round.pending_matches)
+    )).scalar_one_or_none()
+
+    # keep the standings read model in step with the result
+    await session.exec(
+        update(TournamentStanding)
+        .where(TournamentStanding.tournament_id == match.tournament_id)
+        .where(TournamentStanding.player_id == winner_id)
+        .values(wins=TournamentStanding.wins + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(
+        update(TournamentStanding)
+        .where(TournamentStanding.tournament_id == match.tournament_id)
+        .where(TournamentStanding.player_id == loser_id)
+        .values(losses=TournamentStanding.losses + 1, eliminated_in=match.round_num)
+        .execution_options(synchronize_session=False)
+    )
+    if match.parent_match_id is not None:
+        await propagate_winners(session, match.tournament_id, [{
+            "parent_match_id": match.parent_match_id, "parent_slot": match.parent_slot,
+            "winner_id": winner_id, "round_num": match.round_num,
+        }])
+    await bump_tournament_version(match.tournament_id, session)
+    await session.commit()
+    await session.refresh(match)
+    event_hub.publish(match.tournament_id, "match_completed", {
+        "match_id": match.match_id,
+        "round": match.round_num,
+        "team1_score": match.team1_score,
+        "team2_score": match.team2_score,
+        "winner_id": match.winner_id,
+        "parent_match_id": match.parent_match_id,
+    })
     
     # check if round is complete and advance tournament if needed
-    check_round = check_round_completion(match.tournament_id, match.round_num, session)
+    check_round = pending_matches == 0
     if check_round:
-        tournament = session.get(Tournament, match.tournament_id)
+        tournament = await session.get(Tournament, match.tournament_id)
         if tournament:
             # capturing this to result makes me get the return value from advance_tournament_round
-            result = advance_tournament_round(request, tournament, session)
+            result = await advance_tournament_round(request, tournament, session)
             
         return result
     
@@ -712,25 +1027,136 @@ def update_match_score(request:Request,
     )
 
 
+@app.post("/tournaments/{tournament_id}/results/", response_class=FastJSONResponse)
+async def submit_round_results(request: Request,
+                               tournament_id: int,
+                               results: list[MatchScore],
+                               session: asyncSessionDep,
+                               current_user: CurrentActiveUserDep
+                               ):
+    """Record several results of the current round at once
 
-# ============ TEMPLATE ROUTES ============
+    Everything is checked before anything is written, then all matches,
+    the round's pending count and the standings are updated in a single
+    transaction, and the round is advanced at most once.
+    """
+    if not results:
+        raise HTTPException(status_code=400, detail="No results given")
+    match_ids = [result.match_id for result in results]
+    if len(set(match_ids)) != len(match_ids):
+        raise HTTPException(status_code=400, detail="A match appears more than once")
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request, session: sessionDep):
-    """Homepage - list all tournaments"""
-    tournaments = session.exec(select(Tournament)).all()
-    return templates.TemplateResponse(
-        "index.html",
-        {"request": request, "tournaments": tournaments}
+    tournament = (await session.exec(
+        select(Tournament).where(Tournament.status == 'ongoing')
+        .where(Tournament.tournament_id == tournament_id)
+    )).first()
+    if not tournament:
+        raise HTTPException(status_code=400, detail="No active tournament found")
+    current_round = tournament.current_round
+
+    found = {
+        row.match_id: row
+        for row in (await session.exec(
+            select(Match.match_id, Match.team1_id, Match.team2_id, Match.round_num, Match.status,
+                   Match.parent_match_id, Match.parent_slot)
+            .where(Match.tournament_id == tournament_id).where(Match.match_id.in_(match_ids))
+        )).all()
+    }
+    rows, advancing = [], []
+    for result in results:
+        if result.match_id not in found:
+            raise HTTPException(status_code=404, detail=f"Match {result.match_id} not found in this tournament")
+        match = found[result.match_id]
+        if match.status == "completed":
+            raise HTTPException(status_code=400, detail=f"Match {result.match_id} already completed")
+        if match.round_num != current_round:
+            raise HTTPException(status_code=400,
+                    detail=f"Can only update matches in round {current_round}")
+        if result.team1_score == result.team2_score:
+            raise HTTPException(status_code=400, detail=f"Match {result.match_id} cannot end in a tie")
+        winner_id, loser_id = ((match.team1_id, match.team2_id) if result.team1_score > result.team2_score
+                               else (match.team2_id, match.team1_id))
+        rows.append({"b_match_id": result.match_id, "b_team1_score": result.team1_score,
+                     "b_team2_score": result.team2_score, "b_winner_id": winner_id, "b_loser_id": loser_id})
+        if match.parent_match_id is not None:
+            advancing.append({"parent_match_id": match.parent_match_id, "parent_slot": match.parent_slot,
+                              "winner_id": winner_id, "round_num": match.round_num})
+
+    # one executemany, conditional on status like the single score route
+    match_table = Match.__table__
+    updated = (await session.exec(
+        update(match_table)
+        .where(match_table.c.match_id == bindparam("b_match_id"))
+        .where(match_table.c.status == "pending")
+        .values(team1_score=bindparam("b_team1_score"), team2_score=bindparam("b_team2_score"),
+                winner_id=bindparam("b_winner_id"), loser_id=bindparam("b_loser_id"), status="completed"),
+        params=rows
+    )).rowcount
+    if updated != len(rows):
+        await session.rollback()
+        raise HTTPException(status_code=409, detail="Some of these matches were completed meanwhile")
+
+    pending_matches = (await session.exec(
+        update(Game_Round)
+        .where(Game_Round.tournament_id == tournament_id)
+        .where(Game_Round.round_num == current_round)
+        .values(pending_matches=Game_Round.pending_matches - len(rows))
+        .returning(Game_Round.pending_matches)
+    )).scalar_one_or_none()
+
+    # a player is in one match per round, so one UPDATE for winners and one for losers
+    await session.exec(
+        update(TournamentStanding)
+        .where(TournamentStanding.tournament_id == tournament_id)
+        .where(TournamentStanding.player_id.in_([row["b_winner_id"] for row in rows]))
+        .values(wins=TournamentStanding.wins + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await session.exec(
+        update(TournamentStanding)
+        .where(TournamentStanding.tournament_id == tournament_id)
+        .where(TournamentStanding.player_id.in_([row["b_loser_id"] for row in rows]))
+        .values(losses=TournamentStanding.losses + 1, eliminated_in=current_round)
+        .execution_options(synchronize_session=False)
     )
+    if advancing:
+        await propagate_winners(session, tournament_id, advancing)
+    await bump_tournament_version(tournament_id, session)
+    await session.commit()
+    for row in rows:
+        event_hub.publish(tournament_id, "match_completed", {
+            "match_id": row["b_match_id"],
+            "round": current_round,
+            "team1_score": row["b_team1_score"],
+            "team2_score": row["b_team2_score"],
+            "winner_id": row["b_winner_id"],
+            "parent_match_id": found[row["b_match_id"]].parent_match_id,
+        })
+
+    content = {"updated": len(rows), "round": current_round, "pending": pending_matches}
+    if pending_matches == 0:
+        await session.refresh(tournament)
+        result = await advance_tournament_round(request, tournament, session)
+        content["advancement"] = (result if isinstance(result, dict)
+                                  else {"message": f"Advanced to round {tournament.current_round}"})
+    return FastJSONResponse(content)
+
+
+
+# ============ TEMPLATE ROUTES ============
+
 
 @app.get("/players/", response_class=HTMLResponse)
-async def list_players(request: Request, session: sessionDep):
-    """List all players"""
-    players = session.exec(select(Player)).all()
+async def list_players(request: Request, session: asyncSessionDep,
+                       after: int | None = None, limit: PageSize = DEFAULT_PAGE_SIZE):
+    """List players, a page at a time"""
+    players, next_cursor = await keyset_page(
+        session, select(Player.player_id, Player.name, Player.email), Player.player_id, after, limit
+    )
     return templates.TemplateResponse(
         "players.html",
-        {"request": request, "players": players}
+        {"request": request, "players": players,
+         "next_cursor": next_cursor, "first_page": after is None}
     )
 
 @app.get("/players/create", response_class=HTMLResponse)
@@ -747,12 +1173,12 @@ async def create_player_from_form(
     request: Request,
     name: Annotated[str, Form()],
     email: Annotated[str, Form()],
-    session: sessionDep,
+    session: asyncSessionDep,
     current_user: CurrentActiveUserDep
 ):
     """Handle player creation from HTML form"""
     player_data = PlayerCreate(name=name, email=email)
-    db_player = create_player(player_data, session, current_user)
+    db_player = await create_player(player_data, session, current_user)
 
     return RedirectResponse(
         url="/players/",
@@ -773,12 +1199,13 @@ async def create_tournament_form(request: Request, current_user: CurrentActiveUs
 async def create_tournament_from_form(
     request: Request,
     name: Annotated[str, Form()],
-    session: sessionDep,
-    current_user: CurrentActiveUserDep
+    session: asyncSessionDep,
+    current_user: CurrentActiveUserDep,
+    bracket: Annotated[bool, Form()] = False
 ):
     """Handle tournament creation from HTML form"""
-    tournament_data = TournamentCreate(name=name)
-    result = create_tournament(tournament_data, session, current_user)
+    tournament_data = TournamentCreate(name=name, bracket=bracket)
+    result = await initialize_tournament(tournament_data, session, current_user)
 
     if "error" in result:
         return templates.TemplateResponse(
@@ -792,52 +1219,91 @@ async def create_tournament_from_form(
     )
 
 
+async def streamed_page(page: str, tournament: Tournament, template: str, context):
+    """Serve a cached page, or stream the render and cache it once complete
+
+    The queries run before the response starts, so a database error is
+    still a proper error response. Concurrent misses each render; unlike
+    get_or_render there is no single flight.
+    """
+    html = page_cache.get(page, tournament.tournament_id, tournament.version)
+    if html is not None:
+        return HTMLResponse(html)
+    ctx = await context()
+
+    async def body():
+        parts = []
+        async for chunk in stream_template(streaming_templates, template, ctx):
+            parts.append(chunk)
+            yield chunk
+        page_cache.put(page, tournament.tournament_id, tournament.version, "".join(parts))
+
+    return StreamingResponse(body(), media_type="text/html")
+
+
 @app.get("/tournaments/{tournament_id}", response_class=HTMLResponse)
 async def tournament_bracket_view(
     request: Request, 
     tournament_id: int, 
-    session: sessionDep
+    session: asyncSessionDep
 ):
     """Tournament bracket view with all matches"""
-    tournament = session.get(Tournament, tournament_id)
+    tournament = await session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
-    # Get all matches for this tournament
-    matches = session.exec(
-        select(Match).where(Match.tournament_id == tournament_id)
-        .order_by(Match.round_num)
-    ).all()
-    
-    # Group matches by round
-    matches_by_round = {}
-    for match in matches:
-        if match.round_num not in matches_by_round:
-            matches_by_round[match.round_num] = []
-        matches_by_round[match.round_num].append(match)
-    
-    # Get all players
-    player_ids = set()
-    for match in matches:
-        if match.team1_id:
-            player_ids.add(int(match.team1_id))
-        if match.team2_id:
-            player_ids.add(int(match.team2_id))
-    
-    players_list = session.exec(
-        select(Player).where(Player.player_id.in_(player_ids))
-    ).all()
-    
-    players = {str(p.player_id): p for p in players_list}
-    
-    return templates.TemplateResponse(
-        "tournament_bracket.html",
-        {
+    async def context() -> dict:
+        # Get all matches for this tournament with both player names in one query,
+        # bracket slots still waiting for a team (TBD) included
+        team1 = aliased(Player)
+        team2 = aliased(Player)
+        rows = (await session.exec(
+            select(Match, team1.name, team2.name)
+            .outerjoin(team1, Match.team1_id == team1.player_id)
+            .outerjoin(team2, Match.team2_id == team2.player_id)
+            .where(Match.tournament_id == tournament_id)
+            .order_by(Match.round_num, Match.match_id)
+        )).all()
+        
+        # Group matches by round, player names keyed by player_id
+        matches_by_round = {}
+        players = {}
+        for match, team1_name, team2_name in rows:
+            if match.round_num not in matches_by_round:
+                matches_by_round[match.round_num] = []
+            matches_by_round[match.round_num].append(match)
+            players[match.team1_id] = team1_name
+            players[match.team2_id] = team2_name
+        
+        return {
             "request": request,
             "tournament": tournament,
             "matches_by_round": matches_by_round,
             "players": players
         }
+
+    if STREAM_TEMPLATES:
+        return await streamed_page("bracket", tournament, "tournament_bracket.html", context)
+
+    async def render() -> str:
+        return templates.get_template("tournament_bracket.html").render(await context())
+    
+    html = await page_cache.get_or_render("bracket", tournament_id, tournament.version, render)
+    return HTMLResponse(html)
+
+
+@app.get("/tournaments/{tournament_id}/events")
+async def tournament_events(tournament_id: int):
+    """Server-Sent Events stream of results for the live bracket page"""
+    # short-lived session: a dependency would hold a pooled connection
+    # for as long as the spectator stays connected
+    async with async_session_maker() as session:
+        if not await session.get(Tournament, tournament_id):
+            raise HTTPException(status_code=404, detail="Tournament not found")
+    return StreamingResponse(
+        event_hub.stream(tournament_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
@@ -845,23 +1311,29 @@ async def tournament_bracket_view(
 async def tournament_standings_view(
     request: Request, 
     tournament_id: int, 
-    session: sessionDep
+    session: asyncSessionDep
 ):
     """Tournament standings page"""
-    tournament = session.get(Tournament, tournament_id)
+    tournament = await session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
-    result = get_tournament_standings(tournament_id, session)
-    
-    return templates.TemplateResponse(
-        "standings.html",
-        {
+    async def context() -> dict:
+        result = await get_tournament_standings(tournament_id, session)
+        return {
             "request": request,
             "tournament": tournament,
             "standings": result.get("standings", [])
         }
-    )
+
+    if STREAM_TEMPLATES:
+        return await streamed_page("standings", tournament, "standings.html", context)
+
+    async def render() -> str:
+        return templates.get_template("standings.html").render(await context())
+    
+    html = await page_cache.get_or_render("standings", tournament_id, tournament.version, render)
+    return HTMLResponse(html)
 
 
 @app.get("/tournaments/{tournament_id}/matches/{id}/score", response_class=HTMLResponse)
@@ -869,15 +1341,15 @@ async def match_score_form(
     request: Request,
     tournament_id: int,
     id: int,
-    session: sessionDep,
+    session: asyncSessionDep,
     current_user: CurrentUserDep
 ):
     """Show form to enter match score"""
-    match = verify_match_belongs_to_tournament(id, tournament_id, session)
+    match = await verify_match_belongs_to_tournament(id, tournament_id, session)
     
-    tournament = session.get(Tournament, match.tournament_id)
-    team1 = session.get(Player, int(match.team1_id)) if match.team1_id else None
-    team2 = session.get(Player, int(match.team2_id)) if match.team2_id else None
+    tournament = await session.get(Tournament, match.tournament_id)
+    team1 = await session.get(Player, match.team1_id) if match.team1_id else None
+    team2 = await session.get(Player, match.team2_id) if match.team2_id else None
     
     return templates.TemplateResponse(
         "complete_match.html",
@@ -900,17 +1372,17 @@ async def submit_match_score_from_form(
     team1_score: Annotated[int, Form()],
     team2_score: Annotated[int, Form()],
     winner: Annotated[str, Form()],
-    session: sessionDep,
+    session: asyncSessionDep,
     current_user: CurrentUserDep
 ):
     """Handle match score submission from HTML form"""
-    match = verify_match_belongs_to_tournament(id, tournament_id, session)
+    match = await verify_match_belongs_to_tournament(id, tournament_id, session)
     
     # Update the match using existing function
-    result = update_match_score(team1_score, team2_score, session, match)
+    result = await update_match_score(request, team1_score, team2_score, session, match, current_user)
     
     # Check if tournament completed
-    if result and "Tournament completed" in result.get("message", ""):
+    if isinstance(result, dict) and "Tournament completed" in result.get("message", ""):
         return RedirectResponse(
             url=f"/tournaments/{tournament_id}/winner",
             status_code=303
@@ -926,10 +1398,10 @@ async def submit_match_score_from_form(
 async def tournament_winner_view(
     request: Request,
     tournament_id: int,
-    session: sessionDep
+    session: asyncSessionDep
 ):
     """Tournament winner celebration page"""
-    tournament = session.get(Tournament, tournament_id)
+    tournament = await session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
     
@@ -939,43 +1411,97 @@ async def tournament_winner_view(
             status_code=303
         )
     
-    winner = session.get(Player, tournament.winner_id) if tournament.winner_id else None
-    
-    # Get final match
-    final_match = session.exec(
-        select(Match).where(
-            (Match.tournament_id == tournament_id) &
-            (Match.round_num == tournament.total_rounds)
+    async def render() -> str:
+        # statistics were stored by complete_tournament, names come from one join
+        winner = aliased(Player)
+        runner_up = aliased(Player)
+        statement = (
+            select(TournamentSummary, winner.name, runner_up.name)
+            .select_from(TournamentSummary)
+            .outerjoin(winner, winner.player_id == tournament.winner_id)
+            .outerjoin(runner_up, runner_up.player_id == TournamentSummary.runner_up_id)
+            .where(TournamentSummary.tournament_id == tournament_id)
         )
-    ).first()
-    
-    runner_up = session.get(Player, final_match.loser_id) if (final_match and final_match.loser_id) else None
-    
-    # Get tournament stats
-    all_matches = session.exec(
-        select(Match).where(
-            (Match.tournament_id == tournament_id) &
-            (Match.status == "completed")
+        row = (await session.exec(statement)).first()
+        if row is None:
+            # completed before summaries were stored: compute it once now
+            final_match = (await session.exec(
+                select(Match).where(
+                    (Match.tournament_id == tournament_id) &
+                    (Match.round_num == tournament.total_rounds)
+                )
+            )).first()
+            if not final_match:
+                raise HTTPException(status_code=404, detail="Final match not found")
+            await record_tournament_summary(tournament, final_match, session)
+            await session.commit()
+            row = (await session.exec(statement)).first()
+        summary, winner_name, runner_up_name = row
+        
+        return templates.get_template("winner.html").render(
+            {
+                "request": request,
+                "tournament": tournament,
+                "summary": summary,
+                "winner_name": winner_name,
+                "runner_up_name": runner_up_name
+            }
         )
-    ).all()
     
-    total_matches = len(all_matches)
-    total_points = sum(m.team1_score + m.team2_score for m in all_matches)
-    
-    return templates.TemplateResponse(
-        "winner.html",
-        {
-            "request": request,
-            "tournament": tournament,
-            "winner": winner,
-            "runner_up": runner_up,
-            "final_match": final_match,
-            "total_matches": total_matches,
-            "total_points": total_points
-        }
-    )
+    html = await page_cache.get_or_render("winner", tournament_id, tournament.version, render)
+    return HTMLResponse(html)
+
+
+@app.get("/assets/{filename}")
+async def static_asset(request: Request, filename: str):
+    """Fingerprinted CSS/JS, precompressed and cached forever, see assets.py"""
+    return assets.response(request, filename)
+
+
+
+#================= ADMIN ROUTES ================
+
+@app.get("/admin/page-cache")
+async def page_cache_stats(current_user: AdminUserDep):
+    """Hit/miss counters of the rendered page cache"""
+    return page_cache.stats()
+
+
+@app.get("/admin/events")
+async def event_hub_stats(current_user: AdminUserDep):
+    """Subscriber and delivery counters of the live bracket events"""
+    return event_hub.stats()
+
+
+@app.get("/admin/auth-cache")
+async def auth_cache_stats(current_user: AdminUserDep):
+    """Hit/miss counters of the verified token cache"""
+    return token_cache.stats()
+
+
+@app.get("/admin/hashing")
+async def hashing_pool_stats(current_user: AdminUserDep):
+    """Queue depth and rejections of the password hashing pool"""
+    return hashing_pool.stats()
+
+
+@app.post("/admin/refresh-tokens/prune")
+async def prune_refresh_tokens_now(current_user: AdminUserDep, session: asyncSessionDep):
+    """Delete expired refresh tokens and revoked ones past retention"""
+    return {"deleted": await prune_refresh_tokens(session)}
+
+
+@app.get("/admin/token-sweeper")
+async def token_sweeper_stats(current_user: AdminUserDep):
+    """Rows deleted and time spent by the periodic token sweep"""
+    return token_sweeper.stats()
 
 
+@app.post("/admin/token-sweeper/run")
+async def run_token_sweeper(current_user: AdminUserDep):
+    """Sweep now instead of waiting for the next interval"""
+    return await token_sweeper.sweep_once()
+
 
 #================= JWT AUTHENTICATION ROUTES ================
 
@@ -988,8 +1514,7 @@ async def register_user_from_form(
     full_name: Annotated[str, Form()],
     password: Annotated[str, Form()],
     confirm_password: Annotated[str, Form()],
-    session: sessionDep,
-    background_tasks: BackgroundTasks
+    session: asyncSessionDep
 ):
     """Handle user registration from HTML form"""
     
@@ -1004,15 +1529,15 @@ async def register_user_from_form(
         )
 
     """Register a new user"""
-    existing_user = session.exec(
+    existing_user = (await session.exec(
         select(User).where(User.username == username.lower())
-    ).first()
+    )).first()
     if existing_user:
         raise HTTPException(status_code=400, detail="Username already registered")
     
-    existing_email = session.exec(
+    existing_email = (await session.exec(
         select(User).where(User.email == email)
-    ).first()
+    )).first()
     if existing_email:
         raise HTTPException(status_code=400, detail="Email already registered")
     
@@ -1021,13 +1546,13 @@ async def register_user_from_form(
         username=username.lower(),
         email=email,
         full_name=full_name,
-        password=hash_password(password),
+        password=await hash_password_async(password),
         is_active = False,
         is_verified = False
     )
     session.add(db_user)
-    session.flush()
-    session.refresh(db_user)
+    await session.flush()
+    await session.refresh(db_user)
     print(f"Created user: {db_user.username} with ID {db_user.user_id}")
     
     # Here you would send a verification email with the token
@@ -1040,11 +1565,11 @@ async def register_user_from_form(
         expires_at = datetime.utcnow() + timedelta(hours=int(VERIFICATION_TOKEN_EXPIRE_HOURS))
     )
     session.add(verification)
-    session.commit()
+    # the email is committed together with the user and the token
+    queue_verification_email(session, db_user.email, verification_token, db_user.full_name)
+    await session.commit()
     print(f" created verification token record for user ID {verification.user_id}")
 
-
-    send_verification_email(db_user.email, verification_token, db_user.full_name, background_tasks)
     # Show success page
     return templates.TemplateResponse(
         "register_success.html",
@@ -1121,7 +1646,7 @@ def verify_email(request: Request, token: str, session: sessionDep):
     )
 
 @app.get("/resend-verification", response_class=HTMLResponse)
-async def resend_verification_page(request: Request, session: sessionDep, background_tasks: BackgroundTasks):
+async def resend_verification_page(request: Request, session: asyncSessionDep, background_tasks: BackgroundTasks):
     """Show form to resend verification email"""
     if request.method == "POST":
         form = await request.form()
@@ -1130,9 +1655,9 @@ async def resend_verification_page(request: Request, session: sessionDep, backgr
         
         # Logic to resend verification email goes here
         # ...
-        db_user = session.exec(
+        db_user = (await session.exec(
             select(User).where(User.email == email)
-        ).first()
+        )).first()
         if not db_user:
             return templates.TemplateResponse(
                 "resend_verification.html",
@@ -1158,11 +1683,10 @@ async def resend_verification_page(request: Request, session: sessionDep, backgr
             expires_at = datetime.utcnow() + timedelta(hours=int(VERIFICATION_TOKEN_EXPIRE_HOURS))
         )
         session.add(verification)
-        session.commit()
-        session.refresh(db_user)
+        queue_verification_email(session, db_user.email, verification_token, db_user.full_name)
+        await session.commit()
+        await session.refresh(db_user)
         
-
-        send_verification_email(db_user.email, verification_token, db_user.full_name, background_tasks)
         # Show success page
         return templates.TemplateResponse(
             "register_success.html",
@@ -1182,16 +1706,16 @@ async def resend_verification_page(request: Request, session: sessionDep, backgr
 
 
 @app.post("/login", response_model=Token)
-def login_for_access_token(session: sessionDep,
-                           response: Response,
-                           form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(session: asyncSessionDep,
+                                 response: Response,
+                                 form_data: OAuth2PasswordRequestForm = Depends()):
     """Authenticate user and return JWT token"""
-    user = session.exec(
+    user = (await session.exec(
         select(User).where(User.username == form_data.username.lower())
-    ).first()
+    )).first()
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    if not verify_password(form_data.password, user.password):
+    if not await verify_password_async(form_data.password, user.password):
         raise HTTPException(status_code=400, detail="Incorrect username or password", 
                             headers={"WWW-Authenticate": "Bearer"})
     if not user.is_active:
@@ -1206,18 +1730,20 @@ def login_for_access_token(session: sessionDep,
         data={"sub": user.username}
     )
 
-    # Store refresh token in database
-    refresh_token = RefreshToken(
-        user_id = user.user_id,
-        token = refresh_token_str,
-        expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    )
-    session.add(refresh_token)
-    session.commit()
-    session.refresh(refresh_token)
+    # Store refresh token in database, hashed
+    store_refresh_token(session, user.user_id, refresh_token_str,
+                        datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    await session.commit()
 
-    # Save token in cookie and redirect to home
+    # Save tokens in cookies and redirect to home
     response = RedirectResponse(url="/", status_code=303)
+    set_auth_cookies(response, access_token, refresh_token_str)
+    return response
+    #return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token_str)
+
+
+def set_auth_cookies(response: Response, access_token: str, refresh_token: str):
+    """Access token for every request, refresh token only for /token/refresh"""
     response.set_cookie(
         key="access_token",
         value=access_token,
@@ -1227,8 +1753,108 @@ def login_for_access_token(session: sessionDep,
         secure=False,  # Set to True in production with HTTPS
         samesite="lax"
     )
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 24 * 60 * 60,
+        path="/token/refresh",
+        secure=False,  # Set to True in production with HTTPS
+        samesite="strict"
+    )
+
+
+async def renew_tokens(request: Request, session: asyncSessionDep, response: Response):
+    """Exchange the refresh cookie for a new access token and a rotated refresh token, set on response"""
+    def refresh_failed(detail: str):
+        # a 401 also tells the browser to forget the refresh cookie
+        return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=detail,
+                             headers={"WWW-Authenticate": "Bearer",
+                                      "Set-Cookie": 'refresh_token=""; Max-Age=0; Path=/token/refresh'})
+
+    token = request.cookies.get("refresh_token")
+    if not token:
+        raise refresh_failed("Missing refresh token")
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise refresh_failed("Invalid refresh token")
+    if payload.get("type") != "refresh":
+        raise refresh_failed("Invalid refresh token")
+
+    stored = await find_refresh_token(session, token)
+    if stored is None or stored.expires_at < datetime.utcnow():
+        raise refresh_failed("Invalid refresh token")
+    if stored.revoked and not await just_rotated(session, stored):
+        # an already exchanged token came back: treat the family as stolen
+        await revoke_family(session, stored.family_id)
+        await session.commit()
+        print(f"Refresh token reuse for user ID {stored.user_id}, family revoked")
+        raise refresh_failed("Refresh token reused, please log in again")
+    if stored.revoked or not await rotate_refresh_token(session, stored):
+        # another request just exchanged it; its response carries the new
+        # cookies, so leave the family and the cookie alone
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail="Refresh token was just renewed by another request")
+
+    user = await session.get(User, stored.user_id)
+    if not user or not user.is_active:
+        await revoke_family(session, stored.family_id)
+        await session.commit()
+        raise refresh_failed("Inactive user")
+
+    access_token = create_access_token(data={"sub": user.username})
+    refresh_token_str = create_refresh_token(data={"sub": user.username})
+    store_refresh_token(session, user.user_id, refresh_token_str,
+                        datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+                        family_id=stored.family_id)
+    await session.commit()
+    set_auth_cookies(response, access_token, refresh_token_str)
+
+
+@app.get("/token/refresh")
+@app.post("/token/refresh")
+async def refresh_access_token(request: Request, session: asyncSessionDep, next: str | None = None):
+    """Renew the auth cookies; 204 for script calls, or back to next for a bounced page request"""
+    if next is None:
+        response = Response(status_code=status.HTTP_204_NO_CONTENT)
+        await renew_tokens(request, session, response)
+        return response
+
+    # an open redirect guard: only paths on this site
+    if not next.startswith("/") or next.startswith(("//", "/\\")):
+        next = "/"
+    # 307 keeps the method and body, so a form posted with an expired
+    # access cookie is submitted again once the cookies are renewed
+    response = RedirectResponse(url=next, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    try:
+        await renew_tokens(request, session, response)
+    except HTTPException as exc:
+        if exc.status_code == status.HTTP_409_CONFLICT:
+            # renewed by a concurrent request, whose cookies arrive with its response
+            return RedirectResponse(url=next, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+        response = RedirectResponse(url="/login", status_code=303)
+        response.delete_cookie(key="refresh_token", path="/token/refresh")
     return response
-    #return Token(access_token=access_token, token_type="bearer", refresh_token=refresh_token_str)
+
+
+@app.exception_handler(HTTPException)
+async def renew_expired_session(request: Request, exc: HTTPException):
+    """Send a browser whose access cookie expired through /token/refresh and back
+
+    The refresh cookie is only sent to /token/refresh, so a page or form
+    request that gets a 401 is redirected there with its URL in next. API
+    clients (Authorization header, or not asking for HTML) keep the 401.
+    """
+    if (exc.status_code == status.HTTP_401_UNAUTHORIZED
+            and "text/html" in request.headers.get("accept", "")
+            and "authorization" not in request.headers
+            and not request.url.path.startswith("/token/")):
+        next_url = request.url.path + (f"?{request.url.query}" if request.url.query else "")
+        return RedirectResponse(url=f"/token/refresh?{urlencode({'next': next_url})}",
+                                status_code=status.HTTP_307_TEMPORARY_REDIRECT)
+    return await http_exception_handler(request, exc)
 
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -1243,4 +1869,5 @@ async def logout(request: Request, response: Response):
     """Logout user by clearing the access token cookie"""
     response = RedirectResponse(url="/", status_code=303)
     response.delete_cookie(key="access_token")
+    response.delete_cookie(key="refresh_token", path="/token/refresh")
     return response
\ No newline at end of file
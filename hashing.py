@@ -0,0 +1,72 @@
+# hashing.py
+"""Bounded thread pool for password hashing.
+
+pbkdf2 is deliberately slow. Run on the event loop it stalls every other
+request for the length of the hash, and run in the shared threadpool a
+login burst takes the threads sync routes need. HashingPool gives it a few
+dedicated threads (hashlib releases the GIL while it works) and a cap on
+how many hashes may be queued: past the cap, callers get HashingPoolFull
+right away instead of waiting behind the backlog.
+"""
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class HashingPoolFull(Exception):
+    """Raised when max_pending hashes are already queued or running"""
+
+
+class HashingPool:
+    def __init__(self, workers: int = 2, max_pending: int = 32):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hashing")
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+
+    async def run(self, fn: Callable[..., T], *args) -> T:
+        """Run fn(*args) on a hashing thread, or raise HashingPoolFull"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingPoolFull(f"{self.pending} password hashes pending")
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        submitted = time.perf_counter()
+
+        def timed():
+            waited = time.perf_counter() - submitted
+            return waited, fn(*args)
+
+        try:
+            waited, result = await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.wait_seconds += waited
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": round(self.wait_seconds / self.completed * 1000, 2) if self.completed else 0.0,
+        }
@@ -0,0 +1,151 @@
+# mail_sink.py
+"""Local stand-ins for the mail provider, for offline tests and benchmarks.
+
+An HTTP sink implementing the two Resend endpoints the outbox worker uses,
+and a minimal SMTP server for mailer.py. Both keep what they receive in
+memory:
+
+    python mail_sink.py [--port 8025] [--fail-rate 0.1] [--smtp-port 8026]
+    RESEND_API_URL=http://127.0.0.1:8025 python outbox.py
+    OUTBOX_TRANSPORT=smtp SMTP_SERVER=127.0.0.1 SMTP_PORT=8026 MAIL_STARTTLS=false python outbox.py
+
+GET /stats reports how many requests and messages arrived.
+"""
+import sys
+import random
+import asyncio
+import argparse
+from fastapi import FastAPI, HTTPException, Request
+
+
+def create_sink(fail_rate: float = 0.0) -> FastAPI:
+    """A fresh sink app; fail_rate of requests answer 503"""
+    sink = FastAPI(title="mail sink")
+    sink.state.messages = []
+    sink.state.requests = 0
+    sink.state.failures = 0
+
+    def maybe_fail():
+        sink.state.requests += 1
+        if fail_rate and random.random() < fail_rate:
+            sink.state.failures += 1
+            raise HTTPException(status_code=503, detail="sink: simulated outage")
+
+    @sink.post("/emails")
+    async def send_one(request: Request):
+        maybe_fail()
+        message = await request.json()
+        sink.state.messages.append(message)
+        return {"id": f"sink-{len(sink.state.messages)}"}
+
+    @sink.post("/emails/batch")
+    async def send_batch(request: Request):
+        maybe_fail()
+        messages = await request.json()
+        if len(messages) > 100:
+            raise HTTPException(status_code=422, detail="sink: at most 100 emails per batch")
+        start = len(sink.state.messages)
+        sink.state.messages.extend(messages)
+        return {"data": [{"id": f"sink-{start + i + 1}"} for i in range(len(messages))]}
+
+    @sink.get("/stats")
+    async def stats():
+        return {"requests": sink.state.requests, "failures": sink.state.failures,
+                "messages": len(sink.state.messages)}
+
+    return sink
+
+
+class SMTPSink:
+    """Accepts any login and any message, counts connections and messages
+
+    Speaks just enough SMTP for smtplib: EHLO/HELO, AUTH, MAIL, RCPT, DATA,
+    RSET, NOOP and QUIT. No STARTTLS.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.logins = 0
+        self.messages = []
+        self.server = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        def reply(line: str):
+            writer.write(f"{line}\r\n".encode())
+
+        reply("220 mail sink ready")
+        try:
+            while line := await reader.readline():
+                command = line.decode(errors="replace").strip()
+                verb = command.split(" ", 1)[0].upper()
+                if verb == "EHLO":
+                    reply("250-mail sink")
+                    reply("250-AUTH PLAIN LOGIN")
+                    reply("250 8BITMIME")
+                elif verb == "HELO":
+                    reply("250 mail sink")
+                elif verb == "AUTH":
+                    self.logins += 1
+                    reply("235 Authentication successful")
+                elif verb in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    reply("250 OK")
+                elif verb == "DATA":
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                    await writer.drain()
+                    data = []
+                    while (chunk := await reader.readline()) not in (b".\r\n", b""):
+                        data.append(chunk)
+                    self.messages.append(b"".join(data))
+                    reply("250 OK queued")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("502 Command not implemented")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def stats(self) -> dict:
+        return {"connections": self.connections, "logins": self.logins, "messages": len(self.messages)}
+
+
+def main(argv=None) -> int:
+    import uvicorn
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--smtp-port", type=int, help="also run the SMTP sink on this port")
+    args = parser.parse_args(argv)
+
+    async def run():
+        sink = create_sink(args.fail_rate)
+        if args.smtp_port:
+            smtp = SMTPSink()
+            await smtp.start(args.host, args.smtp_port)
+
+            @sink.get("/smtp/stats")
+            async def smtp_stats():
+                return smtp.stats()
+
+        config = uvicorn.Config(sink, host=args.host, port=args.port, log_level="warning")
+        await uvicorn.Server(config).serve()
+
+    asyncio.run(run())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
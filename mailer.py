@@ -0,0 +1,171 @@
+# mailer.py
+"""Pooled SMTP connections for sending many messages.
+
+Connecting, STARTTLS and login cost several round trips and a TLS
+handshake, so SMTPPool keeps up to pool_size authenticated connections and
+sends message after message on each. A connection is closed and replaced
+after max_messages messages, which keeps us under the per-session limits
+most providers enforce. A connection that went stale while idle is
+reopened and the message sent again.
+
+SMTPTransport plugs the pool into the outbox worker, which is how the app
+sends all its mail over SMTP: set OUTBOX_TRANSPORT=smtp.
+"""
+import os
+import queue
+import asyncio
+import smtplib
+import threading
+from contextlib import contextmanager
+from email.message import EmailMessage
+from models import EmailOutbox
+
+SMTP_SERVER = os.getenv("SMTP_SERVER", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+MAIL_STARTTLS = os.getenv("MAIL_STARTTLS", "True").lower() in ("true", "1", "t")
+FROM_EMAIL = os.getenv("FROM_EMAIL", "jidalli@example.com")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 4))
+SMTP_MAX_MESSAGES = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", 100))
+
+
+def build_message(to_email: str, subject: str, html: str, from_email: str = FROM_EMAIL) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = from_email
+    message["To"] = to_email
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+class SMTPPool:
+    def __init__(self, host: str = SMTP_SERVER, port: int = SMTP_PORT,
+                 username: str | None = SMTP_USERNAME, password: str | None = SMTP_PASSWORD,
+                 starttls: bool = MAIL_STARTTLS, pool_size: int = SMTP_POOL_SIZE,
+                 max_messages: int = SMTP_MAX_MESSAGES, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.pool_size = pool_size
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[tuple[smtplib.SMTP, int]] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        self.messages_sent = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.starttls:
+            server.starttls()
+            server.ehlo()
+        if self.username:
+            server.login(self.username, self.password)
+        with self._lock:
+            self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except smtplib.SMTPException:
+            server.close()
+        except OSError:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; yields a [server, messages_sent_on_it] pair"""
+        self._slots.acquire()
+        try:
+            try:
+                server, sent = self._idle.get_nowait()
+            except queue.Empty:
+                server, sent = self._connect(), 0
+            slot = [server, sent]
+            try:
+                yield slot
+            except BaseException:
+                self._close(slot[0])
+                raise
+            if slot[1] >= self.max_messages:
+                self._close(slot[0])
+            else:
+                self._idle.put((slot[0], slot[1]))
+        finally:
+            self._slots.release()
+
+    def _send(self, slot: list, message: EmailMessage):
+        if slot[1] >= self.max_messages:
+            self._close(slot[0])
+            slot[0], slot[1] = self._connect(), 0
+        try:
+            slot[0].send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # idle connection timed out on the server side: reconnect once
+            slot[0], slot[1] = self._connect(), 0
+            slot[0].send_message(message)
+        slot[1] += 1
+        with self._lock:
+            self.messages_sent += 1
+
+    def send_many(self, messages: list[EmailMessage]) -> list[str | None]:
+        """Send messages over one pooled connection, an error (or None) per message"""
+        errors = []
+        with self.connection() as slot:
+            for i, message in enumerate(messages):
+                try:
+                    self._send(slot, message)
+                    errors.append(None)
+                except smtplib.SMTPRecipientsRefused as e:
+                    errors.append(f"SMTPRecipientsRefused: {e.recipients}")
+                except (smtplib.SMTPException, OSError) as e:
+                    # the connection is unusable: fail the rest so they are
+                    # retried, and retire it instead of pooling it
+                    errors.extend([f"{type(e).__name__}: {e}"] * (len(messages) - i))
+                    slot[1] = self.max_messages
+                    break
+        return errors
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+    def stats(self) -> dict:
+        return {"pool_size": self.pool_size, "max_messages": self.max_messages,
+                "idle": self._idle.qsize(), "connections_opened": self.connections_opened,
+                "messages_sent": self.messages_sent}
+
+
+class SMTPTransport:
+    """Outbox transport that spreads a batch over the pooled connections"""
+
+    def __init__(self, pool: SMTPPool | None = None):
+        self.pool = pool or SMTPPool()
+
+    async def send_batch(self, emails: list[EmailOutbox]) -> list[str | None]:
+        messages = [build_message(e.to_email, e.subject, e.html) for e in emails]
+        chunk = -(-len(messages) // self.pool.pool_size)
+        chunks = [messages[i:i + chunk] for i in range(0, len(messages), chunk)]
+        results = await asyncio.gather(*(asyncio.to_thread(self.pool.send_many, c) for c in chunks),
+                                       return_exceptions=True)
+        errors = []
+        for chunk_messages, result in zip(chunks, results):
+            if isinstance(result, BaseException):
+                # could not even connect
+                result = [f"{type(result).__name__}: {result}"] * len(chunk_messages)
+            errors.extend(result)
+        return errors
+
+    async def aclose(self):
+        await asyncio.to_thread(self.pool.close)
@@ -5,10 +5,11 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlmodel import Session, select
 from typing import Annotated
-from database import sessionDep, create_db_and_tables
+from database import sessionDep, asyncSessionDep, create_db_and_tables
 from models import Player, Game, Scoreboard, Tournament, Match, Game_Round
 from schemas import TournamentCreate
-from game import check_round_completion, advance_tournament_round, complete_tournament
+from responses import FastJSONResponse
+from game import update_match_score
 
 app = FastAPI()
 
@@ -120,43 +121,29 @@ async def match_detail(request: Request, match_id: int, session: sessionDep):
 async def complete_match_form(
     request: Request,
     match_id: int,
-    winner_id: Annotated[str, Form()],
     team1_score: Annotated[int, Form()],
     team2_score: Annotated[int, Form()],
-    session: sessionDep
+    session: asyncSessionDep
 ):
     """Handle match completion from form"""
-    match = session.get(Match, match_id)
+    match = await session.get(Match, match_id)
     if not match:
         raise HTTPException(status_code=404, detail="Match not found")
     
     if match.status == "completed":
         raise HTTPException(status_code=400, detail="Match already completed")
     
-    # Update match
-    match.team1_score = team1_score
-    match.team2_score = team2_score
-    match.winner_id = winner_id
-    match.loser_id = match.team2_id if winner_id == match.team1_id else match.team1_id
-    match.status = "completed"
+    # the same path as game.py: winner from the scores, pending count,
+    # standings and live updates, then the round advance when it was the last
+    # (this app has no login, so there is no current user to pass)
+    result = await update_match_score(request, team1_score, team2_score, session, match, None)
     
-    session.add(match)
-    session.commit()
-    session.refresh(match)
-    
-    # Check if round is complete
-    check_round = check_round_completion(match.tournament_id, match.round_num, session)
-    if check_round:
-        tournament = session.get(Tournament, match.tournament_id)
-        if tournament:
-            result = advance_tournament_round(tournament, session)
-            
-            # If tournament completed, redirect to winner page
-            if "Tournament completed" in result.get("message", ""):
-                return RedirectResponse(
-                    url=f"/tournaments/{match.tournament_id}/winner",
-                    status_code=303
-                )
+    # If tournament completed, redirect to winner page
+    if isinstance(result, dict) and "Tournament completed" in result.get("message", ""):
+        return RedirectResponse(
+            url=f"/tournaments/{match.tournament_id}/winner",
+            status_code=303
+        )
     
     return RedirectResponse(
         url=f"/tournaments/{match.tournament_id}",
@@ -200,10 +187,10 @@ async def tournament_winner(request: Request, tournament_id: int, session: sessi
 
 # ============ API ROUTES (Optional - for AJAX) ============
 
-@app.get("/api/tournaments/{tournament_id}")
+@app.get("/api/tournaments/{tournament_id}", response_class=FastJSONResponse)
 async def api_get_tournament(tournament_id: int, session: sessionDep):
     """API endpoint for AJAX calls"""
     tournament = session.get(Tournament, tournament_id)
     if not tournament:
         raise HTTPException(status_code=404, detail="Tournament not found")
-    return tournament
\ No newline at end of file
+    return FastJSONResponse(tournament)
\ No newline at end of file
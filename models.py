@@ -1,10 +1,10 @@
-from sqlmodel import Column, Integer, String, ForeignKey
+from sqlmodel import Column, Integer, String, ForeignKey, Index
 from sqlmodel import SQLModel, Relationship, Field
 from datetime import datetime
 
 class Player(SQLModel, table=True):
     player_id: int = Field(default=None, primary_key=True)
-    name: str
+    name: str = Field(index=True)
     email: str
 
 
@@ -12,6 +12,9 @@ class Player(SQLModel, table=True):
     games: list["Game"] = Relationship(back_populates="player")
 
 class Game(SQLModel, table=True):
+    # crud.py looks up the active players of a round by (round, eliminated)
+    __table_args__ = (Index("ix_game_round_eliminated", "round", "eliminated"),)
+
     game_id: int = Field(default=None, primary_key=True)
     player_id: int = Field(foreign_key="player.player_id")
     round: int
@@ -38,26 +41,77 @@ class Tournament (SQLModel, table=True):
     current_round: int
     total_rounds: int
     winner_id: int | None = None
+    # bumped with every result, round change or completion; keys the page cache
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    # every match of every round created up front, winners move to the parent
+    # match as results come in (see create_bracket in game.py)
+    bracket: bool = Field(default=False, sa_column_kwargs={"server_default": "0"})
 
 class Match (SQLModel, table=True):
+    # round completion, score validation, the bracket and the winner page all
+    # filter on (tournament_id, round_num, status) or a prefix of it
+    __table_args__ = (
+        Index("ix_match_tournament_round_status", "tournament_id", "round_num", "status"),
+        # the paged match lists: (tournament_id, status) then match_id, the rowid
+        Index("ix_match_tournament_status", "tournament_id", "status"),
+    )
+
     match_id: int = Field(default=None, primary_key=True)
     tournament_id: int = Field(foreign_key="tournament.tournament_id")
     round_num: int
-    team1_id: str
-    team2_id : str
+    # None while a bracket slot waits for the winner of a feeder match
+    team1_id: int | None = Field(default=None, foreign_key="player.player_id")
+    team2_id : int | None = Field(default=None, foreign_key="player.player_id")
     team1_score : int | None = None
     team2_score : int | None = None
-    winner_id: int | None = None
-    loser_id : int | None = None
-    status: str
+    winner_id: int | None = Field(default=None, foreign_key="player.player_id")
+    loser_id : int | None = Field(default=None, foreign_key="player.player_id")
+    status: str  # pending or completed, "scheduled" for a bracket slot of a round not yet open
+    # bracket mode: the match the winner goes on to, as its team1 (1) or team2 (2)
+    parent_match_id: int | None = Field(default=None, foreign_key="match.match_id")
+    parent_slot: int | None = None
 
 class Game_Round (SQLModel, table=True):
+    __table_args__ = (Index("ix_game_round_tournament_round", "tournament_id", "round_num"),)
+
     round_id: int = Field(default=None, primary_key=True)
     tournament_id: int = Field(foreign_key="tournament.tournament_id")
     round_num: int
     matches_in_round: int
+    # matches of the round still waiting for a score; decremented in the
+    # score transaction so round completion is a single-row read
+    pending_matches: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
     status: str
 
+class TournamentStanding (SQLModel, table=True):
+    """Standings read model, kept up to date as scores come in"""
+    __tablename__ = "tournament_standing"
+    __table_args__ = (Index("ix_tournament_standing_order", "tournament_id", "rounds_reached", "wins"),)
+
+    tournament_id: int = Field(foreign_key="tournament.tournament_id", primary_key=True)
+    player_id: int = Field(foreign_key="player.player_id", primary_key=True)
+    wins: int = 0
+    losses: int = 0
+    rounds_reached: int = 0  # furthest round the player has been drawn into
+    eliminated_in: int | None = None
+
+
+class TournamentSummary (SQLModel, table=True):
+    """Winner page statistics, written once when the tournament completes"""
+    __tablename__ = "tournament_summary"
+
+    tournament_id: int = Field(foreign_key="tournament.tournament_id", primary_key=True)
+    final_match_id: int = Field(foreign_key="match.match_id")
+    runner_up_id: int | None = Field(default=None, foreign_key="player.player_id")
+    final_team1_score: int = 0
+    final_team2_score: int = 0
+    total_matches: int = 0
+    total_points: int = 0
+    closest_match_id: int | None = Field(default=None, foreign_key="match.match_id")
+    closest_margin: int | None = None
+    biggest_match_id: int | None = Field(default=None, foreign_key="match.match_id")
+    biggest_margin: int | None = None
+
 
     # =========== JWT Authentication Models ===========
 class User(SQLModel, table=True):
@@ -82,8 +136,31 @@ class VerificationToken(SQLModel, table=True):
     used: bool = Field(default=False)
 
 class RefreshToken(SQLModel, table=True):
+    """Hashed refresh token, see refresh_tokens.py"""
     refresh_token_id: int = Field(default=None, primary_key=True)
     user_id: int = Field(foreign_key="user.user_id")
-    token: str = Field(index=True, unique=True)
-    expires_at: datetime = Field()
-    revoked: bool = Field(default=False)
\ No newline at end of file
+    lookup: str = Field(index=True)  # leading hex digits of token_hash
+    token_hash: str
+    family_id: str = Field(index=True)
+    expires_at: datetime = Field(index=True)
+    revoked: bool = Field(default=False)
+    revoked_at: datetime | None = None
+
+
+class EmailOutbox(SQLModel, table=True):
+    """Outgoing email, written in the transaction that wants it sent (see outbox.py)"""
+    __tablename__ = "email_outbox"
+    # the worker claims by (status, next_attempt_at)
+    __table_args__ = (Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),)
+
+    email_id: int = Field(default=None, primary_key=True)
+    to_email: str
+    subject: str
+    html: str
+    status: str = "pending"  # pending, sending, sent or failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    claimed_at: datetime | None = None
+    sent_at: datetime | None = None
+    last_error: str | None = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
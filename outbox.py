@@ -0,0 +1,264 @@
+# outbox.py
+"""Transactional email outbox and its delivery worker.
+
+Routes never talk to the mail provider. They add an EmailOutbox row with
+enqueue_email inside their own transaction, so an email exists exactly when
+the change that triggered it was committed. The worker runs inside the
+app (started and stopped with it, see game.py), or with OUTBOX_IN_APP=false
+as its own process on the same database:
+
+    python outbox.py [--batch-size 100] [--concurrency 2] [--once]
+
+and claims pending rows in batches, sends each batch in one request to the
+Resend batch API over a kept-alive connection pool, and records the outcome.
+Failed sends are retried with exponential backoff and jitter until
+OUTBOX_MAX_ATTEMPTS, after which the row is left as "failed". A worker that
+dies mid-batch loses nothing: rows stuck in "sending" past the lease are
+claimed again.
+
+OUTBOX_TRANSPORT=smtp sends through the pooled SMTP connections of
+mailer.py instead. Point RESEND_API_URL (or SMTP_SERVER/SMTP_PORT) at
+mail_sink.py to run the pipeline offline.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, insert, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import EmailOutbox
+
+RESEND_API_URL = os.getenv("RESEND_API_URL", "https://api.resend.com")
+RESEND_API = os.getenv("RESEND_API", "")
+EMAIL_FROM = os.getenv("EMAIL_FROM", "Jidalli <onboarding@resend.dev>")
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 6))
+BACKOFF_BASE = float(os.getenv("OUTBOX_BACKOFF_BASE", 30))  # seconds
+BACKOFF_MAX = float(os.getenv("OUTBOX_BACKOFF_MAX", 3600))
+CLAIM_LEASE = timedelta(seconds=int(os.getenv("OUTBOX_CLAIM_LEASE", 300)))
+OUTBOX_TRANSPORT = os.getenv("OUTBOX_TRANSPORT", "resend")
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))
+CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", 2))
+POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", 1.0))
+
+
+def enqueue_email(session: AsyncSession, to_email: str, subject: str, html: str) -> EmailOutbox:
+    """Add an email to the caller's transaction; it is sent after the commit"""
+    email = EmailOutbox(to_email=to_email, subject=subject, html=html)
+    session.add(email)
+    return email
+
+
+async def enqueue_emails(session: AsyncSession, emails: list[dict]):
+    """Bulk enqueue_email: one executemany for dicts of to_email, subject and html"""
+    if emails:
+        now = datetime.utcnow()
+        await session.exec(insert(EmailOutbox), params=[
+            {"status": "pending", "attempts": 0, "next_attempt_at": now, "created_at": now, **email}
+            for email in emails
+        ])
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds before retry number `attempts`, doubling each time, with jitter"""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1.0)
+
+
+async def claim_batch(session: AsyncSession, batch_size: int,
+                      now: datetime | None = None) -> list[EmailOutbox]:
+    """Mark up to batch_size due rows as sending and return them
+
+    The claim is a single UPDATE, so concurrent workers never get the same
+    row; the condition is repeated outside the subquery for databases that
+    re-check it after waiting on a row lock.
+    """
+    now = now or datetime.utcnow()
+    claimable = or_(
+        and_(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == "sending", EmailOutbox.claimed_at < now - CLAIM_LEASE),
+    )
+    due = (
+        select(EmailOutbox.email_id).where(claimable)
+        .order_by(EmailOutbox.email_id).limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    claimed = (await session.exec(
+        update(EmailOutbox)
+        .where(EmailOutbox.email_id.in_(due.scalar_subquery()))
+        .where(claimable)
+        .values(status="sending", claimed_at=now)
+        .returning(EmailOutbox)
+    )).scalars().all()
+    await session.commit()
+    return list(claimed)
+
+
+async def record_results(session: AsyncSession, emails: list[EmailOutbox],
+                         errors: list[str | None], now: datetime | None = None):
+    """Mark sent rows, and schedule a retry or give up on the failed ones"""
+    now = now or datetime.utcnow()
+    changes = []
+    for email, error in zip(emails, errors):
+        if error is None:
+            changes.append({"email_id": email.email_id, "status": "sent", "sent_at": now,
+                            "attempts": email.attempts + 1, "last_error": None})
+            continue
+        attempts = email.attempts + 1
+        changes.append({
+            "email_id": email.email_id,
+            "status": "failed" if attempts >= MAX_ATTEMPTS else "pending",
+            "attempts": attempts,
+            "next_attempt_at": now + timedelta(seconds=backoff_delay(attempts)),
+            "last_error": error[:500],
+        })
+    if changes:
+        await session.exec(update(EmailOutbox), params=changes)
+        await session.commit()
+
+
+class ResendTransport:
+    """Resend HTTP API client on a persistent, pooled connection"""
+
+    def __init__(self, client: "httpx.AsyncClient | None" = None, pool_size: int = 4):
+        # httpx only loads in the worker, the app just writes outbox rows
+        import httpx
+        self.client = client or httpx.AsyncClient(
+            base_url=RESEND_API_URL,
+            headers={"Authorization": f"Bearer {RESEND_API}"} if RESEND_API else {},
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            timeout=httpx.Timeout(30.0),
+        )
+
+    @staticmethod
+    def payload(email: EmailOutbox) -> dict:
+        return {"from": EMAIL_FROM, "to": [email.to_email], "subject": email.subject, "html": email.html}
+
+    async def _post(self, path: str, body) -> str | None:
+        import httpx
+        try:
+            response = await self.client.post(path, json=body)
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}"
+        if response.is_success:
+            return None
+        return f"HTTP {response.status_code}: {response.text[:200]}"
+
+    async def send_batch(self, emails: list[EmailOutbox]) -> list[str | None]:
+        """Send emails, returning an error (or None) per email"""
+        error = await self._post("/emails/batch", [self.payload(e) for e in emails])
+        if error is None:
+            return [None] * len(emails)
+        if len(emails) > 1 and error.startswith(("HTTP 400", "HTTP 422")):
+            # one bad message fails the whole batch: find out which
+            return [await self._post("/emails", self.payload(e)) for e in emails]
+        return [error] * len(emails)
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+class OutboxWorker:
+    def __init__(self, session_maker, transport, batch_size: int = 100,
+                 concurrency: int = 2, poll_interval: float = 1.0):
+        self.session_maker = session_maker
+        self.transport = transport
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.errors = 0
+
+    async def run_once(self) -> int:
+        """Claim, send and record one batch; returns how many rows it handled"""
+        async with self.session_maker() as session:
+            emails = await claim_batch(session, self.batch_size)
+            if not emails:
+                return 0
+            errors = await self.transport.send_batch(emails)
+            for email, error in zip(emails, errors):
+                if error is not None:
+                    print(f"✗ Email {email.email_id} to {email.to_email} failed (attempt {email.attempts + 1}): {error}")
+            await record_results(session, emails, errors)
+        self.batches += 1
+        self.sent += sum(1 for e in errors if e is None)
+        self.failed += sum(1 for e in errors if e is not None)
+        return len(emails)
+
+    async def drain(self) -> int:
+        """Send until nothing is due"""
+        async def loop():
+            handled = 0
+            while count := await self.run_once():
+                handled += count
+            return handled
+        return sum(await asyncio.gather(*(loop() for _ in range(self.concurrency))))
+
+    async def run(self, stop: asyncio.Event | None = None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                handled = await self.drain()
+            except Exception as e:
+                # e.g. the database is locked: keep the worker, try again later
+                self.errors += 1
+                print(f"Outbox batch failed: {e}")
+                handled = 0
+            if not handled:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    def stats(self) -> dict:
+        return {"sent": self.sent, "failed": self.failed, "batches": self.batches, "errors": self.errors}
+
+
+def make_transport(concurrency: int = CONCURRENCY):
+    """The transport OUTBOX_TRANSPORT names"""
+    if OUTBOX_TRANSPORT == "smtp":
+        from mailer import SMTPTransport
+        return SMTPTransport()
+    return ResendTransport(pool_size=concurrency)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    parser.add_argument("--once", action="store_true", help="send what is due, then exit")
+    args = parser.parse_args(argv)
+
+    from database import async_session_maker, create_db_and_tables
+    create_db_and_tables()
+
+    async def run():
+        transport = make_transport(args.concurrency)
+        worker = OutboxWorker(async_session_maker, transport, args.batch_size,
+                              args.concurrency, args.poll_interval)
+        try:
+            if args.once:
+                start = time.perf_counter()
+                handled = await worker.drain()
+                print(f"Handled {handled} emails in {time.perf_counter() - start:.2f}s: {worker.stats()}")
+            else:
+                print(f"Outbox worker sending through {OUTBOX_TRANSPORT}")
+                await worker.run()
+        finally:
+            await transport.aclose()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+# page_cache.py
+"""In-process cache of rendered tournament pages.
+
+Entries are keyed by (page, tournament_id, version). Tournament.version is
+bumped in the same transaction as every change that shows up on those pages,
+so a new version simply stops matching the old entries and they age out of
+the LRU. Because the version comes from the database, every worker sees a
+change as soon as it is committed.
+"""
+import asyncio
+from collections import OrderedDict
+from typing import Awaitable, Callable, Hashable
+
+
+class PageCache:
+    """Bounded LRU of rendered HTML with single-flight rendering"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    async def get_or_render(self, page: str, tournament_id: int, version: int,
+                            render: Callable[[], Awaitable[str]]) -> str:
+        """Return the cached page, rendering it at most once per key
+
+        Concurrent misses for the same key wait for the first render
+        instead of each querying and rendering the page again.
+        """
+        key = (page, tournament_id, version)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        if key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            html = await render()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else is waiting
+            raise
+        else:
+            future.set_result(html)
+            self._store(key, html)
+            return html
+        finally:
+            del self._inflight[key]
+
+    def get(self, page: str, tournament_id: int, version: int) -> str | None:
+        """The cached page or None, for callers that render it themselves"""
+        key = (page, tournament_id, version)
+        if key not in self._entries:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return self._entries[key]
+
+    def put(self, page: str, tournament_id: int, version: int, html: str):
+        self._store((page, tournament_id, version), html)
+
+    def _store(self, key: Hashable, html: str):
+        self._entries[key] = html
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,38 @@
+# pagination.py
+"""Keyset (cursor) pagination for the list routes.
+
+OFFSET pagination reads and throws away every row before the page, so
+page 500 of the players list costs 500 pages of work. A keyset page
+instead starts from the key of the last row already shown:
+
+    WHERE player_id > :after ORDER BY player_id LIMIT :limit + 1
+
+which is a range scan on the primary key (or an index ending in it),
+whatever the depth. The extra row only tells whether there is a next
+page; its key is not exposed, the cursor is the key of the last row
+returned.
+"""
+from typing import Annotated
+from fastapi import Query
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+PageSize = Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)]
+
+
+async def keyset_page(session, statement, key, after: int | None = None,
+                      limit: int = DEFAULT_PAGE_SIZE, descending: bool = False) -> tuple[list, int | None]:
+    """Rows of one page of statement ordered by key, and the cursor of the next page or None
+
+    Rows must include the key column. With descending=True, `after` means
+    "older than" and pages go from the highest key down.
+    """
+    if after is not None:
+        statement = statement.where(key < after if descending else key > after)
+    statement = statement.order_by(key.desc() if descending else key).limit(limit + 1)
+    rows = (await session.exec(statement)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, getattr(rows[-1], key.key)
@@ -0,0 +1,128 @@
+# refresh_tokens.py
+"""Storage, rotation and pruning of refresh tokens.
+
+Only a SHA-256 hash of each refresh token is stored. Rows are looked up by
+the first LOOKUP_LENGTH hex characters of that hash (indexed) and then
+compared on the full hash, so the table never holds a usable token and the
+index stays small.
+
+Every refresh rotates: the presented token is revoked and a new one in the
+same family is issued. A revoked token being presented again means it was
+copied, so the whole family is revoked and the user has to log in again;
+unless it was rotated less than ROTATION_GRACE ago, which is two tabs or
+requests refreshing at once with the same cookie. The loser gets no new
+token (only hashes are stored) and keeps the winner's.
+
+Revoked rows are kept for REVOKED_RETENTION so reuse can still be detected
+for a while; prune_refresh_tokens deletes them after that, and expired rows
+straight away, a batch at a time.
+"""
+import hmac
+import hashlib
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy import delete, update, or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import RefreshToken
+
+LOOKUP_LENGTH = 16
+REVOKED_RETENTION = timedelta(days=1)
+ROTATION_GRACE = timedelta(seconds=10)
+
+
+def token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def new_family_id() -> str:
+    return secrets.token_urlsafe(12)
+
+
+def store_refresh_token(session: AsyncSession, user_id: int, token: str,
+                        expires_at: datetime, family_id: str | None = None) -> RefreshToken:
+    """Add the hashed token to the session, starting a new family by default"""
+    digest = token_hash(token)
+    refresh_token = RefreshToken(
+        user_id=user_id,
+        lookup=digest[:LOOKUP_LENGTH],
+        token_hash=digest,
+        family_id=family_id or new_family_id(),
+        expires_at=expires_at,
+    )
+    session.add(refresh_token)
+    return refresh_token
+
+
+async def find_refresh_token(session: AsyncSession, token: str) -> RefreshToken | None:
+    digest = token_hash(token)
+    candidates = (await session.exec(
+        select(RefreshToken).where(RefreshToken.lookup == digest[:LOOKUP_LENGTH])
+    )).all()
+    for candidate in candidates:
+        if hmac.compare_digest(candidate.token_hash, digest):
+            return candidate
+    return None
+
+
+async def revoke_family(session: AsyncSession, family_id: str):
+    await session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id)
+        .where(RefreshToken.revoked == False)
+        .values(revoked=True, revoked_at=datetime.utcnow())
+    )
+
+
+async def rotate_refresh_token(session: AsyncSession, stored: RefreshToken) -> bool:
+    """Revoke a token that is being exchanged
+
+    Conditional on it still being live, so of two concurrent refreshes
+    with the same token only one wins; returns False for the loser.
+    """
+    result = await session.exec(
+        update(RefreshToken)
+        .where(RefreshToken.refresh_token_id == stored.refresh_token_id)
+        .where(RefreshToken.revoked == False)
+        .values(revoked=True, revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def just_rotated(session: AsyncSession, stored: RefreshToken, now: datetime | None = None) -> bool:
+    """Revoked less than ROTATION_GRACE ago with its family still live
+
+    That is a concurrent refresh rather than a replay, which would have
+    revoked the whole family.
+    """
+    now = now or datetime.utcnow()
+    if stored.revoked_at is None or now - stored.revoked_at >= ROTATION_GRACE:
+        return False
+    live = (await session.exec(
+        select(RefreshToken.refresh_token_id)
+        .where(RefreshToken.family_id == stored.family_id)
+        .where(RefreshToken.revoked == False)
+        .limit(1)
+    )).first()
+    return live is not None
+
+
+async def prune_refresh_tokens(session: AsyncSession, batch_size: int = 500,
+                               now: datetime | None = None) -> int:
+    """Delete expired rows and revoked rows past retention, batch_size per statement"""
+    now = now or datetime.utcnow()
+    prunable = or_(
+        RefreshToken.expires_at < now,
+        (RefreshToken.revoked == True) & (RefreshToken.revoked_at < now - REVOKED_RETENTION),
+    )
+    deleted = 0
+    while True:
+        batch = select(RefreshToken.refresh_token_id).where(prunable).limit(batch_size)
+        result = await session.exec(
+            delete(RefreshToken).where(RefreshToken.refresh_token_id.in_(batch.scalar_subquery()))
+        )
+        await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
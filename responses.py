@@ -0,0 +1,24 @@
+# responses.py
+"""orjson-backed JSON responses for the API routes.
+
+A route that returns a dict has it walked by jsonable_encoder, which
+rebuilds every nested object in Python, before the response class
+serializes it again with the json module. Routes that return
+FastJSONResponse(...) themselves skip both: orjson serializes dicts,
+lists, datetimes and dataclasses natively, and SQLModel objects through
+model_dump, with the same output the default path produces.
+"""
+import orjson
+from pydantic import BaseModel
+from fastapi.responses import JSONResponse
+
+
+def _default(obj):
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
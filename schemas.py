@@ -30,8 +30,15 @@ class MatchResult(SQLModel):
     score: list[int]
     round: int
 
+class MatchScore(SQLModel):
+    """One result of a batch submitted to /tournaments/{id}/results/"""
+    match_id: int
+    team1_score: int
+    team2_score: int
+
 class TournamentCreate(SQLModel):
     name: str
+    bracket: bool = False  # fixed bracket, every round's slots created up front
     
 
     #======== JWT Token Schemas ========
@@ -0,0 +1,118 @@
+# standings.py
+"""Rebuild and check the tournament_standing read model.
+
+update_match_score and advance_tournament_round keep tournament_standing up
+to date as results come in. Tournaments played before the table existed
+are filled in by the standings route the first time they are shown, or all
+at once with rebuild, and check compares the table against a recomputation
+from the match rows:
+
+    python standings.py rebuild [tournament_id ...]
+    python standings.py check [tournament_id ...]
+"""
+import sys
+import argparse
+from sqlalchemy import case, delete, func, insert, literal, union_all
+from sqlmodel import Session, select
+from database import engine, create_db_and_tables
+from models import Match, Tournament, TournamentStanding
+
+
+def standings_statement(tournament_id: int):
+    """Standings of one tournament computed from scratch in one GROUP BY
+
+    Every match contributes a row for each of its two players: the round it
+    is in, and whether that player won or lost it (neither while pending).
+    """
+    appearances = union_all(*(
+        select(team_id.label("player_id"), Match.round_num,
+               case((Match.winner_id == team_id, 1), else_=0).label("win"),
+               case((Match.loser_id == team_id, 1), else_=0).label("loss"))
+        .where(Match.tournament_id == tournament_id)
+        .where(team_id.is_not(None))  # bracket slots still waiting for a team
+        for team_id in (Match.team1_id, Match.team2_id)
+    )).subquery()
+
+    wins = func.sum(appearances.c.win).label("wins")
+    rounds_reached = func.max(appearances.c.round_num).label("rounds_reached")
+    return (
+        select(literal(tournament_id).label("tournament_id"),
+               appearances.c.player_id,
+               wins,
+               func.sum(appearances.c.loss).label("losses"),
+               rounds_reached,
+               func.max(case((appearances.c.loss == 1, appearances.c.round_num))).label("eliminated_in"))
+        .group_by(appearances.c.player_id)
+        .order_by(rounds_reached.desc(), wins.desc())
+    )
+
+
+def insert_standings(tournament_id: int):
+    """INSERT ... SELECT of standings_statement into tournament_standing"""
+    return insert(TournamentStanding).from_select(
+        ["tournament_id", "player_id", "wins", "losses", "rounds_reached", "eliminated_in"],
+        standings_statement(tournament_id)
+    )
+
+
+def rebuild_standings(session: Session, tournament_id: int) -> int:
+    """Replace a tournament's standing rows with a fresh recomputation"""
+    session.exec(delete(TournamentStanding).where(TournamentStanding.tournament_id == tournament_id))
+    session.exec(insert_standings(tournament_id))
+    session.commit()
+    return len(session.exec(standings_statement(tournament_id)).all())
+
+
+def check_standings(session: Session, tournament_id: int) -> list[str]:
+    """Differences between the stored standings and a recomputation"""
+    columns = ("wins", "losses", "rounds_reached", "eliminated_in")
+    expected = {
+        row.player_id: tuple(getattr(row, c) for c in columns)
+        for row in session.exec(standings_statement(tournament_id))
+    }
+    stored = {
+        row.player_id: tuple(getattr(row, c) for c in columns)
+        for row in session.exec(
+            select(TournamentStanding).where(TournamentStanding.tournament_id == tournament_id)
+        )
+    }
+    problems = []
+    for player_id in sorted(expected.keys() | stored.keys()):
+        if player_id not in stored:
+            problems.append(f"player {player_id}: missing from tournament_standing")
+        elif player_id not in expected:
+            problems.append(f"player {player_id}: has a standing but no matches")
+        elif stored[player_id] != expected[player_id]:
+            problems.append(
+                f"player {player_id}: stored {dict(zip(columns, stored[player_id]))}"
+                f" expected {dict(zip(columns, expected[player_id]))}"
+            )
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("tournament_ids", nargs="*", type=int,
+                        help="tournaments to process (default: all)")
+    args = parser.parse_args(argv)
+
+    create_db_and_tables()
+    failed = False
+    with Session(engine) as session:
+        tournament_ids = args.tournament_ids or session.exec(select(Tournament.tournament_id)).all()
+        for tournament_id in tournament_ids:
+            if args.command == "rebuild":
+                count = rebuild_standings(session, tournament_id)
+                print(f"Tournament {tournament_id}: rebuilt {count} standings")
+            else:
+                problems = check_standings(session, tournament_id)
+                failed = failed or bool(problems)
+                print(f"Tournament {tournament_id}: {'OK' if not problems else f'{len(problems)} mismatches'}")
+                for problem in problems:
+                    print(f"  {problem}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
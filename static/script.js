@@ -58,4 +58,72 @@ document.addEventListener('DOMContentLoaded', () => {
             }, 600);
         }, 4000);
     });
-});
\ No newline at end of file
+});
+document.addEventListener('DOMContentLoaded', () => {
+    // Live bracket: patch match cards as results come in instead of reloading
+    const bracket = document.querySelector('.bracket-container[data-events-url]');
+    if (!bracket || !window.EventSource) return;
+
+    const events = new EventSource(bracket.dataset.eventsUrl);
+
+    events.addEventListener('match_completed', (e) => {
+        const result = JSON.parse(e.data);
+        const card = document.querySelector(`.match-card[data-match-id="${result.match_id}"]`);
+        if (!card) return refreshBracket();
+
+        const teams = card.querySelectorAll('.team');
+        const scores = [result.team1_score, result.team2_score];
+        teams.forEach((team, i) => {
+            team.querySelector('.score').textContent = scores[i];
+            const won = Number(team.dataset.teamId) === result.winner_id;
+            team.classList.toggle('winner', won);
+            if (won && !team.querySelector('.winner-badge')) {
+                team.querySelector('.team-info').insertAdjacentHTML('beforeend', '<span class="winner-badge">👑</span>');
+            }
+        });
+
+        card.classList.remove('active', 'future');
+        card.classList.add('completed');
+        const action = card.querySelector('.btn, .match-status');
+        if (action) action.outerHTML = '<div class="match-status">✓ Completed</div>';
+
+        // fixed bracket: the winner also moved into the next round's card
+        if (result.parent_match_id) refreshBracket();
+    });
+
+    // New fixtures, a finished tournament or a missed backlog: swap in the
+    // current bracket (served from the page cache) rather than a full reload
+    ['round_advanced', 'tournament_completed', 'resync'].forEach(name => {
+        events.addEventListener(name, refreshBracket);
+    });
+
+    async function refreshBracket() {
+        const response = await fetch(window.location.pathname, { cache: 'no-store' });
+        if (!response.ok) return;
+        const page = new DOMParser().parseFromString(await response.text(), 'text/html');
+        ['.tournament-header', '.bracket-container'].forEach(selector => {
+            const fresh = page.querySelector(selector);
+            const current = document.querySelector(selector);
+            if (fresh && current) current.replaceChildren(...fresh.childNodes);
+        });
+    }
+});
+
+document.addEventListener('DOMContentLoaded', () => {
+    // Renew the 30 minute access cookie from the refresh cookie while a page
+    // stays open, instead of sending the user back to the login form. Timers
+    // stall while a laptop sleeps or a tab is in the background, so a tab
+    // that comes back after the renewal was due renews straight away; a page
+    // request that still hits an expired cookie is bounced through
+    // /token/refresh by the server.
+    const RENEW_EVERY_MS = 25 * 60 * 1000;
+    let renewedAt = Date.now();
+    const renew = () => {
+        renewedAt = Date.now();
+        fetch('/token/refresh', { method: 'POST', credentials: 'same-origin' }).catch(() => {});
+    };
+    setInterval(renew, RENEW_EVERY_MS);
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible' && Date.now() - renewedAt >= RENEW_EVERY_MS) renew();
+    });
+});
@@ -0,0 +1,87 @@
+# sweeper.py
+"""Periodic deletion of dead VerificationToken and RefreshToken rows.
+
+Registration and resend add a VerificationToken and every login adds a
+RefreshToken; nothing else removes them. TokenSweeper runs inside the app
+every `interval` seconds and deletes verification tokens that are used or
+expired, and refresh tokens per prune_refresh_tokens. Deletes go
+batch_size rows per statement with a commit after each, so a sweep never
+holds the write lock for long.
+
+Safe to run in several workers at once: a row deleted by one sweep is
+simply not found by the other.
+"""
+import time
+import asyncio
+from datetime import datetime
+from sqlalchemy import delete, or_
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import VerificationToken
+from refresh_tokens import prune_refresh_tokens
+
+
+async def prune_verification_tokens(session: AsyncSession, batch_size: int = 500,
+                                    now: datetime | None = None) -> int:
+    """Delete used and expired verification tokens, batch_size per statement"""
+    now = now or datetime.utcnow()
+    prunable = or_(VerificationToken.used == True, VerificationToken.expires_at < now)
+    deleted = 0
+    while True:
+        batch = select(VerificationToken.token_id).where(prunable).limit(batch_size)
+        result = await session.exec(
+            delete(VerificationToken).where(VerificationToken.token_id.in_(batch.scalar_subquery()))
+        )
+        await session.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+class TokenSweeper:
+    def __init__(self, session_maker, interval: float = 3600, batch_size: int = 500):
+        self.session_maker = session_maker
+        self.interval = interval
+        self.batch_size = batch_size
+        self.runs = 0
+        self.errors = 0
+        self.swept = {"verification_tokens": 0, "refresh_tokens": 0}
+        self.seconds = 0.0
+        self.last_run = None
+
+    async def sweep_once(self) -> dict:
+        """One pass over both tables, returns the rows deleted from each"""
+        start = time.perf_counter()
+        async with self.session_maker() as session:
+            swept = {
+                "verification_tokens": await prune_verification_tokens(session, self.batch_size),
+                "refresh_tokens": await prune_refresh_tokens(session, self.batch_size),
+            }
+        elapsed = time.perf_counter() - start
+        self.runs += 1
+        self.seconds += elapsed
+        for table, count in swept.items():
+            self.swept[table] += count
+        self.last_run = {"at": datetime.utcnow().isoformat(timespec="seconds"),
+                         "seconds": round(elapsed, 4), **swept}
+        return swept
+
+    async def run(self, stop: asyncio.Event | None = None):
+        stop = stop or asyncio.Event()
+        while not stop.is_set():
+            try:
+                swept = await self.sweep_once()
+                if any(swept.values()):
+                    print(f"Token sweep deleted {swept}")
+            except Exception as e:
+                self.errors += 1
+                print(f"Token sweep failed: {e}")
+            try:
+                await asyncio.wait_for(stop.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> dict:
+        return {"interval": self.interval, "batch_size": self.batch_size, "runs": self.runs,
+                "errors": self.errors, "swept": dict(self.swept),
+                "seconds": round(self.seconds, 4), "last_run": self.last_run}
@@ -0,0 +1,71 @@
+# templating.py
+"""Jinja2 environments for game.py.
+
+Templates are compiled to Python bytecode once and kept in a
+FileSystemBytecodeCache (TEMPLATE_CACHE_DIR, by default a per-user
+directory under the system temp dir), so every worker on the host and
+every restart loads the compiled code instead of parsing the template
+source again. warm_templates loads them at startup so the first request in
+a worker does not pay for it either.
+
+streaming_environment is an async overlay of the same environment for
+rendering with generate_async; stream_template yields the page in
+chunk_size pieces while it is still being rendered. Async templates compile
+to different code, so the overlay keeps its bytecode under a different
+file name pattern.
+"""
+import time
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, TemplateSyntaxError
+from fastapi.templating import Jinja2Templates
+
+
+def make_templates(directory: str = "templates", cache_dir: str | None = None,
+                   **template_globals) -> Jinja2Templates:
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir, "__jidalli_%s.cache"),
+    )
+    env.globals.update(template_globals)
+    return Jinja2Templates(env=env)
+
+
+def streaming_environment(env: Environment, cache_dir: str | None = None) -> Environment:
+    return env.overlay(
+        enable_async=True,
+        bytecode_cache=FileSystemBytecodeCache(cache_dir, "__jidalli_async_%s.cache"),
+    )
+
+
+def warm_templates(env: Environment, names: list[str] | None = None) -> tuple[int, float]:
+    """Load (compile or read from the bytecode cache) templates, returns (loaded, seconds)
+
+    A template with a syntax error is reported and skipped; requests for it
+    fail as they would have without warming.
+    """
+    start = time.perf_counter()
+    loaded = 0
+    for name in names or env.list_templates(extensions=["html"]):
+        try:
+            env.get_template(name)
+            loaded += 1
+        except TemplateSyntaxError as e:
+            print(f"Template {name} does not compile: {e}")
+    return loaded, time.perf_counter() - start
+
+
+async def stream_template(env: Environment, name: str, context: dict, chunk_size: int = 16384):
+    """Render with generate_async, yielding strings of about chunk_size characters
+
+    Jinja yields one piece per template node, mostly a few bytes each;
+    sending each as its own body chunk would cost more than it saves.
+    """
+    parts, size = [], 0
+    async for part in env.get_template(name).generate_async(context):
+        parts.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield "".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts)
@@ -0,0 +1,85 @@
+# test_assets.py
+import os
+import sys
+import gzip
+import asyncio
+import subprocess
+import brotli
+import httpx
+from assets import DIST_DIR, Assets, build, is_stale, minify_css
+from game import app, assets, templates
+
+
+def test_minify_keeps_strings_and_selector_meaning():
+    css = """/* header */
+    a  :hover , b > c {  color : red ;  margin: 0 auto; }
+    .x::after { content: "a  ,  b /* not a comment */"; width: calc(100% - 10px) ; }
+    input[type="radio"]:checked + label { x: 1 }"""
+    assert minify_css(css) == (
+        'a :hover,b>c{color:red;margin:0 auto}'
+        '.x::after{content:"a  ,  b /* not a comment */";width:calc(100% - 10px)}'
+        'input[type="radio"]:checked + label{x:1}'
+    )
+
+
+def test_build_writes_hashed_precompressed_files(tmp_path):
+    manifest = build(dist_dir=str(tmp_path))
+    assert not is_stale(dist_dir=str(tmp_path))
+    assert build(dist_dir=str(tmp_path)) == manifest  # same content, same names
+
+    loaded = Assets(str(tmp_path))
+    loaded.load()
+    for name, hashed in manifest.items():
+        assert hashed.startswith(name.split(".")[0] + ".") and hashed != name
+        variants = loaded.files[hashed]
+        assert gzip.decompress(variants["gzip"]) == variants["identity"]
+        assert brotli.decompress(variants["br"]) == variants["identity"]
+        assert len(variants["br"]) < len(variants["gzip"]) < len(variants["identity"])
+    with open("static/style.css", "rb") as f:
+        assert len(loaded.files[manifest["app.css"]]["identity"]) < len(f.read())
+
+
+def test_without_a_build_urls_point_at_the_sources(tmp_path):
+    unbuilt = Assets(str(tmp_path / "dist"))
+    assert unbuilt.load() is False
+    assert unbuilt.url("app.css") == "/static/style.css"
+    assert unbuilt.url("script.js") == "/static/script.js"
+
+
+def test_pages_link_hashed_assets_served_with_immutable_caching():
+    html = templates.get_template("base.html").render({"request": None})
+    url = assets.url("app.css")
+    assert f'href="{url}"' in html and assets.url("script.js") in html
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            responses = {}
+            for accept in ("gzip, deflate, br", "gzip", "br;q=0, gzip;q=0.5", ""):
+                responses[accept] = await client.get(url, headers={"Accept-Encoding": accept})
+            missing = await client.get("/assets/app.000000000000.css")
+            manifest = await client.get("/assets/manifest.json")
+        return responses, missing, manifest
+
+    responses, missing, manifest = asyncio.run(run())
+    encodings = {accept: r.headers.get("content-encoding") for accept, r in responses.items()}
+    assert encodings == {"gzip, deflate, br": "br", "gzip": "gzip", "br;q=0, gzip;q=0.5": "gzip", "": None}
+    for response in responses.values():
+        assert response.status_code == 200
+        assert response.headers["cache-control"] == "public, max-age=31536000, immutable"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["content-type"] == "text/css; charset=utf-8"
+        assert response.content == responses[""].content  # decoded by httpx
+    assert missing.status_code == 404 and manifest.status_code == 404
+
+
+def test_importing_the_app_does_not_build(tmp_path):
+    manifest = os.path.join(DIST_DIR, "manifest.json")
+    times = os.stat(manifest)
+    os.utime(manifest, (0, 0))  # older than every source: stale
+    try:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'assets.db'}")
+        env.pop("ASSETS_AUTOBUILD", None)
+        subprocess.run([sys.executable, "-c", "import game"], env=env, check=True, capture_output=True)
+        assert os.path.getmtime(manifest) == 0
+    finally:
+        os.utime(manifest, ns=(times.st_atime_ns, times.st_mtime_ns))
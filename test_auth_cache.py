@@ -0,0 +1,106 @@
+# test_auth_cache.py
+import asyncio
+import time
+import threading
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from models import User
+from auth_cache import Principal, TokenCache
+from game import get_current_user, create_access_token, token_cache
+
+
+def make_user(engine, username="alice") -> int:
+    with Session(engine) as session:
+        user = User(username=username, email=f"{username}@example.com", full_name=username.title(),
+                    password="x", is_active=True, is_verified=True)
+        session.add(user)
+        session.commit()
+        return user.user_id
+
+
+def test_repeat_requests_do_not_query_and_updates_invalidate(tmp_path):
+    url = f"sqlite:///{tmp_path / 'auth.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    user_id = make_user(engine)
+    token = create_access_token({"sub": "alice"})
+    token_cache.clear()
+
+    async_engine = make_async_engine(url)
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def authenticate():
+        async with AsyncSession(async_engine) as session:
+            return await get_current_user(token, session)
+
+    async def run():
+        try:
+            first = await authenticate()
+            queries_first = len(statements)
+            for _ in range(10):
+                assert await authenticate() == first
+            return first, queries_first, len(statements)
+        finally:
+            await async_engine.dispose()
+
+    principal, queries_first, queries_total = asyncio.run(run())
+    assert principal.is_active and not principal.is_admin
+    assert queries_first == queries_total == 1
+
+    # deactivating the user through the ORM drops the cached token
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        user.is_active = False
+        session.add(user)
+        session.commit()
+    assert token_cache.get(token) is None
+
+
+def test_entries_expire_with_ttl_or_token_exp():
+    principal = Principal(1, "alice", True, False, True)
+    cache = TokenCache(ttl=0.05)
+    cache.put("a", principal)
+    cache.put("b", principal, token_exp=time.time() - 1)  # already expired token
+    assert cache.get("a") == principal
+    assert cache.get("b") is None
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_bound_and_invalidate_user():
+    cache = TokenCache(max_entries=2)
+    alice, bob = Principal(1, "alice", True, False, True), Principal(2, "bob", True, True, True)
+    cache.put("a1", alice)
+    cache.put("b1", bob)
+    cache.put("a2", alice)  # evicts a1
+    assert cache.get("a1") is None
+    cache.invalidate_user(alice.user_id)
+    assert cache.get("a2") is None and cache.get("b1") == bob
+
+
+def test_threaded_puts_and_invalidations_keep_the_user_index():
+    cache = TokenCache(max_entries=50)
+    users = [Principal(i, f"user{i}", True, False, True) for i in range(5)]
+
+    def churn(worker: int):
+        for i in range(2000):
+            user = users[i % len(users)]
+            cache.put(f"{worker}-{i}", user)
+            cache.get(f"{worker}-{i - 1}")
+            if i % 7 == 0:
+                cache.invalidate_user(user.user_id)
+
+    threads = [threading.Thread(target=churn, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    indexed = {token for tokens in cache._tokens_by_user.values() for token in tokens}
+    assert indexed == set(cache._entries) and len(indexed) <= 50
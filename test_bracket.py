@@ -0,0 +1,92 @@
+# test_bracket.py
+import re
+import asyncio
+from sqlalchemy import event
+from sqlmodel import Session, select
+from models import Game_Round, Match, Player, Tournament
+from standings import check_standings
+
+
+def bracket_matches(engine, tournament_id: int) -> dict[int, list[Match]]:
+    with Session(engine) as session:
+        by_round = {}
+        for match in session.exec(select(Match).where(Match.tournament_id == tournament_id)
+                                  .order_by(Match.round_num, Match.match_id)):
+            by_round.setdefault(match.round_num, []).append(match)
+        return by_round
+
+
+def test_fixed_bracket_moves_winners_into_parent_slots(referee):
+    engine = referee.engine
+    with Session(engine) as session:
+        session.add_all(Player(name=f"Player {i}", email=f"p{i}@example.com") for i in range(8))
+        session.commit()
+    statements = []
+
+    @event.listens_for(referee.async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def run(steps):
+        async with referee.client() as client:
+            return await steps(client)
+
+    created = asyncio.run(run(lambda client: client.post("/tournaments/", json={"name": "Cup", "bracket": True})))
+    tournament_id = created.json()["tournament"]["tournament_id"]
+
+    # every slot exists up front, linked to the slot its winner goes to
+    by_round = bracket_matches(engine, tournament_id)
+    assert [len(by_round[r]) for r in (1, 2, 3)] == [4, 2, 1]
+    for round_num in (1, 2):
+        for k, match in enumerate(by_round[round_num]):
+            assert match.parent_match_id == by_round[round_num + 1][k // 2].match_id
+            assert match.parent_slot == k % 2 + 1
+    assert by_round[3][0].parent_match_id is None
+    assert all(m.status == "pending" and m.team1_id and m.team2_id for m in by_round[1])
+    assert all(m.status == "scheduled" and m.team1_id is None and m.team2_id is None
+               for r in (2, 3) for m in by_round[r])
+
+    # the whole tree, TBD slots included, from one match query
+    statements.clear()
+    page = asyncio.run(run(lambda client: client.get(f"/tournaments/{tournament_id}")))
+    assert page.status_code == 200
+    assert len(re.findall(r"\bTBD\b", page.text)) == 6
+    assert sum(bool(re.search(r'FROM "?match"?\s', s)) for s in statements) == 1
+
+    # one result moves its winner straight into the next round's slot
+    first = by_round[1][1]
+    response = asyncio.run(run(lambda client: client.post(
+        f"/tournaments/{tournament_id}/matches/{first.match_id}/score/",
+        data={"team1_score": 11, "team2_score": 21})))
+    assert response.status_code == 303
+    parent = bracket_matches(engine, tournament_id)[2][0]
+    assert (parent.team1_id, parent.team2_id, parent.status) == (None, first.team2_id, "scheduled")
+
+    # the rest of round 1 in a batch opens round 2 with the drawn pairs
+    batch = [{"match_id": m.match_id, "team1_score": 21, "team2_score": 3}
+             for k, m in enumerate(by_round[1]) if k != 1]
+    response = asyncio.run(run(lambda client: client.post(f"/tournaments/{tournament_id}/results/", json=batch)))
+    assert response.json()["advancement"] == {"message": "Advanced to round 2"}
+    second = bracket_matches(engine, tournament_id)[2]
+    assert [(m.team1_id, m.team2_id, m.status) for m in second] == [
+        (by_round[1][0].team1_id, first.team2_id, "pending"),
+        (by_round[1][2].team1_id, by_round[1][3].team1_id, "pending"),
+    ]
+
+    async def finish(client):
+        for round_num in (2, 3):
+            for match in bracket_matches(engine, tournament_id)[round_num]:
+                response = await client.post(f"/tournaments/{tournament_id}/matches/{match.match_id}/score/",
+                                             data={"team1_score": 21, "team2_score": 19})
+                assert response.status_code in (200, 303), response.text
+        return response
+
+    assert asyncio.run(run(finish)).json()["message"] == "Tournament completed"
+
+    final = bracket_matches(engine, tournament_id)[3][0]
+    with Session(engine) as session:
+        tournament = session.get(Tournament, tournament_id)
+        assert tournament.status == "completed" and tournament.winner_id == final.team1_id
+        assert session.exec(select(Game_Round.status).where(Game_Round.tournament_id == tournament_id)
+                            .order_by(Game_Round.round_num)).all() == ["completed"] * 3
+        assert check_standings(session, tournament_id) == []
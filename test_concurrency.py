@@ -0,0 +1,129 @@
+# test_concurrency.py
+import asyncio
+import threading
+import httpx
+from fastapi import Request
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_async_engine, get_async_session
+from models import Game_Round, Match, Tournament
+from benchmarks.common import seed_tournament
+from game import app, advance_tournament_round
+
+THREADS = 8
+
+
+def setup_app(db, number_of_teams: int) -> tuple:
+    """A tournament with round 1 drawn, and per-thread engines for the app
+
+    Event loops running at once cannot share one aiosqlite pool, so each
+    thread's loop gets its own engine in place of the one from app_db.
+    """
+    with Session(db.engine) as session:
+        tournament_id = seed_tournament(session, number_of_teams, completed_rounds=0).tournament_id
+    local = threading.local()
+
+    async def session_override():
+        async with AsyncSession(local.engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = session_override
+    return db.url, db.engine, local, tournament_id
+
+
+def in_threads(url: str, local, work) -> list:
+    """Run the coroutine function work(index) at once on THREADS threads, each with its own loop and engine"""
+    barrier = threading.Barrier(THREADS)
+    results = [None] * THREADS
+
+    async def run(index):
+        local.engine = make_async_engine(url)
+        try:
+            barrier.wait()
+            results[index] = await work(index)
+        finally:
+            await local.engine.dispose()
+
+    threads = [threading.Thread(target=asyncio.run, args=(run(i),)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def pending_matches(engine, tournament_id: int) -> list[int]:
+    with Session(engine) as session:
+        round_num = session.get(Tournament, tournament_id).current_round
+        return session.exec(select(Match.match_id).where(Match.tournament_id == tournament_id)
+                            .where(Match.round_num == round_num).where(Match.status == "pending")
+                            .order_by(Match.match_id)).all()
+
+
+def test_concurrent_final_scores_advance_each_round_once(referee):
+    url, engine, local, tournament_id = setup_app(referee, 16)
+    path = f"/tournaments/{tournament_id}/matches/{{}}/score/"
+
+    async def submit(client, match_id):
+        return (await client.post(path.format(match_id), data={"team1_score": 21, "team2_score": 15})).status_code
+
+    async def sequential(match_ids):
+        local.engine = make_async_engine(url)
+        try:
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return [await submit(client, match_id) for match_id in match_ids]
+        finally:
+            await local.engine.dispose()
+
+    for round_num in range(1, 5):
+        pending = pending_matches(engine, tournament_id)
+        if len(pending) > 2:
+            assert asyncio.run(sequential(pending[:-2])) == [303] * (len(pending) - 2)
+        # the last two matches of the round, each sent by half the threads
+        last = pending[-2:]
+
+        async def hammer(index):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await submit(client, last[index % len(last)])
+
+        statuses = in_threads(url, local, hammer)
+        assert statuses.count(200) == 1, (round_num, statuses)
+        assert all(code in (200, 303, 400, 409) for code in statuses), statuses
+
+    with Session(engine) as session:
+        tournament = session.get(Tournament, tournament_id)
+        assert tournament.status == "completed" and tournament.winner_id is not None
+        assert tournament.current_round == 4
+        per_round = dict(session.exec(select(Match.round_num, func.count()).where(Match.tournament_id == tournament_id)
+                                      .group_by(Match.round_num)).all())
+        assert per_round == {1: 8, 2: 4, 3: 2, 4: 1}
+        rounds = session.exec(select(Game_Round.round_num, Game_Round.pending_matches)
+                              .where(Game_Round.tournament_id == tournament_id).order_by(Game_Round.round_num)).all()
+        assert rounds == [(1, 0), (2, 0), (3, 0), (4, 0)]
+
+
+def test_concurrent_advance_calls_build_one_round(app_db):
+    url, engine, local, tournament_id = setup_app(app_db, 8)
+    with Session(engine) as session:
+        for match in session.exec(select(Match).where(Match.tournament_id == tournament_id)):
+            match.team1_score, match.winner_id, match.loser_id, match.status = 21, match.team1_id, match.team2_id, "completed"
+            session.add(match)
+        round_record = session.exec(select(Game_Round).where(Game_Round.tournament_id == tournament_id)).one()
+        round_record.pending_matches = 0
+        session.add(round_record)
+        session.commit()
+
+    async def advance(index):
+        async with AsyncSession(local.engine, expire_on_commit=False) as session:
+            tournament = await session.get(Tournament, tournament_id)
+            request = Request({"type": "http", "app": app, "router": app.router, "headers": [], "path": "/"})
+            result = await advance_tournament_round(request, tournament, session)
+            return result if isinstance(result, dict) else "advanced"
+
+    results = in_threads(url, local, advance)
+    assert results.count("advanced") == 1, results
+    assert all(r == "advanced" or r["message"] == "Round 1 already advanced" for r in results), results
+    with Session(engine) as session:
+        assert session.get(Tournament, tournament_id).current_round == 2
+        assert len(session.exec(select(Match).where(Match.round_num == 2)).all()) == 2
+        assert len(session.exec(select(Game_Round).where(Game_Round.round_num == 2)).all()) == 1
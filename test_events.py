@@ -0,0 +1,48 @@
+# test_events.py
+import json
+import asyncio
+from events import EventHub, RESYNC
+
+
+def test_publish_fans_out_to_tournament_subscribers_only():
+    hub = EventHub()
+    watching = [hub.subscribe(1) for _ in range(3)]
+    other = hub.subscribe(2)
+
+    hub.publish(1, "match_completed", {"match_id": 7, "winner_id": 3})
+
+    frames = {queue.get_nowait() for queue in watching}
+    assert len(frames) == 1
+    frame = frames.pop()
+    assert frame.startswith("event: match_completed\n")
+    assert json.loads(frame.split("data: ", 1)[1]) == {"match_id": 7, "winner_id": 3}
+    assert other.empty()
+    assert hub.stats()["delivered"] == 3
+
+
+def test_slow_subscriber_is_told_to_resync():
+    hub = EventHub(queue_size=2)
+    slow = hub.subscribe(1)
+    fast = hub.subscribe(1)
+    for match_id in range(3):
+        hub.publish(1, "match_completed", {"match_id": match_id})
+        fast.get_nowait()
+
+    assert slow.qsize() == 1 and slow.get_nowait() == RESYNC
+    assert hub.stats()["dropped"] == 1
+
+
+def test_stream_unsubscribes_when_client_goes_away():
+    hub = EventHub(heartbeat=0.01)
+
+    async def run():
+        stream = hub.stream(1)
+        assert await anext(stream) == "retry: 5000\n\n"
+        assert await anext(stream) == ": keepalive\n\n"
+        hub.publish(1, "round_advanced", {"round": 2})
+        assert (await anext(stream)).startswith("event: round_advanced\n")
+        assert hub.stats()["subscribers"] == 1
+        await stream.aclose()
+
+    asyncio.run(run())
+    assert hub.stats()["subscribers"] == 0 and hub.stats()["tournaments"] == 0
@@ -0,0 +1,71 @@
+# test_hashing.py
+import time
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from hashing import HashingPool, HashingPoolFull
+from game import hash_password, verify_password
+import game
+
+
+def test_pool_rejects_past_max_pending():
+    pool = HashingPool(workers=1, max_pending=2)
+
+    async def run():
+        slow = [asyncio.create_task(pool.run(time.sleep, 0.05)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(HashingPoolFull):
+            await pool.run(time.sleep, 0.05)
+        await asyncio.gather(*slow)
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["rejected"] == 1 and stats["completed"] == 2
+    assert stats["peak_pending"] == 2 and stats["pending"] == 0
+
+
+def test_failed_hashes_are_not_counted_as_completed():
+    pool = HashingPool(workers=1)
+
+    async def run():
+        with pytest.raises(ValueError):
+            await pool.run(int, "not a number")
+        await pool.run(int, "1")
+
+    asyncio.run(run())
+    stats = pool.stats()
+    assert stats["completed"] == 1 and stats["failed"] == 1 and stats["pending"] == 0
+
+
+def test_saturated_pool_is_503(monkeypatch):
+    monkeypatch.setattr(game, "hashing_pool", HashingPool(workers=1, max_pending=0))
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(game.hash_password_async("secret"))
+    assert raised.value.status_code == 503
+    assert raised.value.headers["Retry-After"] == "1"
+
+
+def test_verify_runs_on_the_hashing_threads_while_the_loop_runs(monkeypatch):
+    hashed = hash_password("secret")
+    threads = []
+    loop_ran = threading.Event()
+
+    def recording_verify(plain_password, hashed_password):
+        threads.append(threading.current_thread().name)
+        # the loop sets this while the verify is in flight: it is not blocked
+        assert loop_ran.wait(timeout=5)
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(game, "verify_password", recording_verify)
+
+    async def run():
+        verifying = asyncio.gather(*(game.verify_password_async("secret", hashed) for _ in range(4)))
+        await asyncio.sleep(0)
+        loop_ran.set()
+        return await verifying, threading.current_thread().name
+
+    results, loop_thread = asyncio.run(run())
+    assert results == [True] * 4
+    assert len(threads) == 4 and all(name.startswith("hashing_") for name in threads)
+    assert loop_thread not in threads
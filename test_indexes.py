@@ -0,0 +1,117 @@
+# test_indexes.py
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine, select
+from database import upgrade_schema
+from models import Player, Game, Match, Game_Round, RefreshToken
+
+
+def make_engine():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def query_plan(engine, statement) -> str:
+    sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return " | ".join(row[-1] for row in rows)
+
+
+HOT_QUERIES = {
+    "check_round_completion": select(Match).where(
+        (Match.tournament_id == 1) & (Match.round_num == 2) & (Match.status == "pending")),
+    "complete_tournament": select(Match).where(
+        (Match.tournament_id == 1) & (Match.round_num == 5) & (Match.status == "completed")),
+    "bracket_view": select(Match).where(Match.tournament_id == 1).order_by(Match.round_num),
+    "game_round": select(Game_Round).where(
+        (Game_Round.tournament_id == 1) & (Game_Round.round_num == 2)),
+    "crud_active_players": select(Game).where(Game.round == 1).where(Game.eliminated == False),
+    "crud_player_by_name": select(Player).where(Player.name == "Peter"),
+    "refresh_token_lookup": select(RefreshToken).where(RefreshToken.lookup == "0123456789abcdef"),
+    "paged_matches": select(Match).where(Match.tournament_id == 1).where(Match.status == "completed")
+                     .where(Match.match_id > 100).order_by(Match.match_id).limit(51),
+}
+
+
+def test_hot_queries_use_an_index():
+    engine = make_engine()
+    for name, statement in HOT_QUERIES.items():
+        plan = query_plan(engine, statement)
+        assert "USING INDEX" in plan or "USING COVERING INDEX" in plan, f"{name}: {plan}"
+        assert "SCAN" not in plan.replace("USING", ""), f"{name}: {plan}"
+
+
+def test_upgrade_schema_adds_indexes_to_existing_tables():
+    engine = make_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_match_tournament_round_status"))
+        conn.execute(text("DROP INDEX ix_match_tournament_status"))
+    assert "SCAN" in query_plan(engine, HOT_QUERIES["check_round_completion"])
+
+    upgrade_schema(engine)
+
+    plan = query_plan(engine, HOT_QUERIES["check_round_completion"])
+    assert "ix_match_tournament_round_status" in plan
+
+
+def test_upgrade_schema_recreates_plaintext_refresh_token_table():
+    engine = make_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE refreshtoken"))
+        conn.execute(text("CREATE TABLE refreshtoken (refresh_token_id INTEGER PRIMARY KEY, user_id INTEGER, "
+                          "token VARCHAR NOT NULL UNIQUE, expires_at DATETIME, revoked BOOLEAN)"))
+        conn.execute(text("INSERT INTO refreshtoken VALUES (1, 1, 'eyJ...', '2030-01-01', 0)"))
+
+    upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        columns = {row[1] for row in conn.execute(text("PRAGMA table_info(refreshtoken)"))}
+        assert "token" not in columns and {"lookup", "token_hash", "family_id"} <= columns
+        assert conn.execute(text("SELECT count(*) FROM refreshtoken")).scalar() == 0
+    assert "ix_refreshtoken_lookup" in query_plan(engine, HOT_QUERIES["refresh_token_lookup"])
+
+
+def test_upgrade_schema_makes_match_teams_nullable_for_bracket_slots():
+    engine = make_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE match"))
+        conn.execute(text("CREATE TABLE match (match_id INTEGER PRIMARY KEY, tournament_id INTEGER NOT NULL, "
+                          "round_num INTEGER NOT NULL, team1_id INTEGER NOT NULL, team2_id INTEGER NOT NULL, "
+                          "team1_score INTEGER, team2_score INTEGER, winner_id INTEGER, loser_id INTEGER, "
+                          "status VARCHAR NOT NULL)"))
+        conn.execute(text("INSERT INTO match VALUES (1, 1, 1, 3, 4, 21, 15, 3, 4, 'completed')"))
+
+    upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        columns = {row[1]: row[3] for row in conn.execute(text("PRAGMA table_info(match)"))}
+        assert columns["team1_id"] == 0 and columns["team2_id"] == 0  # notnull flag
+        assert {"parent_match_id", "parent_slot"} <= set(columns)
+        assert conn.execute(text("SELECT team1_id, winner_id, status FROM match")).all() == [(3, 3, "completed")]
+        # tournament_summary, created by make_engine, still points at the rebuilt match table
+        targets = {(row[3], row[2]) for row in conn.execute(text("PRAGMA foreign_key_list(tournament_summary)"))}
+        assert {target for column, target in targets if column.endswith("match_id")} == {"match"}
+        assert "match_old" not in conn.execute(
+            text("SELECT sql FROM sqlite_master WHERE name = 'tournament_summary'")).scalar()
+
+
+def test_upgrade_schema_rebuild_keeps_foreign_keys_of_other_tables():
+    engine = make_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE match"))
+        conn.execute(text("CREATE TABLE match (match_id INTEGER PRIMARY KEY, tournament_id INTEGER NOT NULL, "
+                          "round_num INTEGER NOT NULL, team1_id VARCHAR, team2_id INTEGER, "
+                          "team1_score INTEGER, team2_score INTEGER, winner_id INTEGER, loser_id INTEGER, "
+                          "status VARCHAR NOT NULL, parent_match_id INTEGER, parent_slot INTEGER)"))
+        conn.execute(text("INSERT INTO match (match_id, tournament_id, round_num, team1_id, team2_id, status) "
+                          "VALUES (1, 1, 1, '3', 4, 'pending')"))
+
+    upgrade_schema(engine)
+
+    with engine.connect() as conn:
+        schema = conn.execute(text("SELECT name, sql FROM sqlite_master WHERE sql IS NOT NULL")).all()
+        assert not [name for name, sql in schema if "_old" in sql or "_new" in sql]
+        targets = {row[2] for row in conn.execute(text("PRAGMA foreign_key_list(tournament_summary)"))}
+        assert targets == {"tournament", "match", "player"}
+        assert conn.execute(text("SELECT typeof(team1_id), team1_id FROM match")).all() == [("integer", 3)]
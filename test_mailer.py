@@ -0,0 +1,92 @@
+# test_mailer.py
+import asyncio
+from types import SimpleNamespace
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from models import EmailOutbox, Player, Tournament
+from mail_sink import SMTPSink
+from mailer import SMTPPool, SMTPTransport, build_message
+from game import queue_fixture_emails
+
+
+def make_pool(port, **kwargs):
+    return SMTPPool("127.0.0.1", port, "user", "secret", starttls=False, timeout=5, **kwargs)
+
+
+def test_pool_reuses_logged_in_connections():
+    sink = SMTPSink()
+
+    async def run():
+        port = await sink.start()
+        pool = make_pool(port, pool_size=2, max_messages=10)
+        messages = [build_message(f"player{i}@example.com", "Fixtures", "<p>hi</p>") for i in range(45)]
+        errors = await asyncio.to_thread(pool.send_many, messages)
+        assert errors == [None] * 45
+        # 45 messages at 10 per connection, sequentially: 5 connections, 5 logins
+        assert sink.stats() == {"connections": 5, "logins": 5, "messages": 45}
+
+        # the idle connection is picked up again instead of opening a new one
+        await asyncio.to_thread(pool.send_many, messages[:3])
+        assert sink.connections == 5 and pool.stats()["messages_sent"] == 48
+
+        await asyncio.to_thread(pool.close)
+        await sink.stop()
+
+    asyncio.run(run())
+
+
+def test_transport_spreads_a_batch_over_the_pool():
+    sink = SMTPSink()
+
+    async def run():
+        port = await sink.start()
+        transport = SMTPTransport(make_pool(port, pool_size=4, max_messages=100))
+        emails = [SimpleNamespace(to_email=f"player{i}@example.com", subject="Fixtures", html="<p>hi</p>")
+                  for i in range(40)]
+        assert await transport.send_batch(emails) == [None] * 40
+        assert sink.stats() == {"connections": 4, "logins": 4, "messages": 40}
+        await transport.aclose()
+        await sink.stop()
+
+        # nothing listening: every message reports the error, nothing raises
+        transport = SMTPTransport(make_pool(port, pool_size=2))
+        errors = await transport.send_batch(emails[:3])
+        assert len(errors) == 3 and all(errors)
+
+    asyncio.run(run())
+
+
+def test_round_fixtures_are_queued_for_every_entrant(tmp_path):
+    url = f"sqlite:///{tmp_path / 'fixtures.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        players = [Player(name=f"Player {i}", email=f"p{i}@example.com" if i else "") for i in range(4)]
+        tournament = Tournament(name="Spring Cup", status="in_progress", number_of_teams=4, current_round=2, total_rounds=2)
+        session.add_all(players + [tournament])
+        session.commit()
+        ids = [p.player_id for p in players]
+        tournament_id = tournament.tournament_id
+
+    async_engine = make_async_engine(url)
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            tournament = await session.get(Tournament, tournament_id)
+            await queue_fixture_emails(session, tournament, [
+                {"team1": ids[0], "team2": ids[1], "match_num": 1, "round": 2},
+                {"team1": ids[2], "team2": ids[3], "match_num": 2, "round": 2},
+            ])
+            await session.commit()
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    with Session(engine) as session:
+        emails = {e.to_email: e for e in session.exec(select(EmailOutbox))}
+    # Player 0 has no address
+    assert sorted(emails) == ["p1@example.com", "p2@example.com", "p3@example.com"]
+    assert all(e.status == "pending" for e in emails.values())
+    assert emails["p1@example.com"].subject == "Spring Cup: your round 2 match"
+    assert "against <strong>Player 0</strong>" in emails["p1@example.com"].html
+    assert "Match 2" in emails["p3@example.com"].html and "Player 2" in emails["p3@example.com"].html
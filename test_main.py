@@ -0,0 +1,34 @@
+# test_main.py
+import asyncio
+import httpx
+from sqlmodel import Session, select
+from models import Game_Round, Match, Tournament
+from benchmarks.common import seed_tournament
+from game import app as game_app
+from database import get_async_session
+from main import app
+
+
+def test_legacy_form_completes_matches_and_advances(app_db):
+    with Session(app_db.engine) as session:
+        tournament_id = seed_tournament(session, 4, completed_rounds=0).tournament_id
+        match_ids = session.exec(select(Match.match_id).order_by(Match.match_id)).all()
+    app.dependency_overrides[get_async_session] = game_app.dependency_overrides[get_async_session]
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return [await client.post(f"/matches/{match_id}/complete",
+                                      data={"team1_score": 21, "team2_score": 14, "winner_id": "team1"})
+                    for match_id in match_ids]
+
+    try:
+        responses = asyncio.run(run())
+    finally:
+        app.dependency_overrides.clear()
+    assert [r.status_code for r in responses] == [303, 303]
+
+    with Session(app_db.engine) as session:
+        assert session.get(Tournament, tournament_id).current_round == 2
+        assert session.exec(select(Game_Round.round_num, Game_Round.pending_matches)
+                            .where(Game_Round.tournament_id == tournament_id)
+                            .order_by(Game_Round.round_num)).all() == [(1, 0), (2, 1)]
@@ -0,0 +1,119 @@
+# test_outbox.py
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+from sqlmodel import Session, select
+from models import EmailOutbox, User
+from mail_sink import create_sink
+from hashing import HashingPool
+from outbox import OutboxWorker, ResendTransport, claim_batch, enqueue_email, MAX_ATTEMPTS
+
+
+def sink_transport(sink):
+    return ResendTransport(httpx.AsyncClient(transport=httpx.ASGITransport(app=sink), base_url="http://sink"))
+
+
+def test_registration_writes_the_email_in_its_transaction(app_db):
+    async def run():
+        async with app_db.client() as client:
+            response = await client.post("/register_user", data={
+                "username": "Carol", "email": "carol@example.com", "full_name": "Carol",
+                "password": "secret", "confirm_password": "secret"})
+            assert response.status_code == 200
+
+    asyncio.run(run())
+    with Session(app_db.engine) as session:
+        user = session.exec(select(User)).one()
+        email = session.exec(select(EmailOutbox)).one()
+    assert user.username == "carol"
+    assert email.to_email == "carol@example.com" and email.status == "pending"
+    assert "/verify-email?token=" in email.html
+
+
+def test_worker_delivers_in_batches_and_retries_with_backoff(app_db):
+    session_maker = app_db.session_maker
+    sink = create_sink()
+
+    async def run():
+        async with session_maker() as session:
+            for i in range(250):
+                enqueue_email(session, f"player{i}@example.com", "Fixtures", "<p>hi</p>")
+            await session.commit()
+
+        worker = OutboxWorker(session_maker, sink_transport(sink), batch_size=100, concurrency=2)
+        assert await worker.drain() == 250
+        assert worker.stats() == {"sent": 250, "failed": 0, "batches": 3, "errors": 0}
+        assert sink.state.requests == 3 and len(sink.state.messages) == 250
+
+        # provider outage: rows go back to pending with a later next_attempt_at
+        async with session_maker() as session:
+            enqueue_email(session, "late@example.com", "Fixtures", "<p>hi</p>")
+            await session.commit()
+        down = ResendTransport(httpx.AsyncClient(transport=httpx.ASGITransport(app=create_sink(fail_rate=1.0)),
+                                                 base_url="http://sink"))
+        worker = OutboxWorker(session_maker, down)
+        assert await worker.drain() == 1
+        assert await worker.drain() == 0  # not due again yet
+
+    asyncio.run(run())
+    with Session(app_db.engine) as session:
+        late = session.exec(select(EmailOutbox).where(EmailOutbox.to_email == "late@example.com")).one()
+    assert late.status == "pending" and late.attempts == 1
+    assert late.next_attempt_at > datetime.utcnow() + timedelta(seconds=10)
+    assert late.last_error.startswith("HTTP 503")
+
+
+def test_gives_up_after_max_attempts_and_reclaims_stale_claims(app_db):
+    session_maker = app_db.session_maker
+    with Session(app_db.engine) as session:
+        session.add(EmailOutbox(to_email="a@example.com", subject="s", html="h", attempts=MAX_ATTEMPTS - 1))
+        session.add(EmailOutbox(to_email="b@example.com", subject="s", html="h", status="sending",
+                                claimed_at=datetime.utcnow() - timedelta(hours=1)))
+        session.commit()
+
+    async def run():
+        down = ResendTransport(httpx.AsyncClient(transport=httpx.ASGITransport(app=create_sink(fail_rate=1.0)),
+                                                 base_url="http://sink"))
+        async with session_maker() as session:
+            claimed = await claim_batch(session, 10)
+            assert {e.to_email for e in claimed} == {"a@example.com", "b@example.com"}
+            assert await claim_batch(session, 10) == []  # already claimed
+        async with session_maker() as session:
+            await session.exec(EmailOutbox.__table__.update().values(status="pending", claimed_at=None))
+            await session.commit()
+        await OutboxWorker(session_maker, down).drain()
+
+    asyncio.run(run())
+    with Session(app_db.engine) as session:
+        statuses = {e.to_email: e.status for e in session.exec(select(EmailOutbox))}
+    assert statuses == {"a@example.com": "failed", "b@example.com": "pending"}
+
+
+def test_the_app_delivers_the_outbox_until_shutdown(app_db, monkeypatch):
+    import game
+    sink = create_sink()
+    monkeypatch.setattr(game, "async_session_maker", app_db.session_maker)
+    monkeypatch.setattr(game, "create_db_and_tables", lambda: None)
+    monkeypatch.setattr(game, "make_transport", lambda: sink_transport(sink))
+    monkeypatch.setattr(game.token_sweeper, "interval", 0)
+    monkeypatch.setattr(game, "OUTBOX_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(game, "hashing_pool", HashingPool())  # shut down with the app
+
+    async def run():
+        await game.on_startup()
+        async with app_db.session_maker() as session:
+            enqueue_email(session, "dave@example.com", "Fixtures", "<p>hi</p>")
+            await session.commit()
+        for _ in range(500):
+            if game.app.state.outbox_worker.sent:
+                break
+            await asyncio.sleep(0.01)
+        await game.on_shutdown()
+        assert game.app.state.outbox_task.done()
+
+    try:
+        asyncio.run(run())
+    finally:
+        for name in ("outbox_worker", "outbox_stop", "outbox_task"):
+            delattr(game.app.state, name)
+    assert [m["to"] for m in sink.state.messages] == [["dave@example.com"]]
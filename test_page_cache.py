@@ -0,0 +1,55 @@
+# test_page_cache.py
+import asyncio
+import pytest
+from page_cache import PageCache
+
+
+def test_concurrent_misses_render_once():
+    cache = PageCache()
+    renders = 0
+
+    async def render():
+        nonlocal renders
+        renders += 1
+        await asyncio.sleep(0.01)
+        return "<html>bracket</html>"
+
+    async def burst():
+        return await asyncio.gather(*(cache.get_or_render("bracket", 1, 0, render) for _ in range(50)))
+
+    pages = asyncio.run(burst())
+    assert renders == 1
+    assert set(pages) == {"<html>bracket</html>"}
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 49
+
+
+def test_new_version_misses_and_lru_evicts_oldest():
+    cache = PageCache(max_entries=2)
+
+    async def run():
+        async def render():
+            return "page"
+        await cache.get_or_render("bracket", 1, 0, render)
+        await cache.get_or_render("bracket", 1, 0, render)
+        await cache.get_or_render("bracket", 1, 1, render)   # version bumped
+        await cache.get_or_render("standings", 1, 1, render)  # evicts version 0
+
+    asyncio.run(run())
+    assert cache.stats() == {"entries": 2, "max_entries": 2, "hits": 1, "misses": 3,
+                             "coalesced": 0, "evictions": 1}
+
+
+def test_failed_render_is_not_cached():
+    cache = PageCache()
+
+    async def broken():
+        raise RuntimeError("db down")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await cache.get_or_render("winner", 1, 0, broken)
+        async def render():
+            return "ok"
+        return await cache.get_or_render("winner", 1, 0, render)
+
+    assert asyncio.run(run()) == "ok"
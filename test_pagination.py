@@ -0,0 +1,55 @@
+# test_pagination.py
+import re
+import asyncio
+from sqlmodel import Session, select
+from models import Match, Player, Tournament
+from benchmarks.common import seed_tournament
+
+
+def test_list_routes_page_through_everything_once(app_db):
+    with Session(app_db.engine) as session:
+        tournament_id = seed_tournament(session, 16, completed_rounds=1).tournament_id
+        session.add_all(Player(name=f"Extra {i}", email=f"extra{i}@example.com") for i in range(104))
+        session.add_all(Tournament(name=f"Cup {i}", status="ongoing", number_of_teams=4,
+                                   current_round=1, total_rounds=2) for i in range(6))
+        session.commit()
+        player_names = session.exec(select(Player.name).order_by(Player.player_id)).all()
+        tournament_names = session.exec(select(Tournament.name).order_by(Tournament.tournament_id.desc())).all()
+        match_ids = {status: session.exec(select(Match.match_id).where(Match.status == status)
+                                          .order_by(Match.match_id)).all()
+                     for status in ("completed", "pending")}
+
+    async def follow(client, path, pattern):
+        """Collect pattern matches over all pages, following the next link"""
+        found = []
+        while path:
+            html = (await client.get(path)).text
+            found += re.findall(pattern, html)
+            next_link = re.search(r'href="([^"]+)" class="btn btn-outline">(?:Next page|Older tournaments)', html)
+            path = next_link and next_link.group(1).replace("&amp;", "&")
+        return found
+
+    async def run():
+        async with app_db.client() as client:
+            players = await follow(client, "/players/", r"<li>(.+?) \(email")
+            tournaments = await follow(client, "/?limit=3", r"<h2>(.+?)</h2>")
+
+            pages, path = [], f"/tournaments/{tournament_id}/matches/?limit=3"
+            while path:
+                page = (await client.get(path)).json()
+                pages.append(page)
+                path = page["next_cursor"] and f"/tournaments/{tournament_id}/matches/?limit=3&after={page['next_cursor']}"
+            current = (await client.get(f"/tournaments/{tournament_id}/current-matches/")).json()
+            too_big = await client.get("/players/?limit=100000")
+        return players, tournaments, pages, current, too_big
+
+    players, tournaments, pages, current, too_big = asyncio.run(run())
+    assert players == player_names and len(players) == 120
+    assert tournaments == tournament_names
+    assert [m["match_id"] for page in pages for m in page["matches"]] == match_ids["completed"]
+    assert [len(page["matches"]) for page in pages] == [3, 3, 2]
+    assert all(page["pending"] == 4 for page in pages)
+    assert set(pages[0]["matches"][0]) == set(Match.model_fields)
+    assert [m["match_id"] for m in current["pending matches"]] == match_ids["pending"]
+    assert current["next_cursor"] is None
+    assert too_big.status_code == 422
@@ -0,0 +1,53 @@
+# test_pending_matches.py
+import asyncio
+from sqlalchemy import text
+from sqlmodel import SQLModel, Session, select
+from database import make_engine, upgrade_schema
+from models import Game_Round, Match
+from benchmarks.common import seed_tournament
+
+
+def pending_per_round(engine, tournament_id: int) -> list[tuple[int, int]]:
+    with Session(engine) as session:
+        return session.exec(select(Game_Round.round_num, Game_Round.pending_matches)
+                            .where(Game_Round.tournament_id == tournament_id)
+                            .order_by(Game_Round.round_num)).all()
+
+
+def test_upgrade_schema_backfills_pending_matches(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, 16, completed_rounds=1).tournament_id
+        match = session.exec(select(Match).where(Match.round_num == 2)).first()
+        match.status = "completed"
+        session.add(match)
+        session.commit()
+    # a game_round table from before the counter existed
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE game_round DROP COLUMN pending_matches"))
+
+    upgrade_schema(engine)
+
+    assert pending_per_round(engine, tournament_id) == [(1, 0), (2, 3)]
+
+
+def test_recorded_scores_decrement_pending_matches(referee):
+    engine = referee.engine
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, 8, completed_rounds=0).tournament_id
+        match_ids = session.exec(select(Match.match_id).order_by(Match.match_id)).all()
+
+    async def run():
+        counts = []
+        async with referee.client() as client:
+            for match_id in match_ids:
+                response = await client.post(f"/tournaments/{tournament_id}/matches/{match_id}/score/",
+                                             data={"team1_score": 21, "team2_score": 12})
+                assert response.status_code in (200, 303), response.text
+                counts.append(pending_per_round(engine, tournament_id))
+        return counts
+
+    counts = asyncio.run(run())
+    # the last score of round 1 also draws round 2 with both its matches pending
+    assert counts == [[(1, 3)], [(1, 2)], [(1, 1)], [(1, 0), (2, 2)]]
@@ -0,0 +1,150 @@
+# test_refresh_tokens.py
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from models import Player, RefreshToken, User
+from refresh_tokens import ROTATION_GRACE, prune_refresh_tokens, store_refresh_token
+from game import hash_password
+
+
+@pytest.fixture
+def alice(app_db):
+    with Session(app_db.engine) as session:
+        session.add(User(username="alice", email="alice@example.com", full_name="Alice",
+                         password=hash_password("secret"), is_active=True, is_verified=True))
+        session.commit()
+    return app_db
+
+
+def age_rotations(engine, by: timedelta):
+    with Session(engine) as session:
+        for row in session.exec(select(RefreshToken).where(RefreshToken.revoked == True)):
+            row.revoked_at -= by
+            session.add(row)
+        session.commit()
+
+
+def test_refresh_rotates_and_detects_reuse(alice):
+    async def run():
+        async with alice.client() as client:
+            response = await client.post("/login", data={"username": "alice", "password": "secret"})
+            assert response.status_code == 303
+            first = client.cookies.get("refresh_token", path="/token/refresh")
+
+            response = await client.post("/token/refresh")
+            assert response.status_code == 204
+            second = client.cookies.get("refresh_token", path="/token/refresh")
+            assert second and second != first
+            assert response.cookies.get("access_token")
+
+            # replaying the first token revokes the family, so the second dies too
+            age_rotations(alice.engine, ROTATION_GRACE)
+            client.cookies.set("refresh_token", first, path="/token/refresh")
+            assert (await client.post("/token/refresh")).status_code == 401
+            client.cookies.set("refresh_token", second, path="/token/refresh")
+            assert (await client.post("/token/refresh")).status_code == 401
+        return first, second
+
+    first, second = asyncio.run(run())
+    with Session(alice.engine) as session:
+        rows = session.exec(select(RefreshToken)).all()
+    assert len(rows) == 2
+    assert len({row.family_id for row in rows}) == 1
+    assert all(row.revoked for row in rows)
+    # only hashes are stored
+    assert not any(token in (row.token_hash, row.lookup) for row in rows for token in (first, second))
+
+
+def test_concurrent_refreshes_keep_the_family(alice):
+    async def run():
+        async with alice.client() as client:
+            await client.post("/login", data={"username": "alice", "password": "secret"})
+            first = client.cookies.get("refresh_token", path="/token/refresh")
+            assert (await client.post("/token/refresh")).status_code == 204
+            second = client.cookies.get("refresh_token", path="/token/refresh")
+
+            # a second tab refreshing with the cookie it read before the first renewed
+            client.cookies.set("refresh_token", first, path="/token/refresh")
+            response = await client.post("/token/refresh")
+            assert response.status_code == 409
+            assert "set-cookie" not in response.headers
+            response = await client.get("/token/refresh?next=/players/create")
+            assert response.status_code == 307 and response.headers["location"] == "/players/create"
+
+            client.cookies.set("refresh_token", second, path="/token/refresh")
+            assert (await client.post("/token/refresh")).status_code == 204
+
+    asyncio.run(run())
+    with Session(alice.engine) as session:
+        assert len(session.exec(select(RefreshToken).where(RefreshToken.revoked == False)).all()) == 1
+
+
+def test_expired_access_cookie_bounces_page_requests_through_refresh(alice):
+    html = {"Accept": "text/html"}
+
+    async def run():
+        async with alice.client() as client:
+            await client.post("/login", data={"username": "alice", "password": "secret"})
+            client.cookies.delete("access_token")
+
+            response = await client.get("/players/create", headers=html)
+            assert response.status_code == 307
+            assert response.headers["location"] == "/token/refresh?next=%2Fplayers%2Fcreate"
+            response = await client.get("/players/create", headers=html, follow_redirects=True)
+            assert response.status_code == 200 and response.url.path == "/players/create"
+            assert client.cookies.get("access_token")
+
+            # a form posted with an expired cookie is replayed after the renewal
+            client.cookies.delete("access_token")
+            response = await client.post("/players/create", headers=html, follow_redirects=True,
+                                         data={"name": "Carol", "email": "carol@example.com"})
+            assert response.status_code == 200 and response.url.path == "/players/"
+            assert (await client.get("/token/refresh?next=//evil.example")).headers["location"] == "/"
+
+            # script and API callers keep the plain 401
+            client.cookies.delete("access_token")
+            assert (await client.get("/players/create")).status_code == 401
+
+            # no usable refresh cookie: on to the login form
+            client.cookies.set("refresh_token", "not-a-token", path="/token/refresh")
+            response = await client.get("/players/create", headers=html, follow_redirects=True)
+            assert response.url.path == "/login"
+
+    asyncio.run(run())
+    with Session(alice.engine) as session:
+        assert session.exec(select(Player.name)).all() == ["Carol"]
+
+
+def test_prune_deletes_expired_and_old_revoked_in_batches(tmp_path):
+    url = f"sqlite:///{tmp_path / 'prune.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        user = User(username="bob", email="bob@example.com", full_name="Bob", password="x")
+        session.add(user)
+        session.flush()
+        for i in range(25):
+            store_refresh_token(session, user.user_id, f"expired-{i}", now - timedelta(minutes=1))
+        for i in range(5):
+            row = store_refresh_token(session, user.user_id, f"rotated-{i}", now + timedelta(days=1))
+            row.revoked, row.revoked_at = True, now - timedelta(days=2)
+        recent = store_refresh_token(session, user.user_id, "rotated-recently", now + timedelta(days=1))
+        recent.revoked, recent.revoked_at = True, now
+        store_refresh_token(session, user.user_id, "live", now + timedelta(days=1))
+        session.commit()
+
+    async_engine = make_async_engine(url)
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            deleted = await prune_refresh_tokens(session, batch_size=7)
+        await async_engine.dispose()
+        return deleted
+
+    assert asyncio.run(run()) == 30
+    with Session(engine) as session:
+        assert len(session.exec(select(RefreshToken)).all()) == 2
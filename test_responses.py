@@ -0,0 +1,75 @@
+# test_responses.py
+import asyncio
+import httpx
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, select
+from starlette.responses import StreamingResponse
+from models import Match
+from auth_cache import Principal
+from compression import CompressionMiddleware
+from responses import FastJSONResponse
+from benchmarks.common import seed_tournament
+
+
+def test_fast_json_matches_the_default_encoding(app_db):
+    with Session(app_db.engine) as session:
+        tournament = seed_tournament(session, 64, completed_rounds=1)
+        tournament_id = tournament.tournament_id
+        matches = session.exec(select(Match).where(Match.tournament_id == tournament_id)).all()
+        expected = jsonable_encoder({"matches": [m for m in matches if m.status == "completed"],
+                                     "pending": 16, "next_cursor": None})
+        principal = Principal(1, "alice", True, False, True)
+        content = {"tournament": tournament, "user": principal, "matches": [{"round": 1, "team1": 3}]}
+        assert FastJSONResponse(content).body == FastJSONResponse(jsonable_encoder(content)).body
+
+    async def run():
+        async with app_db.client() as client:
+            return await client.get(f"/tournaments/{tournament_id}/matches/", headers={"Accept-Encoding": "br"})
+
+    response = asyncio.run(run())
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["content-encoding"] == "br"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == expected
+
+
+def test_compression_thresholds():
+    async def page(scope, receive, send):
+        size = int(scope["path"].strip("/"))
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"text/html; charset=utf-8")]})
+        await send({"type": "http.response.body", "body": b"<p>row</p>" * size})
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=CompressionMiddleware(page)),
+                                   base_url="http://test")
+        async with client:
+            results = {}
+            for path, accept in (("/500", "gzip, br"), ("/50", "gzip, br"), ("/500", "gzip"), ("/500", "")):
+                response = await client.get(path, headers={"Accept-Encoding": accept})
+                results[path, accept] = response.headers.get("content-encoding")
+                assert response.text == "<p>row</p>" * int(path.strip("/"))
+        return results
+
+    assert asyncio.run(run()) == {("/500", "gzip, br"): "br", ("/50", "gzip, br"): None,
+                                  ("/500", "gzip"): "gzip", ("/500", ""): None}
+
+
+def test_streamed_bodies_are_flushed_per_chunk():
+    async def chunks():
+        for i in range(3):
+            yield "<p>chunk</p>" * 200
+
+    for encoding in ("br", "gzip"):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        async def receive():
+            await asyncio.Event().wait()  # no disconnect
+
+        scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"accept-encoding", encoding.encode())]}
+        asyncio.run(CompressionMiddleware(StreamingResponse(chunks(), media_type="text/html"))(scope, receive, send))
+        bodies = [m["body"] for m in sent if m["type"] == "http.response.body" and m.get("more_body")]
+        assert len(bodies) == 3 and all(bodies), encoding
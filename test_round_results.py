@@ -0,0 +1,78 @@
+# test_round_results.py
+import asyncio
+import httpx
+from sqlmodel import Session, select
+from models import Game_Round, Match, Tournament
+from benchmarks.common import seed_tournament
+
+
+def post_results(db, tournament_id: int, batches: list[list[dict]]) -> list[httpx.Response]:
+    async def run():
+        async with db.client() as client:
+            return [await client.post(f"/tournaments/{tournament_id}/results/", json=batch)
+                    for batch in batches]
+
+    return asyncio.run(run())
+
+
+def round_matches(engine, tournament_id: int, round_num: int) -> list[Match]:
+    with Session(engine) as session:
+        return session.exec(select(Match).where(Match.tournament_id == tournament_id)
+                            .where(Match.round_num == round_num).order_by(Match.match_id)).all()
+
+
+def test_batch_results_play_a_tournament_round_by_round(referee):
+    engine = referee.engine
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, 16, completed_rounds=0).tournament_id
+
+    first = round_matches(engine, tournament_id, 1)
+    # part of round 1, then the rest: only the second batch advances
+    halves = [[{"match_id": m.match_id, "team1_score": 21, "team2_score": 10} for m in first[:5]],
+              [{"match_id": m.match_id, "team1_score": 8, "team2_score": 21} for m in first[5:]]]
+    responses = post_results(referee, tournament_id, halves)
+    assert [r.json() for r in responses] == [
+        {"updated": 5, "round": 1, "pending": 3},
+        {"updated": 3, "round": 1, "pending": 0, "advancement": {"message": "Advanced to round 2"}},
+    ]
+    winners = [m.team1_id for m in first[:5]] + [m.team2_id for m in first[5:]]
+    second = round_matches(engine, tournament_id, 2)
+    assert sorted(t for m in second for t in (m.team1_id, m.team2_id)) == sorted(winners)
+
+    for round_num in (2, 3, 4):
+        batch = [{"match_id": m.match_id, "team1_score": 21, "team2_score": 19}
+                 for m in round_matches(engine, tournament_id, round_num)]
+        response, = post_results(referee, tournament_id, [batch])
+        assert response.status_code == 200, response.text
+    assert response.json()["advancement"]["message"] == "Tournament completed"
+
+    with Session(engine) as session:
+        tournament = session.get(Tournament, tournament_id)
+        assert tournament.status == "completed" and tournament.current_round == 4
+        assert session.exec(select(Game_Round.pending_matches).where(Game_Round.tournament_id == tournament_id)
+                            .order_by(Game_Round.round_num)).all() == [0, 0, 0, 0]
+
+
+def test_invalid_batches_write_nothing(referee):
+    engine = referee.engine
+    with Session(engine) as session:
+        tournament_id = seed_tournament(session, 8, completed_rounds=1).tournament_id
+        other_id = seed_tournament(session, 4, completed_rounds=0, name="Other").tournament_id
+    played, pending = round_matches(engine, tournament_id, 1), round_matches(engine, tournament_id, 2)
+    foreign = round_matches(engine, other_id, 1)[0]
+
+    def score(match, team1_score=21, team2_score=15):
+        return {"match_id": match.match_id, "team1_score": team1_score, "team2_score": team2_score}
+
+    responses = post_results(referee, tournament_id, [
+        [score(pending[0]), score(pending[1], 15, 15)],
+        [score(pending[0]), score(pending[0])],
+        [score(pending[0]), score(played[0])],
+        [score(pending[0]), score(foreign)],
+        [],
+    ])
+    assert [r.status_code for r in responses] == [400, 400, 400, 404, 400]
+    assert all(m.status == "pending" for m in round_matches(engine, tournament_id, 2))
+    with Session(engine) as session:
+        assert session.exec(select(Game_Round.pending_matches).where(Game_Round.tournament_id == tournament_id)
+                            .where(Game_Round.round_num == 2)).one() == 2
@@ -0,0 +1,171 @@
+# test_standings.py
+import asyncio
+import random
+from sqlalchemy import event
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from models import Player, Tournament, Match, TournamentStanding
+from game import get_tournament_standings
+from standings import rebuild_standings, check_standings
+
+
+def play_tournament(engine, number_of_teams: int) -> int:
+    """Insert a fully played knockout tournament, returns its id"""
+    with Session(engine) as session:
+        players = [Player(name=f"Player {i}", email=f"p{i}@example.com") for i in range(number_of_teams)]
+        session.add_all(players)
+        total_rounds = number_of_teams.bit_length() - 1
+        tournament = Tournament(name=f"Cup {number_of_teams}", status="completed",
+                                number_of_teams=number_of_teams,
+                                current_round=total_rounds, total_rounds=total_rounds)
+        session.add(tournament)
+        session.flush()
+
+        alive = [p.player_id for p in players]
+        for round_num in range(1, total_rounds + 1):
+            random.shuffle(alive)
+            winners = []
+            for team1, team2 in zip(alive[::2], alive[1::2]):
+                winner, loser = random.choice([(team1, team2), (team2, team1)])
+                session.add(Match(tournament_id=tournament.tournament_id, round_num=round_num,
+                                  team1_id=team1, team2_id=team2, team1_score=21, team2_score=17,
+                                  winner_id=winner, loser_id=loser, status="completed"))
+                winners.append(winner)
+            alive = winners
+        tournament.winner_id = alive[0]
+        session.commit()
+        return tournament.tournament_id
+
+
+def expected_standings(engine, tournament_id: int) -> dict:
+    """Standings recomputed in Python from the match rows"""
+    with Session(engine) as session:
+        stats = {}
+        for match in session.exec(select(Match).where(Match.tournament_id == tournament_id)):
+            for player_id, won in ((match.winner_id, 1), (match.loser_id, 0)):
+                entry = stats.setdefault(player_id, {"wins": 0, "losses": 0, "rounds_reached": 0})
+                entry["wins"] += won
+                entry["losses"] += 1 - won
+                entry["rounds_reached"] = max(entry["rounds_reached"], match.round_num)
+        return stats
+
+
+def test_standings_query_count_does_not_grow_with_players(tmp_path):
+    url = f"sqlite:///{tmp_path / 'standings.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    small = play_tournament(engine, 8)
+    large = play_tournament(engine, 128)
+    with Session(engine) as session:
+        assert rebuild_standings(session, small) == 8
+        assert rebuild_standings(session, large) == 128
+        assert check_standings(session, large) == []
+
+    async_engine = make_async_engine(url)
+    statements = []
+
+    @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def standings_for(tournament_id):
+        statements.clear()
+        async with AsyncSession(async_engine) as session:
+            result = await get_tournament_standings(tournament_id, session)
+        return result, len(statements)
+
+    async def run():
+        try:
+            return await standings_for(small), await standings_for(large)
+        finally:
+            await async_engine.dispose()
+
+    (small_result, small_queries), (large_result, large_queries) = asyncio.run(run())
+
+    assert small_queries == large_queries == 2
+    assert len(large_result["standings"]) == 128
+
+    expected = expected_standings(engine, large)
+    for standing in large_result["standings"]:
+        assert expected[standing["team_id"]] == {
+            "wins": standing["wins"],
+            "losses": standing["losses"],
+            "rounds_reached": standing["rounds_reached"],
+        }
+        assert standing["eliminated_in"] == (None if standing["is_champion"] else standing["rounds_reached"])
+        with Session(engine) as session:
+            assert standing["team_name"] == session.get(Player, standing["team_id"]).name
+
+    champion = large_result["standings"][0]
+    assert champion["rank"] == 1 and champion["is_champion"]
+    assert champion["wins"] == 7 and champion["losses"] == 0
+    assert [s["rounds_reached"] for s in large_result["standings"]] == sorted(
+        (s["rounds_reached"] for s in large_result["standings"]), reverse=True)
+
+
+def test_check_standings_reports_drift(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'drift.db'}")
+    SQLModel.metadata.create_all(engine)
+    tournament_id = play_tournament(engine, 16)
+    with Session(engine) as session:
+        rebuild_standings(session, tournament_id)
+        standing = session.exec(select(TournamentStanding)).first()
+        standing.wins += 1
+        session.add(standing)
+        session.commit()
+
+        problems = check_standings(session, tournament_id)
+        assert len(problems) == 1
+        assert problems[0].startswith(f"player {standing.player_id}:")
+
+
+def test_standings_are_rebuilt_once_for_tournaments_played_before_the_table(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    tournament_id = play_tournament(engine, 16)  # matches only, no standing rows
+    async_engine = make_async_engine(url)
+
+    async def run():
+        try:
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                return await get_tournament_standings(tournament_id, session)
+        finally:
+            await async_engine.dispose()
+
+    result = asyncio.run(run())
+    assert len(result["standings"]) == 16
+    assert result["standings"][0]["is_champion"] and result["standings"][0]["wins"] == 4
+    with Session(engine) as session:
+        assert len(session.exec(select(TournamentStanding)).all()) == 16
+        assert check_standings(session, tournament_id) == []
+
+
+def test_scores_entered_through_the_app_keep_standings_exact(referee):
+    engine = referee.engine
+    with Session(engine) as session:
+        session.add_all(Player(name=f"Player {i}", email=f"p{i}@example.com") for i in range(16))
+        session.commit()
+
+    async def run():
+        async with referee.client() as client:
+            created = await client.post("/tournaments/", json={"name": "Cup"})
+            tournament_id = created.json()["tournament"]["tournament_id"]
+            for _ in range(4):
+                with Session(engine) as session:
+                    pending = session.exec(select(Match).where(Match.tournament_id == tournament_id)
+                                           .where(Match.status == "pending")).all()
+                for match in pending:
+                    team1_score, team2_score = random.choice([(21, 17), (15, 21)])
+                    response = await client.post(
+                        f"/tournaments/{tournament_id}/matches/{match.match_id}/score/",
+                        data={"team1_score": team1_score, "team2_score": team2_score})
+                    assert response.status_code in (200, 303), response.text
+            return tournament_id
+
+    tournament_id = asyncio.run(run())
+    with Session(engine) as session:
+        assert session.get(Tournament, tournament_id).status == "completed"
+        assert len(session.exec(select(TournamentStanding)).all()) == 16
+        assert check_standings(session, tournament_id) == []
@@ -0,0 +1,54 @@
+# test_startup.py
+import os
+import sys
+import subprocess
+from sqlalchemy import text
+from database import make_engine, create_db_and_tables, schema_version
+import models  # registers the tables
+
+# only needed for sending mail, the outbox worker or on the first token or
+# password hash; importing game.py must not pull them in
+LAZY_MODULES = {"smtplib", "email.mime", "webbrowser", "unittest", "resend", "requests",
+                "httpx", "jose", "passlib", "mailer"}
+# cumulative `python -X importtime` milliseconds for game, generous on purpose:
+# it catches a heavy dependency creeping back in, not noise
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", 2500))
+
+
+def import_times(tmp_path) -> dict[str, int]:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'startup.db'}")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import game"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_game_import_is_lazy_and_within_budget(tmp_path):
+    times = import_times(tmp_path)
+    loaded = {name for name in times
+              if any(name == lazy or name.startswith(f"{lazy}.") for lazy in LAZY_MODULES)}
+    assert not loaded
+    assert times["game"] / 1000 < STARTUP_BUDGET_MS
+
+
+def test_schema_creation_is_skipped_when_current(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+    assert create_db_and_tables(engine)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA user_version")).scalar() == schema_version()
+    assert not create_db_and_tables(engine)
+
+    # a database written by an older models.py is upgraded again
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_match_tournament_status"))
+        conn.execute(text("PRAGMA user_version = 1"))
+    assert create_db_and_tables(engine)
+    with engine.connect() as conn:
+        indexes = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars().all()
+    assert "ix_match_tournament_status" in indexes
@@ -0,0 +1,51 @@
+# test_summary.py
+import asyncio
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import make_engine, make_async_engine
+from models import Match, Tournament, TournamentSummary
+from game import record_tournament_summary
+from test_standings import play_tournament
+
+
+def test_summary_matches_python_recomputation(tmp_path):
+    url = f"sqlite:///{tmp_path / 'summary.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    tournament_id = play_tournament(engine, 32)
+    with Session(engine) as session:
+        # give the matches distinct margins
+        for i, match in enumerate(session.exec(select(Match).where(Match.tournament_id == tournament_id))):
+            match.team1_score, match.team2_score = 21, i % 20
+            session.add(match)
+        session.commit()
+        matches = session.exec(select(Match).where(Match.tournament_id == tournament_id)).all()
+
+    async_engine = make_async_engine(url)
+
+    async def run():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            tournament = await session.get(Tournament, tournament_id)
+            final_match = (await session.exec(
+                select(Match).where((Match.tournament_id == tournament_id) &
+                                    (Match.round_num == tournament.total_rounds))
+            )).one()
+            await record_tournament_summary(tournament, final_match, session)
+            await session.commit()
+            # recording again replaces the row instead of failing
+            await record_tournament_summary(tournament, final_match, session)
+            await session.commit()
+        await async_engine.dispose()
+        return final_match
+
+    final_match = asyncio.run(run())
+
+    margins = {m.match_id: abs(m.team1_score - m.team2_score) for m in matches}
+    with Session(engine) as session:
+        summary = session.get(TournamentSummary, tournament_id)
+    assert summary.total_matches == 31
+    assert summary.total_points == sum(m.team1_score + m.team2_score for m in matches)
+    assert summary.closest_margin == min(margins.values()) == margins[summary.closest_match_id]
+    assert summary.biggest_margin == max(margins.values()) == margins[summary.biggest_match_id]
+    assert summary.runner_up_id == final_match.loser_id
+    assert (summary.final_team1_score, summary.final_team2_score) == (final_match.team1_score, final_match.team2_score)
@@ -0,0 +1,69 @@
+# test_sweeper.py
+import asyncio
+from datetime import datetime, timedelta
+from sqlmodel import SQLModel, Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import make_engine, make_async_engine
+from models import RefreshToken, User, VerificationToken
+from refresh_tokens import REVOKED_RETENTION
+from sweeper import TokenSweeper
+
+
+def test_sweep_deletes_dead_tokens_in_batches(tmp_path):
+    url = f"sqlite:///{tmp_path / 'sweep.db'}"
+    engine = make_engine(url)
+    SQLModel.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        user = User(username="alice", email="alice@example.com", full_name="Alice", password="x")
+        session.add(user)
+        session.flush()
+        for i in range(30):
+            # live, used, expired
+            session.add(VerificationToken(user_id=user.user_id, token=f"live{i}", token_type="email_verification",
+                                          expires_at=now + timedelta(hours=1)))
+            session.add(VerificationToken(user_id=user.user_id, token=f"used{i}", token_type="email_verification",
+                                          expires_at=now + timedelta(hours=1), used=True))
+            session.add(VerificationToken(user_id=user.user_id, token=f"old{i}", token_type="email_verification",
+                                          expires_at=now - timedelta(hours=1)))
+            # live, expired, revoked long ago, revoked just now (kept for reuse detection)
+            for j, (expires_at, revoked_at) in enumerate([
+                (now + timedelta(days=1), None),
+                (now - timedelta(minutes=1), None),
+                (now + timedelta(days=1), now - REVOKED_RETENTION - timedelta(minutes=1)),
+                (now + timedelta(days=1), now),
+            ]):
+                session.add(RefreshToken(user_id=user.user_id, lookup=f"{i}-{j}", token_hash=f"{i}-{j}",
+                                         family_id=str(i), expires_at=expires_at,
+                                         revoked=revoked_at is not None, revoked_at=revoked_at))
+        session.commit()
+
+    async_engine = make_async_engine(url)
+    sweeper = TokenSweeper(async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False),
+                           interval=0.01, batch_size=7)
+
+    async def run():
+        assert await sweeper.sweep_once() == {"verification_tokens": 60, "refresh_tokens": 60}
+        assert await sweeper.sweep_once() == {"verification_tokens": 0, "refresh_tokens": 0}
+
+        stop = asyncio.Event()
+        task = asyncio.create_task(sweeper.run(stop))
+        while sweeper.runs < 4:
+            await asyncio.sleep(0.01)
+        stop.set()
+        await task
+        await async_engine.dispose()
+
+    asyncio.run(run())
+    with Session(engine) as session:
+        tokens = session.exec(select(VerificationToken.token)).all()
+        refresh = session.exec(select(RefreshToken)).all()
+    assert sorted(tokens) == sorted(f"live{i}" for i in range(30))
+    assert len(refresh) == 60 and all(r.expires_at > now for r in refresh)
+    assert all(not r.revoked or r.revoked_at >= now for r in refresh)
+
+    stats = sweeper.stats()
+    assert stats["swept"] == {"verification_tokens": 60, "refresh_tokens": 60}
+    assert stats["errors"] == 0 and stats["runs"] >= 4 and stats["seconds"] > 0
+    assert stats["last_run"]["verification_tokens"] == 0
@@ -0,0 +1,65 @@
+# test_templating.py
+import asyncio
+from sqlmodel import Session
+from templating import make_templates, streaming_environment, stream_template, warm_templates
+from benchmarks.common import seed_tournament
+import game
+
+
+def test_bytecode_cache_is_shared_between_environments(tmp_path):
+    count, _ = warm_templates(make_templates("templates", str(tmp_path)).env)
+    assert count == len(list(tmp_path.glob("__jidalli_*.cache"))) > 10
+
+    # a second worker loads the compiled code instead of compiling the source
+    env = make_templates("templates", str(tmp_path)).env
+    def compile(*args, **kwargs):
+        raise AssertionError("compiled again")
+    env.compile = compile
+    assert warm_templates(env, ["base.html", "tournament_bracket.html", "standings.html"])[0] == 3
+
+    # async templates compile differently and are cached separately
+    env = make_templates("templates", str(tmp_path)).env
+    warm_templates(streaming_environment(env, str(tmp_path)), ["standings.html"])
+    assert len(list(tmp_path.glob("__jidalli_async_*.cache"))) == 1
+
+
+def test_streamed_render_matches_buffered_render(tmp_path):
+    env = make_templates("templates", str(tmp_path), static_url=lambda name: f"/assets/{name}").env
+    context = {"tournament": {"name": "Cup", "tournament_id": 1, "total_rounds": 3},
+               "standings": [{"name": f"Player {i}", "wins": i, "losses": 1, "rounds_reached": 2}
+                             for i in range(500)]}
+
+    async def run():
+        return [chunk async for chunk in
+                stream_template(streaming_environment(env, str(tmp_path)), "standings.html", context, 4096)]
+
+    chunks = asyncio.run(run())
+    assert len(chunks) > 5 and all(len(c) >= 4096 for c in chunks[:-1])
+    assert "".join(chunks) == env.get_template("standings.html").render(context)
+
+
+def test_streaming_routes_serve_the_same_pages(app_db, monkeypatch):
+    with Session(app_db.engine) as session:
+        tournament_id = seed_tournament(session, 64, completed_rounds=2).tournament_id
+
+    async def fetch_pages():
+        async with app_db.client() as client:
+            pages = []
+            for path in (f"/tournaments/{tournament_id}", f"/tournaments/{tournament_id}/standings"):
+                response = await client.get(path)
+                assert response.status_code == 200
+                pages.append(response.text)
+            return pages
+
+    try:
+        game.page_cache.clear()
+        buffered = asyncio.run(fetch_pages())
+        game.page_cache.clear()
+        monkeypatch.setattr(game, "STREAM_TEMPLATES", True)
+        streamed = asyncio.run(fetch_pages())
+        hits = game.page_cache.stats()["hits"]
+        assert asyncio.run(fetch_pages()) == streamed
+        assert game.page_cache.stats()["hits"] == hits + 2  # cached once fully sent
+    finally:
+        game.page_cache.clear()
+    assert streamed == buffered